@@ -0,0 +1,176 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Tuple
+
+from metrics import metrics
+
+# Rough relative cost of handling one document of each type, plus the number
+# of bytes that add one more cost unit. PDF parsing dominates everything else.
+COST_MODEL = {
+    '.pdf': (4, 100 * 1024),
+    '.docx': (2, 256 * 1024),
+    '.txt': (1, 1024 * 1024),
+}
+TEXT_COST = (1, 1024 * 1024)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, capacity: int = 16, cheap_reserve: int = 4, cheap_cost: int = 2,
+                 max_queue: int = 64, max_queue_per_client: int = 8, queue_timeout: float = 10.0):
+        # capacity is the total cost that may be in flight at once. The last
+        # cheap_reserve units are only handed to requests costing <= cheap_cost,
+        # so text-only calls keep flowing while PDF batches saturate the rest.
+        self.capacity = capacity
+        self.cheap_reserve = min(cheap_reserve, capacity - 1)
+        self.cheap_cost = cheap_cost
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.queue_timeout = queue_timeout
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queued = 0
+        self._queued_cost = 0
+        # client -> deque of waiters; clients are served round-robin
+        self._waiting = OrderedDict()
+        # Exponentially weighted seconds of service per cost unit
+        self._seconds_per_unit = 0.05
+
+    def estimate_cost(self, documents: List[Tuple[str, int]], text_bytes: int = 0) -> int:
+        cost = 0
+        for filename, size in documents:
+            _, ext = os.path.splitext(filename.lower())
+            base, unit_bytes = COST_MODEL.get(ext, TEXT_COST)
+            cost += base + size // unit_bytes
+        if text_bytes:
+            base, unit_bytes = TEXT_COST
+            cost += base + text_bytes // unit_bytes
+        # A single huge document still has to be admissible on its own
+        return max(1, min(cost, self.capacity - self.cheap_reserve))
+
+    def _limit_for(self, cost: int) -> int:
+        if cost <= self.cheap_cost:
+            return self.capacity
+        return self.capacity - self.cheap_reserve
+
+    def _fits(self, cost: int) -> bool:
+        return self._in_flight + cost <= self._limit_for(cost)
+
+    def _retry_after(self) -> int:
+        backlog = self._queued_cost + self._in_flight
+        return max(1, math.ceil(backlog * self._seconds_per_unit / self.capacity))
+
+    def _publish(self):
+        metrics.set_gauge('admission.in_flight_cost', self._in_flight)
+        metrics.set_gauge('admission.queue_depth', self._queued)
+        metrics.set_gauge('admission.queued_cost', self._queued_cost)
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        metrics.incr('admission.rejected')
+        metrics.incr(f'admission.rejected.{reason}')
+        return AdmissionRejected(reason, self._retry_after())
+
+    def _dispatch(self):
+        # Grant waiting requests in round-robin order across clients. Only the
+        # head of each client's queue is eligible, which keeps per-client FIFO
+        # while letting a cheap request of one client pass a heavy one of another.
+        progressed = True
+        while progressed and self._waiting:
+            progressed = False
+            for client in list(self._waiting.keys()):
+                queue = self._waiting[client]
+                waiter = queue[0]
+                if not self._fits(waiter['cost']):
+                    continue
+                queue.popleft()
+                if not queue:
+                    del self._waiting[client]
+                else:
+                    self._waiting.move_to_end(client)
+                self._queued -= 1
+                self._queued_cost -= waiter['cost']
+                self._in_flight += waiter['cost']
+                waiter['granted'] = True
+                waiter['event'].set()
+                progressed = True
+
+    def acquire(self, client: str, cost: int) -> Dict:
+        start = time.monotonic()
+        ticket = {'client': client, 'cost': cost, 'start': start}
+        with self._lock:
+            # Cheap requests may bypass queued heavy ones when the reserve has room
+            if self._fits(cost) and (not self._waiting or cost <= self.cheap_cost):
+                self._in_flight += cost
+                self._publish()
+                metrics.incr('admission.admitted')
+                metrics.observe('admission.wait_seconds', 0.0)
+                return ticket
+
+            if self._queued >= self.max_queue:
+                raise self._reject('queue_full')
+            client_queue = self._waiting.get(client)
+            if client_queue is not None and len(client_queue) >= self.max_queue_per_client:
+                raise self._reject('client_queue_full')
+
+            waiter = {'cost': cost, 'event': threading.Event(), 'granted': False}
+            if client_queue is None:
+                client_queue = deque()
+                self._waiting[client] = client_queue
+            client_queue.append(waiter)
+            self._queued += 1
+            self._queued_cost += cost
+            self._dispatch()
+            self._publish()
+
+        waiter['event'].wait(self.queue_timeout)
+
+        with self._lock:
+            if not waiter['granted']:
+                client_queue = self._waiting.get(client)
+                if client_queue is not None:
+                    client_queue.remove(waiter)
+                    if not client_queue:
+                        del self._waiting[client]
+                self._queued -= 1
+                self._queued_cost -= cost
+                self._publish()
+                raise self._reject('queue_timeout')
+            self._publish()
+
+        waited = time.monotonic() - start
+        ticket['start'] = time.monotonic()
+        metrics.incr('admission.admitted')
+        metrics.observe('admission.wait_seconds', waited)
+        return ticket
+
+    def release(self, ticket: Dict):
+        elapsed = time.monotonic() - ticket['start']
+        with self._lock:
+            self._in_flight -= ticket['cost']
+            per_unit = elapsed / ticket['cost']
+            self._seconds_per_unit = 0.9 * self._seconds_per_unit + 0.1 * per_unit
+            self._dispatch()
+            self._publish()
+        metrics.observe('admission.service_seconds', elapsed)
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'cheap_reserve': self.cheap_reserve,
+                'in_flight_cost': self._in_flight,
+                'queue_depth': self._queued,
+                'queued_cost': self._queued_cost,
+                'waiting_clients': len(self._waiting),
+                'seconds_per_unit': round(self._seconds_per_unit, 4)
+            }
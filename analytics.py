@@ -0,0 +1,206 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from metrics import metrics
+
+SCORE_BIN_WIDTH = 10
+# Upper bounds (inclusive) of the experience buckets in years; the last
+# bucket is open-ended
+EXPERIENCE_BUCKETS = [1, 3, 5, 8, 12, 20]
+
+
+def _experience_labels():
+    labels = []
+    low = 0
+    for high in EXPERIENCE_BUCKETS:
+        labels.append(f'{low}-{high}')
+        low = high + 1
+    labels.append(f'{low}+')
+    return labels
+
+
+EXPERIENCE_LABELS = _experience_labels()
+SCORE_LABELS = [f'{low}-{low + SCORE_BIN_WIDTH - 1}' for low in range(0, 100 - SCORE_BIN_WIDTH, SCORE_BIN_WIDTH)] + \
+    [f'{100 - SCORE_BIN_WIDTH}-100']
+
+
+def _evaluated(profile, key: str) -> bool:
+    # Lazy profiles only report fields a comparison actually needed
+    evaluated = getattr(profile, 'evaluated', None)
+    return evaluated(key) if evaluated is not None else key in profile
+
+
+# Running summary of one batch of comparisons against a JD. Every figure is a
+# counter or a fixed-size histogram (skills are bounded by the taxonomy); only
+# the idempotency keys of added results grow with the batch. The JD's document
+# entry is held by the batch itself, so it outlives the DocumentStore's TTL.
+class BatchAnalytics:
+    def __init__(self, batch_id: str = '', jd_document: Optional[Dict] = None, jd_domain: Optional[Dict] = None):
+        self.batch_id = batch_id
+        self.jd_document = jd_document
+        self.jd_domain = jd_domain
+        self.created = time.time()
+        self.updated = self.created
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.errors = 0
+        self.duplicates = 0
+        self._keys = set()
+        self.status_counts = {}
+        self.match_bands = {'strong': 0, 'good': 0, 'weak': 0}
+        self.score_histogram = [0] * len(SCORE_LABELS)
+        self.score_sum = 0.0
+        self.score_min = None
+        self.score_max = None
+        self.rejections_by_domain = {}
+        self.experience_histogram = [0] * len(EXPERIENCE_LABELS)
+        self.experience_sum = 0
+        self.experience_count = 0
+        self.skills_evaluated = 0
+        self.skills_missing = {}
+        self.skills_matched = {}
+
+    def _seen(self, key: str) -> bool:
+        # Called with the lock held; an empty key is never a duplicate
+        if not key:
+            return False
+        if key in self._keys:
+            self.duplicates += 1
+            metrics.incr('batches.duplicates')
+            return True
+        self._keys.add(key)
+        return False
+
+    def add(self, result: Dict, resume_profile=None, jd_profile=None, key: str = '') -> bool:
+        # False (and nothing counted) when a result with this key was already added
+        score = result['final_score']
+        with self._lock:
+            self.updated = time.time()
+            if self._seen(key):
+                return False
+            self.processed += 1
+            self.status_counts[result['status']] = self.status_counts.get(result['status'], 0) + 1
+            # Same bands as the recommendation thresholds
+            band = 'strong' if score >= 75 else 'good' if score >= 60 else 'weak'
+            self.match_bands[band] += 1
+            self.score_histogram[min(int(score // SCORE_BIN_WIDTH), len(self.score_histogram) - 1)] += 1
+            self.score_sum += score
+            self.score_min = score if self.score_min is None else min(self.score_min, score)
+            self.score_max = score if self.score_max is None else max(self.score_max, score)
+            if self.jd_domain is None:
+                self.jd_domain = result.get('jd_domain')
+            if result['status'] == 'REJECT':
+                domain = result['resume_domain']['domain_name']
+                self.rejections_by_domain[domain] = self.rejections_by_domain.get(domain, 0) + 1
+
+            # Experience and skills only count where the comparison looked at
+            # them, so short-circuited mismatches cost nothing extra here
+            if resume_profile is not None and _evaluated(resume_profile, 'experience'):
+                years = resume_profile['experience']
+                bucket = next((i for i, high in enumerate(EXPERIENCE_BUCKETS) if years <= high),
+                              len(EXPERIENCE_BUCKETS))
+                self.experience_histogram[bucket] += 1
+                self.experience_sum += years
+                self.experience_count += 1
+            if (resume_profile is not None and jd_profile is not None and _evaluated(resume_profile, 'skills')
+                    and _evaluated(jd_profile, 'skills')):
+                self.skills_evaluated += 1
+                resume_skills = resume_profile['skills']
+                for category, required in jd_profile['skills'].items():
+                    have = set(resume_skills.get(category, ()))
+                    for skill in set(required):
+                        counts = self.skills_matched if skill in have else self.skills_missing
+                        counts[(category, skill)] = counts.get((category, skill), 0) + 1
+        return True
+
+    def add_error(self, key: str = '') -> bool:
+        with self._lock:
+            self.updated = time.time()
+            if self._seen(key):
+                return False
+            self.errors += 1
+        return True
+
+    def snapshot(self, top_skills: int = 10) -> Dict:
+        def ranked(counts):
+            rows = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top_skills]
+            return [{'skill': skill, 'category': category, 'count': count} for (category, skill), count in rows]
+
+        with self._lock:
+            return {
+                'batch_id': self.batch_id,
+                'jd_domain': self.jd_domain,
+                'created': round(self.created, 3),
+                'updated': round(self.updated, 3),
+                'processed': self.processed,
+                'errors': self.errors,
+                'duplicates': self.duplicates,
+                'status_counts': dict(self.status_counts),
+                'match_bands': dict(self.match_bands),
+                'score': {
+                    'mean': round(self.score_sum / self.processed, 1) if self.processed else None,
+                    'min': self.score_min,
+                    'max': self.score_max
+                },
+                'score_histogram': [{'range': label, 'count': count}
+                                    for label, count in zip(SCORE_LABELS, self.score_histogram)],
+                'rejections_by_domain': dict(self.rejections_by_domain),
+                'experience': {
+                    'evaluated': self.experience_count,
+                    'mean': round(self.experience_sum / self.experience_count, 1) if self.experience_count else None
+                },
+                'experience_histogram': [{'range': label, 'count': count}
+                                         for label, count in zip(EXPERIENCE_LABELS, self.experience_histogram)],
+                'skills': {
+                    'evaluated': self.skills_evaluated,
+                    'missing': ranked(self.skills_missing),
+                    'matched': ranked(self.skills_matched)
+                }
+            }
+
+
+# Named batches that /analyze requests can add to. Batches expire ttl
+# seconds after their last update; the oldest is dropped when full. The
+# registry is per process: batches are not shared between workers.
+class BatchRegistry:
+    def __init__(self, ttl: float = 3600, max_batches: int = 100):
+        self.ttl = ttl
+        self.max_batches = max_batches
+        self._lock = threading.Lock()
+        self._batches = OrderedDict()
+
+    def create(self, jd_document: Dict, jd_domain: Optional[Dict] = None) -> BatchAnalytics:
+        batch = BatchAnalytics(uuid.uuid4().hex, jd_document, jd_domain)
+        with self._lock:
+            self._expire()
+            self._batches[batch.batch_id] = batch
+            while len(self._batches) > self.max_batches:
+                self._batches.popitem(last=False)
+                metrics.incr('batches.evicted')
+            metrics.set_gauge('batches.active', len(self._batches))
+        return batch
+
+    def get(self, batch_id: str) -> Optional[BatchAnalytics]:
+        with self._lock:
+            self._expire()
+            batch = self._batches.get(batch_id)
+            if batch is not None:
+                self._batches.move_to_end(batch_id)
+            return batch
+
+    def delete(self, batch_id: str) -> bool:
+        with self._lock:
+            removed = self._batches.pop(batch_id, None) is not None
+            metrics.set_gauge('batches.active', len(self._batches))
+        return removed
+
+    def _expire(self):
+        now = time.time()
+        expired = [batch_id for batch_id, batch in self._batches.items() if batch.updated + self.ttl <= now]
+        for batch_id in expired:
+            del self._batches[batch_id]
+        if expired:
+            metrics.incr('batches.expired', len(expired))
@@ -1,365 +1,515 @@
-from flask import Flask, request, jsonify, render_template_string
-import PyPDF2
-import docx2txt
-import re
-from typing import Dict, List
+from flask import Flask, g, has_request_context, request, jsonify, render_template_string
+import gzip
+import heapq
+import ipaddress
+import json
+import time
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
 import os
+import tracemalloc
+import uuid
 from werkzeug.utils import secure_filename
+import stages
+from admission import AdmissionController, AdmissionRejected
+from metrics import metrics
+from slowlog import SlowRequestLog
+from workload import WorkloadLog
+from sandbox import ExtractionSandbox
+from profiling import profile_call
+from matcher import DomainMatcher
+from extractors import record_attempts as record_extraction, registry as extractor_registry
+from documents import DocumentStore, content_hash
+from dedup import NearDuplicateIndex, fingerprint, group_duplicates
+from profile_store import ProfileStore
+from shards import ShardCoordinator, authkey_from_env as shard_authkey
+from analytics import BatchAnalytics, BatchRegistry
+from search_index import QueryError, SearchIndex
+from shared_cache import SharedCache, code_version, default_path as default_cache_path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 
+# Admission control: total cost units in flight, units reserved for cheap
+# (text-only) requests, and bounds on the waiting queue
+app.config['ADMISSION_CAPACITY'] = int(os.environ.get('ADMISSION_CAPACITY', 16))
+app.config['ADMISSION_CHEAP_RESERVE'] = int(os.environ.get('ADMISSION_CHEAP_RESERVE', 4))
+app.config['ADMISSION_MAX_QUEUE'] = int(os.environ.get('ADMISSION_MAX_QUEUE', 64))
+app.config['ADMISSION_MAX_QUEUE_PER_CLIENT'] = int(os.environ.get('ADMISSION_MAX_QUEUE_PER_CLIENT', 8))
+app.config['ADMISSION_QUEUE_TIMEOUT'] = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 10))
+# Proxy addresses or networks (comma separated) whose X-Client-Id and
+# X-Forwarded-For headers identify the client; from anyone else they are
+# ignored and the peer address is used
+app.config['TRUSTED_PROXIES'] = [ipaddress.ip_network(value.strip(), strict=False)
+                                 for value in os.environ.get('TRUSTED_PROXIES', '').split(',') if value.strip()]
+
+# Document extraction runs in killable worker processes with a hard deadline
+app.config['EXTRACTION_SANDBOX'] = os.environ.get('EXTRACTION_SANDBOX', '1') == '1'
+app.config['EXTRACTION_TIMEOUT'] = float(os.environ.get('EXTRACTION_TIMEOUT', 20))
+app.config['EXTRACTION_MEMORY_MB'] = int(os.environ.get('EXTRACTION_MEMORY_MB', 512))
+app.config['EXTRACTION_WORKERS'] = int(os.environ.get('EXTRACTION_WORKERS', 2))
+
+# Preferred text extractors per file type, e.g. "pdf=pymupdf,pypdf2;docx=docx2txt".
+# Installed backends not listed are still tried, in default order, when the
+# listed ones fail. `python extractors.py list` shows what is available.
+app.config['EXTRACTION_BACKENDS'] = os.environ.get('EXTRACTION_BACKENDS', '')
+
+# On-demand profiling of single requests (X-Profile header or ?profile=).
+# Disabled unless PROFILING_ENABLED=1; PROFILING_TOKEN additionally gates it.
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', '0') == '1'
+app.config['PROFILING_TOKEN'] = os.environ.get('PROFILING_TOKEN', '')
+app.config['PROFILING_DIR'] = os.environ.get('PROFILING_DIR', 'profiles')
+app.config['PROFILING_TOP'] = int(os.environ.get('PROFILING_TOP', 25))
+# Only the newest PROFILING_KEEP reports are kept in PROFILING_DIR
+app.config['PROFILING_KEEP'] = int(os.environ.get('PROFILING_KEEP', 50))
+
+# Analysis responses are gzip/brotli compressed when the client accepts it
+# and the encoded body is at least COMPRESSION_MIN_BYTES long
+app.config['COMPRESSION_MIN_BYTES'] = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+app.config['COMPRESSION_LEVEL'] = int(os.environ.get('COMPRESSION_LEVEL', 5))
+
+# Extracted documents and their profiles are kept server-side, addressed by
+# content hash, so they can be reused across analyses
+app.config['DOCUMENT_TTL'] = float(os.environ.get('DOCUMENT_TTL', 3600))
+app.config['DOCUMENT_MAX'] = int(os.environ.get('DOCUMENT_MAX', 1000))
+
+# Near-duplicate resumes (estimated Jaccard similarity of word shingles at or
+# above DEDUP_THRESHOLD) are scored once per group and flagged
+app.config['DEDUP_ENABLED'] = os.environ.get('DEDUP_ENABLED', '1') == '1'
+app.config['DEDUP_THRESHOLD'] = float(os.environ.get('DEDUP_THRESHOLD', 0.85))
+
+# Memory-mapped store of resume profiles (built with bulk_score.py --store)
+# that /corpus/match scans; disabled when unset
+app.config['PROFILE_STORE_DIR'] = os.environ.get('PROFILE_STORE_DIR', '')
+
+# Comma separated host:port list of shard servers (shards.py serve). When set,
+# /corpus/match fans out to them instead of scanning PROFILE_STORE_DIR; shards
+# slower than SHARD_TIMEOUT are left out and the response is marked partial.
+# SHARD_AUTHKEY must be set to the same secret the shards were started with.
+app.config['SHARD_ADDRESSES'] = [a for a in os.environ.get('SHARD_ADDRESSES', '').split(',') if a]
+app.config['SHARD_TIMEOUT'] = float(os.environ.get('SHARD_TIMEOUT', 2.0))
+
+# Optional tracemalloc accounting of peak memory per request stage. Requests
+# whose peak exceeds MEMORY_LOG_THRESHOLD_MB get their breakdown logged.
+# Tracked requests run one at a time, so enable it only to diagnose.
+app.config['MEMORY_ACCOUNTING'] = os.environ.get('MEMORY_ACCOUNTING', '0') == '1'
+app.config['MEMORY_LOG_THRESHOLD_MB'] = float(os.environ.get('MEMORY_LOG_THRESHOLD_MB', 50))
+
+# Requests slower than SLOW_REQUEST_MS are written to a size-rotated JSON-lines
+# log with their stage breakdown and input shapes (hashes, never content);
+# "{pid}" gives every worker its own file
+app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 2000))
+app.config['SLOW_REQUEST_LOG'] = os.environ.get('SLOW_REQUEST_LOG', 'logs/slow_requests-{pid}.jsonl')
+app.config['SLOW_REQUEST_LOG_MAX_MB'] = float(os.environ.get('SLOW_REQUEST_LOG_MAX_MB', 10))
+app.config['SLOW_REQUEST_LOG_BACKUPS'] = int(os.environ.get('SLOW_REQUEST_LOG_BACKUPS', 5))
+
+# Opt-in record of the shape of every analysis request (arrival time, input
+# types, sizes, pages and content hashes, never content) for workload.py replay.
+# Client and batch ids are HMACed with WORKLOAD_SECRET, which recording needs;
+# use the same secret for every worker of a deployment.
+app.config['WORKLOAD_RECORD'] = os.environ.get('WORKLOAD_RECORD', '0') == '1'
+app.config['WORKLOAD_SECRET'] = os.environ.get('WORKLOAD_SECRET', '')
+app.config['WORKLOAD_LOG'] = os.environ.get('WORKLOAD_LOG', 'logs/workload-{pid}.jsonl')
+app.config['WORKLOAD_LOG_MAX_MB'] = float(os.environ.get('WORKLOAD_LOG_MAX_MB', 50))
+app.config['WORKLOAD_LOG_BACKUPS'] = int(os.environ.get('WORKLOAD_LOG_BACKUPS', 5))
+
+# Running analytics of named batches (POST /batches), kept BATCH_TTL seconds
+# after their last update; at most BATCH_MAX are tracked at once. Batches live
+# in the worker that created them, so with several workers a batch's requests
+# must be routed to the same one (e.g. sticky sessions) or run a single worker.
+app.config['BATCH_TTL'] = float(os.environ.get('BATCH_TTL', 3600))
+app.config['BATCH_MAX'] = int(os.environ.get('BATCH_MAX', 100))
+
+# Profiles and comparison results shared by every worker on the host, keyed
+# by content hash, taxonomy version and a digest of the scoring code (SQLite
+# in a private per-user directory on tmpfs by default; the directory must not
+# be writable by other users). Set SHARED_CACHE_PATH to 'off' to disable.
+app.config['SHARED_CACHE_PATH'] = os.environ.get('SHARED_CACHE_PATH', default_cache_path())
+app.config['SHARED_CACHE_MAX_ENTRIES'] = int(os.environ.get('SHARED_CACHE_MAX_ENTRIES', 20000))
+
+# Inverted index of resumes added through POST /search/resumes, kept at
+# SEARCH_INDEX_PATH (a snapshot plus a log every worker appends to; in memory
+# only when empty).
+# SEARCH_INDEX_TOKENS also indexes every word, not just taxonomy terms.
+app.config['SEARCH_INDEX_PATH'] = os.environ.get('SEARCH_INDEX_PATH', 'uploads/search.index')
+app.config['SEARCH_INDEX_TOKENS'] = os.environ.get('SEARCH_INDEX_TOKENS', '0') == '1'
+
+# The web page uploads batch resumes UPLOAD_CONCURRENCY at a time and retries
+# rejected (429) or failed requests up to UPLOAD_RETRIES times
+app.config['UPLOAD_CONCURRENCY'] = int(os.environ.get('UPLOAD_CONCURRENCY', 4))
+app.config['UPLOAD_RETRIES'] = int(os.environ.get('UPLOAD_RETRIES', 3))
+
+if app.config['MEMORY_ACCOUNTING']:
+    tracemalloc.start()
+
 # Create uploads directory
 os.makedirs('uploads', exist_ok=True)
 
-class DomainMatcher:
-    def __init__(self):
-        # Define clear domain patterns
-        self.domains = {
-            'design_verification': {
-                'name': 'Design Verification (DV)',
-                'keywords': [
-                    'design verification', 'dv engineer', 'verification engineer', 'functional verification',
-                    'uvm', 'testbench', 'coverage', 'assertion', 'constrained random', 'verification methodology',
-                    'simulation', 'debugging', 'verification plan', 'test cases', 'coverage analysis',
-                    'formal verification', 'lint', 'cdc', 'equivalence checking', 'verification ip',
-                    'systemverilog', 'verilog', 'verification', 'rtl verification', 'block level verification',
-                    'chip level verification', 'regression', 'test harness'
-                ]
-            },
-            'physical_design': {
-                'name': 'Physical Design (PD)',
-                'keywords': [
-                    'physical design', 'pd engineer', 'backend engineer', 'place and route', 'pnr',
-                    'floorplan', 'floor planning', 'placement', 'routing', 'timing closure', 'sta',
-                    'static timing analysis', 'icc2', 'innovus', 'primetime', 'timing constraints',
-                    'power analysis', 'ir drop', 'signal integrity', 'cts', 'clock tree synthesis',
-                    'post layout', 'parasitic extraction', 'physical verification', 'drc', 'lvs',
-                    'antenna check', 'fill insertion', 'eco', 'metal layer', 'via optimization'
-                ]
-            },
-            'rtl_design': {
-                'name': 'RTL Design',
-                'keywords': [
-                    'rtl design', 'rtl engineer', 'design engineer', 'logic design', 'digital design',
-                    'verilog', 'systemverilog', 'hdl', 'synthesis', 'design compiler', 'rtl coding',
-                    'microarchitecture', 'architecture design', 'functional specification', 'design specification',
-                    'rtl implementation', 'ip design', 'module design', 'interface design',
-                    'protocol implementation', 'datapath design', 'control logic', 'state machine'
-                ]
-            }
-        }
-        
-        # Skills and tools detection
-        self.skill_categories = {
-            'tools': [
-                'synopsys', 'design compiler', 'dc', 'icc2', 'ic compiler', 'primetime', 'pt', 
-                'vcs', 'vcs mx', 'verdi', 'dve', 'spyglass', 'formality', 'star-rc', 'hspice',
-                'cadence', 'innovus', 'encounter', 'genus', 'conformal', 'incisive', 'xcelium',
-                'virtuoso', 'allegro', 'pegasus', 'voltus', 'tempus', 'quantus', 'palladium',
-                'mentor', 'calibre', 'modelsim', 'questasim', 'questa', 'tessent', 'catapult',
-                'xilinx', 'vivado', 'ise', 'vitis', 'quartus', 'altera', 'intel quartus',
-                'python', 'perl', 'tcl', 'matlab', 'git', 'eclipse'
-            ],
-            'protocols': [
-                'axi', 'axi4', 'axi-lite', 'ahb', 'apb', 'amba', 'wishbone',
-                'pcie', 'pci express', 'usb', 'usb2', 'usb3', 'ddr', 'ddr3', 'ddr4', 'ddr5',
-                'serdes', 'ethernet', 'uart', 'spi', 'i2c', 'mipi', 'can'
-            ],
-            'technologies': [
-                'asic', 'fpga', 'soc', 'ip', 'risc', 'arm', 'cpu', 'gpu', 'memory', 'cache', 'pipeline',
-                '7nm', '5nm', '10nm', '14nm', '16nm', '28nm', 'finfet', 'sram', 'dram'
-            ]
-        }
-    
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        try:
-            with open(file_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    try:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                    except Exception:
-                        continue
-                return text if text.strip() else "No text found in PDF"
-        except Exception as e:
-            return f"Error reading PDF: {str(e)}"
-    
-    def extract_text_from_docx(self, file_path: str) -> str:
-        try:
-            text = docx2txt.process(file_path)
-            return text if text and text.strip() else "No readable text found in DOCX file"
-        except Exception as e:
-            return f"Error reading DOCX: {str(e)}"
-    
-    def extract_text_from_txt(self, file_path: str) -> str:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
-        except Exception as e:
-            return f"Error reading TXT: {str(e)}"
-    
-    def extract_text(self, file_path: str) -> str:
-        _, ext = os.path.splitext(file_path.lower())
-        
-        if ext == '.pdf':
-            return self.extract_text_from_pdf(file_path)
-        elif ext == '.docx':
-            return self.extract_text_from_docx(file_path)
-        elif ext == '.txt':
-            return self.extract_text_from_txt(file_path)
+# Initialize matcher
+matcher = DomainMatcher()
+metrics.set_gauge('matcher.startup_seconds', matcher.startup['seconds'])
+print(f"Matcher ready in {matcher.startup['seconds'] * 1000:.1f} ms (version {matcher.startup['version']})")
+
+extractor_registry.configure(app.config['EXTRACTION_BACKENDS'])
+
+sandbox = None
+if app.config['EXTRACTION_SANDBOX']:
+    try:
+        sandbox = ExtractionSandbox(
+            matcher.extract,
+            timeout=app.config['EXTRACTION_TIMEOUT'],
+            memory_limit_mb=app.config['EXTRACTION_MEMORY_MB'],
+            workers=app.config['EXTRACTION_WORKERS'],
+            track_memory=app.config['MEMORY_ACCOUNTING']
+        )
+    except ValueError:
+        print("Process sandbox unavailable on this platform, extracting in-process")
+
+def extract_document(file_path: str, stage_name: str = 'extract') -> Dict:
+    # Backend metrics are recorded here rather than where extraction ran,
+    # which may be a sandbox worker
+    if sandbox is None:
+        extraction = matcher.extract(file_path)
+        record_extraction(extraction['attempts'])
+        extraction['status'] = 'ok'
+        return extraction
+    result = sandbox.run(file_path)
+    recorder = stages.current()
+    if result['peak_bytes'] is not None and recorder is not None:
+        # The parser's object graph lives in the worker, so report it separately
+        recorder.add(f'{stage_name}_worker', result['elapsed'], result['peak_bytes'])
+    if result['status'] == 'ok':
+        extraction = result['value']
+        record_extraction(extraction['attempts'])
+        extraction['status'] = 'ok'
+        return extraction
+    print(f"Extraction {result['status']} for {os.path.basename(file_path)}: {result['value']}")
+    return {'status': result['status'], 'text': f"Error: {result['value']}", 'extractor': '', 'pages': None}
+
+def extract_upload(storage, stage_name: str) -> Dict:
+    # Unique temp name so concurrent uploads of e.g. "resume.pdf" never collide
+    filename = f"{uuid.uuid4().hex}_{secure_filename(storage.filename)}"
+    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    with stages.stage(f'{stage_name}_upload'):
+        storage.save(path)
+    try:
+        with stages.stage(f'{stage_name}_extract'):
+            return extract_document(path, stage_name)
+    finally:
+        os.remove(path)
+
+profile_store = ProfileStore(app.config['PROFILE_STORE_DIR'], matcher) if app.config['PROFILE_STORE_DIR'] else None
+shard_coordinator = ShardCoordinator(app.config['SHARD_ADDRESSES'], shard_authkey(),
+                                     timeout=app.config['SHARD_TIMEOUT']) if app.config['SHARD_ADDRESSES'] else None
+
+search_index = SearchIndex(matcher, tokens=app.config['SEARCH_INDEX_TOKENS'])
+if app.config['SEARCH_INDEX_PATH']:
+    search_index.load(app.config['SEARCH_INDEX_PATH'])
+
+batch_registry = BatchRegistry(ttl=app.config['BATCH_TTL'], max_batches=app.config['BATCH_MAX'])
+
+corpus_duplicates = NearDuplicateIndex(app.config['DEDUP_THRESHOLD'])
+document_store = DocumentStore(ttl=app.config['DOCUMENT_TTL'], max_documents=app.config['DOCUMENT_MAX'],
+                               on_remove=corpus_duplicates.remove)
+
+def store_document(handle: str, text: str, filename: str, size: int, extractor: str = '',
+                   pages: Optional[int] = None) -> Dict:
+    # Profiling is deferred to profile_of(), so near-duplicates that are never
+    # scored on their own never pay for it
+    extra = {'extractor': extractor, 'pages': pages}
+    if app.config['DEDUP_ENABLED']:
+        with stages.stage('fingerprint'):
+            signature = fingerprint(text)
+        match = corpus_duplicates.find(signature, exclude=handle)
+        extra['fingerprint'] = signature
+        if match is not None:
+            extra['near_duplicate_of'] = match[0]
+            extra['similarity'] = round(match[1], 3)
+            metrics.incr('dedup.corpus_duplicates')
+        corpus_duplicates.add(handle, signature)
+    return document_store.put(handle, text, None, filename=filename, size=size, **extra)
+
+def corpus_duplicate(entry: Dict) -> Dict:
+    # Flags a resume that nearly matches one stored earlier (e.g. re-uploaded
+    # after an edit), whatever fields were selected
+    if not entry.get('near_duplicate_of'):
+        return {}
+    return {'near_duplicate_of': entry['near_duplicate_of'], 'similarity': entry['similarity']}
+
+shared_cache = None
+if app.config['SHARED_CACHE_PATH'] not in ('', 'off'):
+    try:
+        shared_cache = SharedCache(app.config['SHARED_CACHE_PATH'], app.config['SHARED_CACHE_MAX_ENTRIES'])
+    except OSError as e:
+        print(f"Shared cache disabled: {e}")
+
+# Bump CACHE_SCHEMA when the shape of cached values changes; code changes to
+# extraction or scoring change the digest by themselves
+CACHE_SCHEMA = 2
+cache_version = f"{matcher.version}:{code_version('matcher', 'sections', 'extractors')}:{CACHE_SCHEMA}"
+
+def profile_of(entry: Dict) -> Dict:
+    # Lazy: experience and skills are extracted the first time a comparison
+    # (or a summary) needs them, then kept with the stored document. Fields
+    # another worker already extracted come from the shared cache.
+    if entry['profile'] is None:
+        with stages.stage('profile'):
+            values = shared_cache.get(f"profile:{cache_version}:{entry['handle']}") if shared_cache else None
+            entry['profile'] = matcher.lazy_profile(entry['text'], values)
+            entry['shared_fields'] = len(values or ())
+    if shared_cache is not None and has_request_context():
+        g.setdefault('profiled', {})[entry['handle']] = entry
+    return entry['profile']
+
+@app.teardown_request
+def share_profiles(error=None):
+    # Publish profiles that gained fields during the request
+    for handle, entry in g.pop('profiled', {}).items():
+        fields = entry['profile'].evaluated_fields()
+        if len(fields) > entry.get('shared_fields', 0):
+            shared_cache.put(f'profile:{cache_version}:{handle}', fields)
+            entry['shared_fields'] = len(fields)
+
+def scored_fields(result: Dict, profile) -> Dict:
+    # The profile fields batch analytics read: experience and skills, only
+    # for comparisons that scored them (same domain)
+    if not result['domains_match'] or result['resume_domain']['primary_domain'] == 'unknown':
+        return {}
+    return {'experience': profile['experience'], 'skills': profile['skills']}
+
+def compare_documents(resume_doc: Dict, jd_doc: Dict, explain: bool) -> Tuple[Dict, Dict, Dict]:
+    # Returns the result and the resume's and JD's scored fields. All three
+    # are cached together, so a cache hit feeds analytics the same figures
+    # without profiling anything.
+    key = f"compare:{cache_version}:{resume_doc['handle']}:{jd_doc['handle']}:{int(explain)}"
+    if shared_cache is not None:
+        cached = shared_cache.get(key)
+        if cached is not None:
+            stages.count('compare_cache_hits')
+            return cached['result'], cached['resume'], cached['jd']
+    with stages.stage('compare'):
+        resume_profile = profile_of(resume_doc)
+        jd_profile = profile_of(jd_doc)
+        result = matcher.compare_profiles(resume_profile, jd_profile, explain=explain)
+        resume_fields = scored_fields(result, resume_profile)
+        jd_fields = scored_fields(result, jd_profile)
+    if shared_cache is not None:
+        shared_cache.put(key, {'result': result, 'resume': resume_fields, 'jd': jd_fields})
+    return result, resume_fields, jd_fields
+
+def extraction_error(extraction: Dict) -> str:
+    # Short code for a failed extraction: the sandbox's status, or from the
+    # backend attempts when extraction ran in-process
+    if extraction['status'] != 'ok':
+        return extraction['status']
+    attempts = extraction.get('attempts') or []
+    if not attempts:
+        return 'unsupported'
+    if any(attempt['outcome'] == 'empty' for attempt in attempts):
+        return 'empty'
+    return 'failed'
+
+def ingest_upload(storage, stage_name: str) -> Dict:
+    # Hash the raw bytes first: a document seen before is not extracted again
+    with stages.stage(f'{stage_name}_hash'):
+        data = storage.stream.read()
+        storage.stream.seek(0)
+        handle = content_hash(data)
+    _, ext = os.path.splitext(storage.filename.lower())
+    shape = {'role': stage_name, 'type': ext.lstrip('.'), 'bytes': len(data), 'sha256': handle}
+    entry = document_store.get(handle)
+    if entry is not None:
+        stages.document(cached=True, pages=entry.get('pages'), text_length=len(entry['text']),
+                        extractor=entry.get('extractor', ''), **shape)
+        return {'status': 'ok', 'entry': entry}
+
+    extraction = extract_upload(storage, stage_name)
+    text = extraction['text']
+    # No extractor means the text is the error message; only its code is
+    # logged, since the logs must not carry document content
+    if not extraction['extractor']:
+        code = extraction_error(extraction)
+        stages.document(cached=False, status=code, extractor='', **shape)
+        return {'status': code, 'error': text}
+    stages.document(cached=False, pages=extraction['pages'], text_length=len(text),
+                    extractor=extraction['extractor'], **shape)
+    return {'status': 'ok', 'entry': store_document(handle, text, storage.filename, len(data),
+                                                    extraction['extractor'], extraction['pages'])}
+
+def ingest_text(text: str, role: str = 'text') -> Dict:
+    data = text.encode('utf-8')
+    handle = content_hash(data)
+    entry = document_store.get(handle)
+    stages.document(role=role, type='text', bytes=len(data), sha256=handle, cached=entry is not None,
+                    text_length=len(text))
+    if entry is None:
+        entry = store_document(handle, text, '', len(data))
+    return entry
+
+slow_log = SlowRequestLog(app.config['SLOW_REQUEST_LOG'], app.config['SLOW_REQUEST_MS'],
+                          int(app.config['SLOW_REQUEST_LOG_MAX_MB'] * 1024 * 1024), app.config['SLOW_REQUEST_LOG_BACKUPS'])
+workload_log = WorkloadLog(app.config['WORKLOAD_LOG'], app.config['WORKLOAD_SECRET'].encode(),
+                           int(app.config['WORKLOAD_LOG_MAX_MB'] * 1024 * 1024),
+                           app.config['WORKLOAD_LOG_BACKUPS']) if app.config['WORKLOAD_RECORD'] else None
+
+admission = AdmissionController(
+    capacity=app.config['ADMISSION_CAPACITY'],
+    cheap_reserve=app.config['ADMISSION_CHEAP_RESERVE'],
+    max_queue=app.config['ADMISSION_MAX_QUEUE'],
+    max_queue_per_client=app.config['ADMISSION_MAX_QUEUE_PER_CLIENT'],
+    queue_timeout=app.config['ADMISSION_QUEUE_TIMEOUT']
+)
+
+def trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in app.config['TRUSTED_PROXIES'])
+
+def client_id() -> str:
+    # Headers are only believed when the peer is a trusted proxy; otherwise a
+    # client could pick a fresh identity per request and dodge its queue bound
+    peer = request.remote_addr or 'unknown'
+    if not trusted_proxy(peer):
+        return peer
+    if request.headers.get('X-Client-Id'):
+        return request.headers['X-Client-Id']
+    hops = [hop.strip() for hop in request.headers.get('X-Forwarded-For', '').split(',') if hop.strip()]
+    # The nearest hop not added by one of our proxies is the client
+    for hop in reversed(hops):
+        if not trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+# Form fields holding one resume per value; each value is charged as a document
+DOCUMENT_LIST_FIELDS = ('resumeTexts', 'resumeHandles')
+
+def request_cost() -> int:
+    documents = []
+    for _, uploads in request.files.lists():
+        for storage in uploads:
+            if not storage.filename:
+                continue
+            stream = storage.stream
+            stream.seek(0, os.SEEK_END)
+            documents.append((storage.filename, stream.tell()))
+            stream.seek(0)
+    text_bytes = 0
+    for field, values in request.form.lists():
+        if field in DOCUMENT_LIST_FIELDS:
+            # A handle costs its scoring; its text was extracted on upload
+            documents.extend((field, len(value) if field == 'resumeTexts' else 0) for value in values)
         else:
-            return "Unsupported file format"
-    
-    def extract_experience(self, text: str) -> int:
-        experience_years = []
-        text_lower = text.lower()
-        
-        patterns = [
-            r'(\d+)\+?\s*years?\s*(?:of\s*)?experience',
-            r'experience\s*(?:of\s*)?(\d+)\+?\s*years?',
-            r'(\d+)\+?\s*yrs?\s*(?:of\s*)?experience',
-            r'(\d+)\+?\s*years?\s*(?:of\s*)?(?:work\s*)?experience',
-            r'(\d+)\+?\s*years?\s*(?:in|working|as|with)',
-            r'working\s*(?:for\s*)?(\d+)\+?\s*years?',
-            r'(\d+)\+?\s*years?\s*working',
-            r'(\d+)\+?\s*years?\s*in\s+(?:the\s+)?(?:field|industry|domain)',
-            r'(\d+)\+?\s*years?\s*(?:of\s*)?(?:professional|career|industry)',
-            r'professional\s*(?:experience\s*(?:of\s*)?)?(\d+)\+?\s*years?',
-            r'career\s*(?:spanning\s*)?(\d+)\+?\s*years?',
-            r'total\s*(?:of\s*)?(\d+)\+?\s*years?',
-            r'over\s*(\d+)\+?\s*years?',
-            r'more\s*than\s*(\d+)\+?\s*years?',
-            r'above\s*(\d+)\+?\s*years?',
-            r'around\s*(\d+)\+?\s*years?',
-            r'approximately\s*(\d+)\+?\s*years?',
-            r'nearly\s*(\d+)\+?\s*years?',
-            r'having\s*(\d+)\+?\s*years?',
-            r'with\s*(\d+)\+?\s*years?\s*(?:of\s*)?(?:experience|expertise)',
-            r'possess\s*(\d+)\+?\s*years?',
-            r'bring\s*(\d+)\+?\s*years?',
-            r'(\d+)\+?\s*years?\s*(?:as\s*)?(?:a\s*)?(?:senior\s*)?(?:lead\s*)?(?:principal\s*)?(?:engineer|developer|designer|architect)',
-            r'(\d+)\+\s*years?\s*of',
-            r'graduated?\s*(?:in\s*)?(\d{4})',
-            r'(?:b\.?tech|be|bachelor|m\.?tech|me|master|mba).*?(?:in\s*)?(\d{4})',
-            r'(?:b\.?tech|be|bachelor|m\.?tech|me|master|mba).*?(\d{4})',
-            r'degree.*?(\d{4})',
-            r'university.*?(\d{4})',
-            r'college.*?(\d{4})'
-        ]
-        
-        # Extract from direct experience patterns
-        direct_patterns = patterns[:-7]
-        for i, pattern in enumerate(direct_patterns):
-            matches = re.findall(pattern, text_lower)
-            if matches:
-                for match in matches:
-                    try:
-                        years = int(match)
-                        if 0 <= years <= 50:
-                            experience_years.append(years)
-                    except:
-                        continue
-        
-        # Calculate from graduation year
-        current_year = 2025
-        graduation_patterns = patterns[-7:]
-        for i, pattern in enumerate(graduation_patterns):
-            matches = re.findall(pattern, text_lower)
-            if matches:
-                for match in matches:
-                    try:
-                        grad_year = int(match)
-                        if 1990 <= grad_year <= current_year - 1:
-                            calculated_years = current_year - grad_year
-                            if calculated_years <= 35:
-                                experience_years.append(calculated_years)
-                    except:
-                        continue
-        
-        # Employment date ranges
-        date_patterns = [
-            r'(\d{4})\s*-\s*(?:present|current|till\s*date|now)',
-            r'(\d{4})\s*to\s*(?:present|current|till\s*date|now)',
-            r'(?:since|from)\s*(\d{4})',
-            r'from\s*(\d{4})\s*to\s*(?:present|current|now)',
-            r'started\s*(?:in\s*)?(\d{4})',
-            r'joining\s*(?:in\s*)?(\d{4})',
-            r'employed\s*(?:since\s*)?(\d{4})'
-        ]
-        
-        for i, pattern in enumerate(date_patterns):
-            matches = re.findall(pattern, text_lower)
-            if matches:
-                for match in matches:
-                    try:
-                        start_year = int(match)
-                        if 1990 <= start_year <= current_year:
-                            calculated_years = current_year - start_year
-                            if calculated_years <= 40:
-                                experience_years.append(calculated_years)
-                    except:
-                        continue
-        
-        result = max(experience_years) if experience_years else 0
-        return result
-    
-    def extract_skills(self, text: str) -> Dict:
-        text_lower = text.lower()
-        found_skills = {
-            'tools': [],
-            'protocols': [],
-            'technologies': []
-        }
-        
-        for category, skills_list in self.skill_categories.items():
-            for skill in skills_list:
-                if skill in text_lower:
-                    found_skills[category].append(skill)
-        
-        return found_skills
-    
-    def detect_domain(self, text: str) -> Dict:
-        text_lower = text.lower()
-        domain_scores = {}
-        matched_keywords = {}
-        
-        for domain_key, domain_info in self.domains.items():
-            score = 0
-            matches = []
-            
-            for keyword in domain_info['keywords']:
-                if keyword in text_lower:
-                    score += 1
-                    matches.append(keyword)
-            
-            domain_scores[domain_key] = score
-            matched_keywords[domain_key] = matches
-        
-        if not any(domain_scores.values()):
-            return {
-                'primary_domain': 'unknown',
-                'domain_name': 'Unknown/Other',
-                'confidence': 0,
-                'all_scores': domain_scores,
-                'matched_keywords': matched_keywords
-            }
-        
-        primary_domain = max(domain_scores, key=domain_scores.get)
-        max_score = domain_scores[primary_domain]
-        total_possible = len(self.domains[primary_domain]['keywords'])
-        confidence = (max_score / total_possible) * 100
-        
-        return {
-            'primary_domain': primary_domain,
-            'domain_name': self.domains[primary_domain]['name'],
-            'confidence': round(confidence, 1),
-            'score': max_score,
-            'total_keywords': total_possible,
-            'all_scores': domain_scores,
-            'matched_keywords': matched_keywords
-        }
-    
-    def compare_domains(self, resume_text: str, jd_text: str) -> Dict:
-        resume_domain = self.detect_domain(resume_text)
-        jd_domain = self.detect_domain(jd_text)
-        domains_match = resume_domain['primary_domain'] == jd_domain['primary_domain']
-        
-        resume_exp = self.extract_experience(resume_text)
-        jd_exp = self.extract_experience(jd_text)
-        exp_match = resume_exp >= jd_exp if jd_exp > 0 else True
-        exp_score = min(resume_exp / jd_exp * 100, 100) if jd_exp > 0 else 100
-        
-        resume_skills = self.extract_skills(resume_text)
-        jd_skills = self.extract_skills(jd_text)
-        
-        skill_scores = {}
-        overall_skill_score = 0
-        total_categories = 0
-        
-        for category in ['tools', 'protocols', 'technologies']:
-            jd_category_skills = set(jd_skills[category])
-            resume_category_skills = set(resume_skills[category])
-            
-            if jd_category_skills:
-                matches = jd_category_skills.intersection(resume_category_skills)
-                score = (len(matches) / len(jd_category_skills)) * 100
-                skill_scores[category] = {
-                    'score': round(score, 1),
-                    'matched': list(matches),
-                    'missing': list(jd_category_skills - matches),
-                    'total_required': len(jd_category_skills)
-                }
-                overall_skill_score += score
-                total_categories += 1
-        
-        overall_skill_score = overall_skill_score / total_categories if total_categories > 0 else 0
-        
-        if resume_domain['primary_domain'] == 'unknown' or jd_domain['primary_domain'] == 'unknown':
-            recommendation = "MANUAL REVIEW"
-            status = "WARNING"
-            reason = "Unable to clearly identify domain from text"
-            final_score = 0
-        elif not domains_match:
-            recommendation = "DOMAIN MISMATCH - DO NOT SEND"
-            status = "REJECT"
-            reason = f"Resume is {resume_domain['domain_name']} but JD requires {jd_domain['domain_name']}"
-            final_score = 0
+            text_bytes += sum(len(value) for value in values)
+    return admission.estimate_cost(documents, text_bytes)
+
+def encode_json(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def json_response(payload, status: int = 200):
+    with stages.stage('encode') as entry:
+        body = encode_json(payload)
+        entry['bytes'] = len(body)
+    return app.response_class(body, status=status, mimetype='application/json')
+
+def compress_response(response):
+    if response.direct_passthrough or response.mimetype != 'application/json' or \
+            'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < app.config['COMPRESSION_MIN_BYTES']:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+
+    with stages.stage('compress') as entry:
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=app.config['COMPRESSION_LEVEL'])
         else:
-            final_score = (overall_skill_score * 0.7) + (exp_score * 0.3)
-            
-            if final_score >= 75 and exp_match:
-                recommendation = "STRONG MATCH - SEND"
-                status = "ACCEPT"
-                reason = f"Domain match with {final_score:.1f}% overall compatibility"
-            elif final_score >= 60 and exp_match:
-                recommendation = "GOOD MATCH - SEND"
-                status = "ACCEPT"
-                reason = f"Domain match with {final_score:.1f}% compatibility"
-            elif final_score >= 45:
-                recommendation = "PARTIAL MATCH - MAYBE SEND"
-                status = "WARNING"
-                reason = f"Domain match but some skill gaps ({final_score:.1f}% match)"
-            else:
-                recommendation = "WEAK MATCH - DO NOT SEND"
-                status = "REJECT"
-                reason = f"Domain match but significant skill/experience gaps ({final_score:.1f}% match)"
-        
-        analysis_text = f"""Experience Analysis:
-- Resume Experience: {resume_exp} years
-- Required Experience: {jd_exp} years  
-- Experience Match: {'Meets requirement' if exp_match else 'Below requirement'}
-- Experience Score: {round(exp_score, 1)}%
-
-Skills Analysis:
-- Overall Skills Score: {round(overall_skill_score, 1)}%
-"""
-        
-        if skill_scores:
-            analysis_text += "\nSkills Breakdown:\n"
-            for category, data in skill_scores.items():
-                analysis_text += f"- {category.title()}: {data['score']}% ({len(data['matched'])}/{data['total_required']})\n"
-                if data['matched']:
-                    analysis_text += f"  Matched: {', '.join(data['matched'][:5])}\n"
-                if data['missing']:
-                    analysis_text += f"  Missing: {', '.join(data['missing'][:5])}\n"
+            compressed = gzip.compress(body, compresslevel=app.config['COMPRESSION_LEVEL'])
+        entry['bytes'] = len(body)
+        entry['compressed_bytes'] = len(compressed)
+        entry['encoding'] = encoding
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def staged(view):
+    # Times every stage of the request, reports them in a Server-Timing header
+    # and aggregates them into /metrics
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        recorder = stages.begin(track_memory=app.config['MEMORY_ACCOUNTING'])
+        arrival = time.time()
+        start = time.perf_counter()
+        try:
+            with recorder.stage('request'):
+                with recorder.stage('parse_request'):
+                    request.files
+                    request.form
+                response = view(*args, **kwargs)
+                response = compress_response(response)
+        finally:
+            stages.end()
+        seconds = time.perf_counter() - start
+        recorder.publish()
+        response.headers['Server-Timing'] = recorder.server_timing()
         
-        return {
-            'recommendation': recommendation,
-            'status': status,
-            'reason': reason,
-            'final_score': round(final_score, 1),
-            'domains_match': domains_match,
-            'resume_domain': resume_domain,
-            'jd_domain': jd_domain,
-            'analysis_text': analysis_text
-        }
+        if slow_log.is_slow(seconds):
+            slow_log.write(recorder, seconds, method=request.method, endpoint=request.path,
+                           status=response.status_code, request_bytes=request.content_length or 0,
+                           response_bytes=response.calculate_content_length() or 0)
 
-# Initialize matcher
-matcher = DomainMatcher()
+        if workload_log is not None and request.method == 'POST':
+            workload_log.write(recorder, arrival, seconds, request.path, response.status_code, client_id(),
+                               batch=request.form.get('batchId', ''), params=request.values.to_dict())
+
+        if recorder.track_memory:
+            peak = recorder.peak_bytes()
+            metrics.observe('memory.request_peak_bytes', peak)
+            if peak > app.config['MEMORY_LOG_THRESHOLD_MB'] * 1024 * 1024:
+                breakdown = ', '.join(f"{entry['name']}={entry.get('peak_bytes', 0) / 1048576:.1f}MB"
+                                      for entry in recorder.stages)
+                metrics.incr('memory.high_requests')
+                app.logger.warning('High memory request %s: peak %.1fMB (%s)', request.path, peak / 1048576, breakdown)
+        return response
+    return wrapper
+
+def admission_controlled(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            with stages.stage('admission_wait'):
+                ticket = admission.acquire(client_id(), request_cost())
+        except AdmissionRejected as e:
+            response = json_response({'error': f'Server busy ({e.reason}), please retry', 'retry_after': e.retry_after}, 429)
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        try:
+            return view(*args, **kwargs)
+        finally:
+            admission.release(ticket)
+    return wrapper
 
 @app.route('/')
 def index():
@@ -928,6 +1078,147 @@ ${data.debug_info}`);
             displaySingleResult(data);
         }
         
+        // Upload settings come from the server config (UPLOAD_CONCURRENCY, UPLOAD_RETRIES)
+        const UPLOAD_CONCURRENCY = {{ upload_concurrency }};
+        const UPLOAD_RETRIES = {{ upload_retries }};
+        const BATCH_STORAGE_KEY = 'jdMatcherBatch';
+        // Only what the result cards need is requested; the analysis text is
+        // shown but not saved, so saved batches stay small
+        const BATCH_RESULT_FIELDS = 'final_score,status,recommendation,reason,domains_match,' +
+            'resume_domain.domain_name,resume_domain.confidence,analysis_text';
+        
+        function fileKey(file) {
+            return `${file.name}:${file.size}:${file.lastModified}`;
+        }
+        
+        function textKey(text) {
+            // FNV-1a, enough to tell pasted job descriptions and file lists apart
+            let hash = 0x811c9dc5;
+            for (let i = 0; i < text.length; i++) {
+                hash ^= text.charCodeAt(i);
+                hash = Math.imul(hash, 0x01000193) >>> 0;
+            }
+            return `text:${text.length}:${hash.toString(16)}`;
+        }
+        
+        function loadSavedBatch(batchKey) {
+            try {
+                const saved = JSON.parse(localStorage.getItem(BATCH_STORAGE_KEY) || 'null');
+                return saved && saved.batchKey === batchKey ? saved : null;
+            } catch (error) {
+                return null;
+            }
+        }
+        
+        function saveBatch(saved) {
+            try {
+                localStorage.setItem(BATCH_STORAGE_KEY, JSON.stringify(saved));
+            } catch (error) {
+                // Storage full or disabled: the batch still runs, it just can't resume
+                console.warn('Could not save batch progress:', error);
+            }
+        }
+        
+        function errorResult(filename, message) {
+            return {
+                filename: filename,
+                error: message,
+                status: 'ERROR',
+                recommendation: 'ERROR',
+                reason: message,
+                final_score: 0
+            };
+        }
+        
+        function sleep(ms) {
+            return new Promise(resolve => setTimeout(resolve, ms));
+        }
+        
+        function retryDelay(response, attempt) {
+            // Honour the server's Retry-After (sent with 429), otherwise back
+            // off exponentially with jitter
+            const retryAfter = response ? parseFloat(response.headers.get('Retry-After')) : NaN;
+            if (!isNaN(retryAfter)) {
+                return retryAfter * 1000;
+            }
+            return Math.min(8000, 500 * 2 ** attempt) * (0.5 + Math.random());
+        }
+        
+        async function postWithRetry(url, buildForm) {
+            // Retries network failures, 429 and 502-504; other responses are returned as they are
+            for (let attempt = 0; ; attempt++) {
+                let response = null;
+                try {
+                    response = await fetch(url, {
+                        method: 'POST',
+                        body: buildForm()
+                    });
+                    if (![429, 502, 503, 504].includes(response.status)) {
+                        return response;
+                    }
+                } catch (error) {
+                    if (attempt >= UPLOAD_RETRIES) {
+                        throw error;
+                    }
+                }
+                if (attempt >= UPLOAD_RETRIES) {
+                    return response;
+                }
+                await sleep(retryDelay(response, attempt));
+            }
+        }
+        
+        async function startBatch(jdFile, jdText) {
+            const response = await postWithRetry('/batches', () => {
+                const formData = new FormData();
+                if (jdFile) {
+                    formData.append('jd', jdFile);
+                } else {
+                    formData.append('jdText', jdText);
+                }
+                return formData;
+            });
+            if (!response.ok) {
+                throw new Error(`Server error (${response.status})`);
+            }
+            const batch = await response.json();
+            if (batch.error) {
+                throw new Error(batch.error);
+            }
+            return batch.batch_id;
+        }
+        
+        async function analyzeFile(file, batchId) {
+            try {
+                const response = await postWithRetry('/analyze', () => {
+                    const formData = new FormData();
+                    formData.append('resume', file);
+                    formData.append('batchId', batchId);
+                    // Lets the server count a retried file only once
+                    formData.append('idempotencyKey', fileKey(file));
+                    formData.append('fields', BATCH_RESULT_FIELDS);
+                    return formData;
+                });
+                
+                if (!response.ok) {
+                    throw new Error(`Server error (${response.status})`);
+                }
+                
+                const data = await response.json();
+                
+                if (data.error) {
+                    return errorResult(file.name, data.error);
+                }
+                return {
+                    filename: file.name,
+                    ...data
+                };
+            } catch (error) {
+                // Never reached the batch (server down, retries exhausted)
+                return {...errorResult(file.name, error.message), unsent: true};
+            }
+        }
+        
         async function processMultipleResumes() {
             const jdFile = document.getElementById('jd').files[0];
             const jdText = document.getElementById('jdText').value.trim();
@@ -936,73 +1227,77 @@ ${data.debug_info}`);
                 throw new Error('Please provide job description (file or text)');
             }
             
-            const results = [];
-            const totalFiles = selectedResumeFiles.length;
-            
-            // Initialize progress
-            updateProgress(0, totalFiles, 'Starting analysis...');
+            const files = [...selectedResumeFiles];
+            const totalFiles = files.length;
+            const jdKey = jdFile ? `file:${fileKey(jdFile)}` : textKey(jdText);
+            const batchKey = `${jdKey}|${textKey(files.map(fileKey).sort().join('\\n'))}`;
             
-            for (let i = 0; i < selectedResumeFiles.length; i++) {
-                const currentFile = selectedResumeFiles[i];
-                
-                // Update progress
-                updateProgress(i, totalFiles, `Processing: ${currentFile.name}`);
-                
-                const formData = new FormData();
-                formData.append('resume', currentFile);
-                
-                if (jdFile) {
-                    formData.append('jd', jdFile);
-                } else {
-                    formData.append('jdText', jdText);
+            // Resume an interrupted batch for the same JD and files if the server still has it
+            let saved = loadSavedBatch(batchKey);
+            if (saved) {
+                const check = await fetch(`/batches/${saved.batchId}`).catch(() => null);
+                if (!check || !check.ok) {
+                    saved = null;
                 }
-                
-                try {
-                    const response = await fetch('/analyze', {
-                        method: 'POST',
-                        body: formData
-                    });
-                    
-                    if (!response.ok) {
-                        throw new Error(`Server error (${response.status})`);
-                    }
-                    
-                    const data = await response.json();
-                    
-                    if (data.error) {
-                        results.push({
-                            filename: currentFile.name,
-                            error: data.error,
-                            status: 'ERROR',
-                            recommendation: 'ERROR',
-                            reason: data.error,
-                            final_score: 0
-                        });
+            }
+            if (!saved) {
+                updateProgress(0, totalFiles, 'Starting analysis...');
+                saved = {batchKey: batchKey, batchId: await startBatch(jdFile, jdText), results: {}};
+                saveBatch(saved);
+            }
+            
+            const pending = files.filter(file => !(fileKey(file) in saved.results));
+            const unsent = new Map();
+            const analysisText = new Map();
+            let completed = totalFiles - pending.length;
+            const inFlight = new Set();
+            updateProgress(completed, totalFiles, completed ? `Resuming: ${completed} already analyzed` : 'Starting analysis...');
+            
+            // A fixed pool of workers pulls files from a shared queue
+            let next = 0;
+            async function worker() {
+                while (next < pending.length) {
+                    const file = pending[next++];
+                    inFlight.add(file.name);
+                    updateProgress(completed, totalFiles, `Processing: ${[...inFlight].join(', ')}`);
+                    const result = await analyzeFile(file, saved.batchId);
+                    inFlight.delete(file.name);
+                    completed++;
+                    // Files the server never got are not saved, so resuming the
+                    // batch sends them again
+                    if (result.unsent) {
+                        unsent.set(fileKey(file), result);
                     } else {
-                        results.push({
-                            filename: currentFile.name,
-                            ...data
-                        });
+                        const {analysis_text, ...summary} = result;
+                        analysisText.set(fileKey(file), analysis_text);
+                        saved.results[fileKey(file)] = summary;
+                        saveBatch(saved);
                     }
-                } catch (error) {
-                    results.push({
-                        filename: currentFile.name,
-                        error: error.message,
-                        status: 'ERROR',
-                        recommendation: 'ERROR',
-                        reason: error.message,
-                        final_score: 0
-                    });
+                    updateProgress(completed, totalFiles, completed === totalFiles ? 'Finalizing results...' :
+                        `Completed: ${file.name}`);
                 }
-                
-                // Update progress after each file
-                updateProgress(i + 1, totalFiles, i + 1 === totalFiles ? 'Finalizing results...' : `Completed: ${currentFile.name}`);
-                
-                // Small delay to show progress
-                await new Promise(resolve => setTimeout(resolve, 100));
             }
+            const workers = Math.max(1, Math.min(UPLOAD_CONCURRENCY, pending.length));
+            await Promise.all(Array.from({length: workers}, worker));
+            
+            // Files analyzed before a resume show their summary without the analysis text
+            const results = files.map(file => unsent.get(fileKey(file)) ||
+                {...saved.results[fileKey(file)], analysis_text: analysisText.get(fileKey(file))});
             
-            displayMultipleResults(results);
+            let analytics = null;
+            try {
+                const analyticsResponse = await fetch(`/batches/${saved.batchId}`);
+                if (analyticsResponse.ok) {
+                    analytics = await analyticsResponse.json();
+                }
+            } catch (error) {
+                analytics = null;
+            }
+            
+            if (unsent.size === 0) {
+                localStorage.removeItem(BATCH_STORAGE_KEY);
+            }
+            displayMultipleResults(results, analytics);
         }
         
         function updateProgress(current, total, message) {
@@ -1054,7 +1349,7 @@ ${data.debug_info}`);
             results.style.display = 'block';
         }
         
-        function displayMultipleResults(results) {
+        function displayMultipleResults(results, analytics) {
             const multipleResults = document.getElementById('multipleResults');
             const resultsContainer = document.getElementById('resultsContainer');
             
@@ -1067,37 +1362,42 @@ ${data.debug_info}`);
             
             resultsContainer.innerHTML = html;
             
-            const totalResumes = results.length;
-            const strongMatches = results.filter(r => (r.final_score || 0) >= 75).length;
-            const goodMatches = results.filter(r => (r.final_score || 0) >= 60 && (r.final_score || 0) < 75).length;
-            const weakMatches = results.filter(r => (r.final_score || 0) < 60).length;
-            const errors = results.filter(r => r.error).length;
-            
-            const firstSuccessfulResult = results.find(r => !r.error && r.jd_domain);
-            if (firstSuccessfulResult) {
-                const jdDomain = firstSuccessfulResult.jd_domain;
-                document.getElementById('jdSummary').innerHTML = `
-                    <div><strong>Required Domain:</strong> ${jdDomain.domain_name || 'Unknown'}</div>
-                    <div><strong>Confidence:</strong> ${jdDomain.confidence || 0}%</div>
-                    <div style="margin-top: 15px;"><strong>Summary:</strong></div>
-                    <div>• <span style="color: #27ae60;">Strong Matches (75%+):</span> ${strongMatches}</div>
-                    <div>• <span style="color: #f39c12;">Good Matches (60-74%):</span> ${goodMatches}</div>
-                    <div>• <span style="color: #e74c3c;">Weak Matches (<60%):</span> ${weakMatches}</div>
-                    ${errors > 0 ? `<div>• <span style="color: #95a5a6;">Errors:</span> ${errors}</div>` : ''}
-                    <div style="margin-top: 10px;"><strong>Total Processed:</strong> ${totalResumes} resumes</div>
-                `;
-            } else {
+            if (!analytics || analytics.error) {
                 document.getElementById('jdSummary').innerHTML = `
                     <div><strong>Analysis Summary:</strong></div>
-                    <div>• <span style="color: #27ae60;">Strong Matches (75%+):</span> ${strongMatches}</div>
-                    <div>• <span style="color: #f39c12;">Good Matches (60-74%):</span> ${goodMatches}</div>
-                    <div>• <span style="color: #e74c3c;">Weak Matches (<60%):</span> ${weakMatches}</div>
-                    ${errors > 0 ? `<div>• <span style="color: #95a5a6;">Errors:</span> ${errors}</div>` : ''}
-                    <div style="margin-top: 10px;"><strong>Total Processed:</strong> ${totalResumes} resumes</div>
-                    <div style="margin-top: 10px; color: #666;"><em>Unable to determine job requirements from provided description</em></div>
+                    <div><strong>Total Processed:</strong> ${results.length} resumes</div>
+                    <div style="margin-top: 10px; color: #666;"><em>Batch summary not available</em></div>
                 `;
+                multipleResults.style.display = 'block';
+                return;
             }
             
+            // Summary figures come from the server-side batch analytics
+            const bands = analytics.match_bands;
+            const jdDomain = analytics.jd_domain;
+            const histogram = (rows) => rows.map(row => `${row.range}: ${row.count}`).join(' | ');
+            const missingSkills = analytics.skills.missing.map(row => `${row.skill} (${row.count})`);
+            const rejections = Object.entries(analytics.rejections_by_domain)
+                .sort((a, b) => b[1] - a[1]).map(([domain, count]) => `${domain} (${count})`);
+            
+            document.getElementById('jdSummary').innerHTML = `
+                ${jdDomain && jdDomain.primary_domain !== 'unknown' ? `
+                    <div><strong>Required Domain:</strong> ${jdDomain.domain_name || 'Unknown'}</div>
+                    <div><strong>Confidence:</strong> ${jdDomain.confidence || 0}%</div>
+                ` : `<div style="color: #666;"><em>Unable to determine job requirements from provided description</em></div>`}
+                <div style="margin-top: 15px;"><strong>Summary:</strong></div>
+                <div>• <span style="color: #27ae60;">Strong Matches (75%+):</span> ${bands.strong}</div>
+                <div>• <span style="color: #f39c12;">Good Matches (60-74%):</span> ${bands.good}</div>
+                <div>• <span style="color: #e74c3c;">Weak Matches (<60%):</span> ${bands.weak}</div>
+                ${analytics.errors > 0 ? `<div>• <span style="color: #95a5a6;">Errors:</span> ${analytics.errors}</div>` : ''}
+                <div style="margin-top: 10px;"><strong>Total Processed:</strong> ${analytics.processed + analytics.errors} resumes</div>
+                ${analytics.score.mean !== null ? `<div><strong>Average Score:</strong> ${analytics.score.mean}%</div>` : ''}
+                <div style="margin-top: 10px;"><strong>Score Distribution:</strong> ${histogram(analytics.score_histogram)}</div>
+                ${analytics.experience.evaluated > 0 ? `<div><strong>Experience (years):</strong> ${histogram(analytics.experience_histogram)}</div>` : ''}
+                ${missingSkills.length > 0 ? `<div><strong>Most Missing Skills:</strong> ${missingSkills.join(', ')}</div>` : ''}
+                ${rejections.length > 0 ? `<div><strong>Rejected Domains:</strong> ${rejections.join(', ')}</div>` : ''}
+            `;
+            
             multipleResults.style.display = 'block';
         }
         
@@ -1105,7 +1405,7 @@ ${data.debug_info}`);
     </script>
 </body>
 </html>
-    """)
+    """, upload_concurrency=app.config['UPLOAD_CONCURRENCY'], upload_retries=app.config['UPLOAD_RETRIES'])
 
 @app.route('/debug-experience', methods=['POST'])
 def debug_experience():
@@ -1129,52 +1429,475 @@ def debug_experience():
     except Exception as e:
         return jsonify({'error': str(e)})
 
+def profiling_requested() -> str:
+    if not app.config['PROFILING_ENABLED']:
+        return ''
+    mode = request.headers.get('X-Profile') or request.args.get('profile', '')
+    if not mode or mode == '0':
+        return ''
+    token = app.config['PROFILING_TOKEN']
+    if token and request.headers.get('X-Profile-Token') != token:
+        return ''
+    return 'sampling' if mode == 'sampling' else 'deterministic'
+
+def profiled(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = profiling_requested()
+        if not mode:
+            return view(*args, **kwargs)
+
+        response, report = profile_call(
+            lambda: view(*args, **kwargs),
+            mode=mode,
+            limit=app.config['PROFILING_TOP'],
+            store_dir=app.config['PROFILING_DIR'],
+            keep=app.config['PROFILING_KEEP']
+        )
+        metrics.incr('profiling.requests')
+        print(f"Profiled {request.path} ({mode}): {report['elapsed_seconds']}s, id {report['profile_id']}")
+
+        payload = response.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload['profile'] = report
+            return json_response(payload, response.status_code)
+        return response
+    return wrapper
+
+@app.route('/metrics')
+def metrics_endpoint():
+    data = metrics.snapshot()
+    data['admission'] = admission.status()
+    data['matcher'] = matcher.startup
+    data['extractors'] = extractor_registry.available()
+    data['search_index'] = search_index.stats()
+    if shared_cache is not None:
+        data['shared_cache'] = shared_cache.stats()
+    return jsonify(data)
+
+def read_document(file_field: str, text_field: str, handle_field: str, label: str):
+    # Returns the stored document entry (or None if nothing was sent) and,
+    # if the input could not be used, an error payload for the response
+    handle = request.form.get(handle_field, '').strip()
+    if handle:
+        entry = document_store.get(handle)
+        if entry is None:
+            return None, {'error': f'{label} document handle not found or expired: {handle}'}
+        stages.document(role=file_field, type='handle', bytes=entry['size'], sha256=handle, cached=True,
+                        pages=entry.get('pages'), text_length=len(entry['text']))
+        return entry, None
+    if file_field in request.files and request.files[file_field].filename:
+        ingested = ingest_upload(request.files[file_field], file_field)
+        if 'error' in ingested:
+            return None, {'error': f"{label} file issue: {ingested['error']}", 'extraction_status': ingested['status']}
+        return ingested['entry'], None
+    text = request.form.get(text_field, '').strip()
+    if len(text) < 20:
+        return None, None
+    return ingest_text(text, file_field), None
+
+def requested_fields() -> List[str]:
+    return [field.strip() for field in request.values.get('fields', '').split(',') if field.strip()]
+
+def explanation_requested(fields: List[str]) -> bool:
+    flag = request.values.get('explain')
+    if flag is not None:
+        return flag == '1'
+    return not fields or 'analysis_text' in fields
+
+def select_fields(result: Dict, fields: List[str]) -> Dict:
+    # fields are top-level keys or one level of nesting, e.g. resume_domain.domain_name
+    if not fields:
+        return result
+    selected = {}
+    for field in fields:
+        head, _, rest = field.partition('.')
+        if head not in result:
+            continue
+        if rest and isinstance(result[head], dict):
+            if rest in result[head]:
+                selected.setdefault(head, {})[rest] = result[head][rest]
+        else:
+            selected[head] = result[head]
+    return selected
+
+def document_summary(entry: Dict, include_text: bool = False, include_profile: bool = False) -> Dict:
+    # The profile is only built when asked for, so uploading a document
+    # costs its extraction and nothing more
+    summary = {
+        'handle': entry['handle'],
+        'filename': entry['filename'],
+        'size': entry['size'],
+        'extractor': entry.get('extractor', ''),
+        'text_length': len(entry['text']),
+        'expires_in': max(0, round(entry['expires'] - time.time()))
+    }
+    if include_profile:
+        profile = profile_of(entry)
+        summary.update({
+            'domain': profile['domain']['domain_name'],
+            'experience': profile['experience'],
+            'skills': profile['skills'],
+            'sections': sorted(profile['sections'])
+        })
+    if entry.get('near_duplicate_of'):
+        summary['near_duplicate_of'] = entry['near_duplicate_of']
+        summary['similarity'] = entry['similarity']
+    if include_text:
+        summary['text'] = entry['text']
+    return summary
+
+@app.route('/documents', methods=['POST'])
+@staged
+@admission_controlled
+def upload_document():
+    try:
+        if 'file' in request.files and request.files['file'].filename:
+            ingested = ingest_upload(request.files['file'], 'document')
+            if 'error' in ingested:
+                return json_response({'error': f"File issue: {ingested['error']}", 'extraction_status': ingested['status']})
+            entry = ingested['entry']
+        else:
+            text = request.form.get('text', '').strip()
+            if len(text) < 20:
+                return json_response({'error': 'Please provide a file or text (at least 20 characters)'})
+            entry = ingest_text(text, 'document')
+        return json_response(document_summary(entry, request.values.get('include_text') == '1',
+                                              request.values.get('include_profile') == '1'))
+    except Exception as e:
+        print(f"Error in documents endpoint: {str(e)}")
+        return json_response({'error': f'Server error: {str(e)}'})
+
+@app.route('/documents/<handle>', methods=['GET'])
+def get_document(handle):
+    entry = document_store.get(handle)
+    if entry is None:
+        return json_response({'error': 'Document not found or expired'}, 404)
+    return json_response(document_summary(entry, request.args.get('include_text') == '1',
+                                          request.args.get('include_profile', '1') == '1'))
+
+@app.route('/documents/<handle>', methods=['DELETE'])
+def delete_document(handle):
+    if not document_store.delete(handle):
+        return json_response({'error': 'Document not found or expired'}, 404)
+    return json_response({'deleted': handle})
+
 @app.route('/analyze', methods=['POST'])
+@staged
+@admission_controlled
+@profiled
 def analyze():
     try:
-        resume_text = ""
-        jd_text = ""
+        # With batchId the result is added to that batch's analytics, and the
+        # batch's JD is used unless another one is sent. A retried request
+        # with the same idempotencyKey is answered but not counted again.
+        batch = None
+        batch_id = request.form.get('batchId', '').strip()
+        idempotency_key = request.form.get('idempotencyKey', '').strip()
+        if batch_id:
+            batch = batch_registry.get(batch_id)
+            if batch is None:
+                return json_response({'error': f'Batch not found or expired: {batch_id}'}, 404)
         
-        if 'resume' in request.files and request.files['resume'].filename:
-            resume_file = request.files['resume']
-            filename = secure_filename(resume_file.filename)
-            resume_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            resume_file.save(resume_path)
-            resume_text = matcher.extract_text(resume_path)
-            os.remove(resume_path)
-            
-            if resume_text.startswith('Error') or resume_text.startswith('No'):
-                return jsonify({'error': f'Resume file issue: {resume_text}'})
-                
-        elif request.form.get('resumeText'):
-            resume_text = request.form.get('resumeText').strip()
+        resume_doc, error = read_document('resume', 'resumeText', 'resumeHandle', 'Resume')
+        if error:
+            if batch is not None:
+                batch.add_error(key=idempotency_key)
+            return json_response(error)
         
-        if 'jd' in request.files and request.files['jd'].filename:
-            jd_file = request.files['jd']
-            filename = secure_filename(jd_file.filename)
-            jd_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            jd_file.save(jd_path)
-            jd_text = matcher.extract_text(jd_path)
-            os.remove(jd_path)
-            
-            if jd_text.startswith('Error') or jd_text.startswith('No'):
-                return jsonify({'error': f'JD file issue: {jd_text}'})
-                
-        elif request.form.get('jdText'):
-            jd_text = request.form.get('jdText').strip()
+        jd_doc, error = read_document('jd', 'jdText', 'jdHandle', 'JD')
+        if error:
+            return json_response(error)
+        if jd_doc is None and batch is not None:
+            jd_doc = batch.jd_document
         
-        if not resume_text or len(resume_text) < 20:
-            return jsonify({'error': 'Please provide resume text (at least 20 characters)'})
+        if resume_doc is None or len(resume_doc['text']) < 20:
+            if batch is not None:
+                batch.add_error(key=idempotency_key)
+            return json_response({'error': 'Please provide resume text (at least 20 characters)'})
         
-        if not jd_text or len(jd_text) < 20:
-            return jsonify({'error': 'Please provide job description text (at least 20 characters)'})
+        if jd_doc is None or len(jd_doc['text']) < 20:
+            return json_response({'error': 'Please provide job description text (at least 20 characters)'})
         
-        results = matcher.compare_domains(resume_text, jd_text)
-        return jsonify(results)
+        fields = requested_fields()
+        results, resume_fields, jd_fields = compare_documents(resume_doc, jd_doc, explanation_requested(fields))
+        if batch is not None:
+            batch.add(results, resume_fields, jd_fields, key=idempotency_key)
+        payload = dict(results)
+        # Which backend extracted each uploaded file (empty for pasted text);
+        # selectable like any other field, e.g. fields=final_score,extractors
+        payload['extractors'] = {'resume': resume_doc.get('extractor', ''), 'jd': jd_doc.get('extractor', '')}
+        payload = select_fields(payload, fields)
+        payload.update(corpus_duplicate(resume_doc))
+        return json_response(payload)
         
     except Exception as e:
         print(f"Error in analyze endpoint: {str(e)}")
-        return jsonify({'error': f'Server error: {str(e)}'})
+        return json_response({'error': f'Server error: {str(e)}'})
+
+# Fields returned per candidate by /analyze-batch unless the client asks otherwise
+BATCH_DEFAULT_FIELDS = ['final_score', 'status', 'recommendation', 'reason', 'domains_match',
+                        'resume_domain.domain_name', 'resume_domain.confidence']
+
+@app.route('/analyze-batch', methods=['POST'])
+@staged
+@admission_controlled
+@profiled
+def analyze_batch():
+    try:
+        jd_doc, error = read_document('jd', 'jdText', 'jdHandle', 'JD')
+        if error:
+            return json_response(error)
+        if jd_doc is None or len(jd_doc['text']) < 20:
+            return json_response({'error': 'Please provide job description text (at least 20 characters)'})
+        
+        fields = requested_fields() or BATCH_DEFAULT_FIELDS
+        explain = explanation_requested(fields)
+        offset = max(0, int(request.values.get('offset', 0)))
+        limit = max(1, int(request.values.get('top_k', request.values.get('limit', 20))))
+        
+        candidates = [(storage.filename, 'file', storage) for storage in request.files.getlist('resumes') if storage.filename]
+        for index, text in enumerate(request.form.getlist('resumeTexts')):
+            candidates.append((f'text_{index + 1}', 'text', text.strip()))
+        for handle in request.form.getlist('resumeHandles'):
+            candidates.append((handle, 'handle', handle.strip()))
+        if not candidates:
+            return json_response({'error': 'Please provide at least one resume (resumes, resumeTexts or resumeHandles)'})
+        
+        # Analytics cover every scored candidate, not just the returned page;
+        # with batchId they accumulate into that batch across requests
+        batch_id = request.form.get('batchId', '').strip()
+        if batch_id:
+            analytics = batch_registry.get(batch_id)
+            if analytics is None:
+                return json_response({'error': f'Batch not found or expired: {batch_id}'}, 404)
+        else:
+            analytics = BatchAnalytics(jd_document=jd_doc)
+        
+        errors = []
+        documents = []
+        for index, (name, kind, source) in enumerate(candidates):
+            if kind == 'handle':
+                entry = document_store.get(source)
+                if entry is None:
+                    errors.append({'filename': name, 'error': 'Document handle not found or expired'})
+                    continue
+                name = entry['filename'] or name
+                stages.document(role='resume', type='handle', bytes=entry['size'], sha256=source, cached=True,
+                                pages=entry.get('pages'), text_length=len(entry['text']))
+            elif kind == 'file':
+                ingested = ingest_upload(source, 'resume')
+                if 'error' in ingested:
+                    errors.append({'filename': name, 'error': ingested['error'], 'extraction_status': ingested['status']})
+                    continue
+                entry = ingested['entry']
+            else:
+                if len(source) < 20:
+                    errors.append({'filename': name, 'error': 'Resume text shorter than 20 characters'})
+                    continue
+                entry = ingest_text(source, 'resume')
+            documents.append((index, name, entry))
+        for _ in errors:
+            analytics.add_error()
+        
+        # Near-duplicates within the batch are scored once, through the first
+        # member of their group
+        if app.config['DEDUP_ENABLED']:
+            representatives = group_duplicates([entry['fingerprint'] for _, _, entry in documents],
+                                               app.config['DEDUP_THRESHOLD'])
+        else:
+            representatives = list(range(len(documents)))
+        
+        # Only the best offset + limit candidates are kept, in a bounded
+        # min-heap ordered by final_score (ties keep submission order)
+        window = offset + limit
+        heap = []
+        status_counts = {}
+        group_results = {}
+        duplicates = 0
+        for position, (index, name, entry) in enumerate(documents):
+            representative = representatives[position]
+            if representative == position:
+                result, resume_fields, jd_fields = compare_documents(entry, jd_doc, explain)
+                group_results[position] = (result, resume_fields, jd_fields)
+            else:
+                # Duplicates are counted with their representative's profile
+                result, resume_fields, jd_fields = group_results[representative]
+                result = dict(result)
+                result['duplicate_of'] = documents[representative][1]
+                duplicates += 1
+            status_counts[result['status']] = status_counts.get(result['status'], 0) + 1
+            analytics.add(result, resume_fields, jd_fields)
+            
+            item = (result['final_score'], -index, name, result, entry)
+            if len(heap) < window:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+        metrics.incr('dedup.batch_duplicates', duplicates)
+        scored = len(documents)
+        
+        ranked = sorted(heap, reverse=True)[offset:offset + limit]
+        results = []
+        for rank, (_, _, name, result, entry) in enumerate(ranked, start=offset + 1):
+            item = select_fields(result, fields)
+            item['filename'] = name
+            item['rank'] = rank
+            if entry.get('extractor'):
+                item['extractor'] = entry['extractor']
+            if 'duplicate_of' in result:
+                item['duplicate_of'] = result['duplicate_of']
+            item.update(corpus_duplicate(entry))
+            results.append(item)
+        
+        return json_response({
+            'total': scored,
+            'offset': offset,
+            'limit': limit,
+            'has_more': offset + limit < scored,
+            'duplicates': duplicates,
+            'status_counts': status_counts,
+            'analytics': analytics.snapshot(),
+            'results': results,
+            'errors': errors
+        })
+        
+    except Exception as e:
+        print(f"Error in analyze-batch endpoint: {str(e)}")
+        return json_response({'error': f'Server error: {str(e)}'})
+
+@app.route('/batches', methods=['POST'])
+@staged
+@admission_controlled
+def create_batch():
+    # Starts a named batch against a JD; /analyze and /analyze-batch requests
+    # carrying its batchId add to its analytics
+    try:
+        jd_doc, error = read_document('jd', 'jdText', 'jdHandle', 'JD')
+        if error:
+            return json_response(error)
+        if jd_doc is None or len(jd_doc['text']) < 20:
+            return json_response({'error': 'Please provide job description text (at least 20 characters)'})
+        jd_domain = profile_of(jd_doc)['domain']
+        batch = batch_registry.create(jd_doc, jd_domain)
+        return json_response({'batch_id': batch.batch_id, 'jd_handle': jd_doc['handle'], 'jd_domain': jd_domain})
+    except Exception as e:
+        print(f"Error in batches endpoint: {str(e)}")
+        return json_response({'error': f'Server error: {str(e)}'})
+
+@app.route('/batches/<batch_id>', methods=['GET'])
+def get_batch(batch_id):
+    batch = batch_registry.get(batch_id)
+    if batch is None:
+        return json_response({'error': 'Batch not found or expired'}, 404)
+    return json_response(batch.snapshot(max(1, int(request.args.get('top_skills', 10)))))
+
+@app.route('/batches/<batch_id>', methods=['DELETE'])
+def delete_batch(batch_id):
+    if not batch_registry.delete(batch_id):
+        return json_response({'error': 'Batch not found or expired'}, 404)
+    return json_response({'deleted': batch_id})
+
+@app.route('/search/resumes', methods=['POST'])
+@staged
+@admission_controlled
+def index_resumes():
+    # Adds resumes to the search index; their ids are the document handles
+    try:
+        added = []
+        errors = []
+        for storage in request.files.getlist('resumes'):
+            if not storage.filename:
+                continue
+            ingested = ingest_upload(storage, 'resume')
+            if 'error' in ingested:
+                errors.append({'filename': storage.filename, 'error': ingested['error']})
+                continue
+            added.append(ingested['entry'])
+        for text in request.form.getlist('resumeTexts'):
+            if len(text.strip()) < 20:
+                errors.append({'filename': '', 'error': 'Resume text shorter than 20 characters'})
+                continue
+            added.append(ingest_text(text.strip(), 'resume'))
+        for handle in request.form.getlist('resumeHandles'):
+            entry = document_store.get(handle.strip())
+            if entry is None:
+                errors.append({'filename': handle, 'error': 'Document handle not found or expired'})
+                continue
+            added.append(entry)
+        if not added and not errors:
+            return json_response({'error': 'Please provide at least one resume (resumes, resumeTexts or resumeHandles)'})
+        
+        with stages.stage('index'):
+            search_index.append([(entry['handle'], entry['text'], profile_of(entry)) for entry in added])
+        return json_response({
+            'added': [{'id': entry['handle'], 'filename': entry['filename']} for entry in added],
+            'errors': errors,
+            'documents': len(search_index)
+        })
+    except Exception as e:
+        print(f"Error in search index endpoint: {str(e)}")
+        return json_response({'error': f'Server error: {str(e)}'})
+
+@app.route('/search', methods=['GET', 'POST'])
+@staged
+def search():
+    # e.g. /search?q=tempus AND voltus&min_experience=5&domain=pd
+    def optional_int(name):
+        value = request.values.get(name, '').strip()
+        return int(value) if value else None
+    
+    try:
+        found = search_index.search(request.values.get('q', ''),
+                                    min_experience=optional_int('min_experience'),
+                                    max_experience=optional_int('max_experience'),
+                                    domain=request.values.get('domain', '').strip() or None,
+                                    limit=max(0, int(request.values.get('limit', 50))))
+    except (QueryError, ValueError) as e:
+        return json_response({'error': f'Invalid search: {str(e)}'}, 400)
+    # Filenames are only known while the document is still stored
+    for result in found['results']:
+        entry = document_store.get(result['id'])
+        if entry is not None and entry['filename']:
+            result['filename'] = entry['filename']
+    return json_response(found)
+
+@app.route('/corpus/match', methods=['POST'])
+@staged
+@admission_controlled
+def corpus_match():
+    try:
+        if profile_store is None and shard_coordinator is None:
+            return json_response({'error': 'No profile store configured (set PROFILE_STORE_DIR or SHARD_ADDRESSES)'},
+                                 404)
+        jd_doc, error = read_document('jd', 'jdText', 'jdHandle', 'JD')
+        if error:
+            return json_response(error)
+        if jd_doc is None or len(jd_doc['text']) < 20:
+            return json_response({'error': 'Please provide job description text (at least 20 characters)'})
+        
+        top_k = max(1, int(request.values.get('top_k', 20)))
+        with stages.stage('corpus_scan'):
+            if shard_coordinator is not None:
+                found = shard_coordinator.query(profile_of(jd_doc), top_k)
+            else:
+                found = profile_store.query(profile_of(jd_doc), top_k)
+        fields = requested_fields() or BATCH_DEFAULT_FIELDS
+        results = []
+        for rank, result in enumerate(found['results'], start=1):
+            item = select_fields(result, fields)
+            item['id'] = result['id']
+            item['rank'] = rank
+            results.append(item)
+        payload = {'scanned': found['scanned'], 'results': results}
+        if shard_coordinator is not None:
+            payload.update({'shards': found['shards'], 'partial': found['partial'],
+                            'failed_shards': found['failed_shards']})
+        return json_response(payload)
+        
+    except Exception as e:
+        print(f"Error in corpus match endpoint: {str(e)}")
+        return json_response({'error': f'Server error: {str(e)}'})
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,249 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Set
+
+from matcher import DomainMatcher
+from profile_store import ProfileStore
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+CSV_FIELDS = ['path', 'final_score', 'status', 'recommendation', 'reason', 'domains_match',
+              'resume_domain', 'confidence', 'experience', 'extractor', 'error']
+
+# Set once per worker process by _init_worker
+_matcher = None
+_jd_profile = None
+_explain = False
+_keep_profiles = False
+
+
+def _init_worker(jd_text: str, explain: bool, keep_profiles: bool = False):
+    global _matcher, _jd_profile, _explain, _keep_profiles
+    _matcher = DomainMatcher()
+    _jd_profile = _matcher.profile_document(jd_text)
+    _explain = explain
+    _keep_profiles = keep_profiles
+
+
+def _score(path: str) -> Dict:
+    record = {'path': path}
+    try:
+        extraction = _matcher.extract(path)
+        text = extraction['text']
+        record['extractor'] = extraction['extractor']
+        # No extractor means the text is the error message
+        if not extraction['extractor']:
+            record['error'] = text
+            return record
+        if len(text.strip()) < 20:
+            record['error'] = 'Resume text shorter than 20 characters'
+            return record
+        # Profiles kept for the store need every field; otherwise experience
+        # and skills are only extracted when the domains match
+        profile = _matcher.profile_document(text) if _keep_profiles else _matcher.lazy_profile(text)
+        result = _matcher.compare_profiles(profile, _jd_profile, explain=_explain)
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+
+    record.update({
+        'final_score': result['final_score'],
+        'status': result['status'],
+        'recommendation': result['recommendation'],
+        'reason': result['reason'],
+        'domains_match': result['domains_match'],
+        'resume_domain': result['resume_domain']['domain_name'],
+        'confidence': result['resume_domain']['confidence']
+    })
+    if _keep_profiles or profile.evaluated('experience'):
+        record['experience'] = profile['experience']
+    if _explain:
+        record['analysis_text'] = result['analysis_text']
+    if _keep_profiles:
+        record['_profile'] = profile
+    return record
+
+
+def collect_inputs(patterns: List[str], recursive: bool) -> List[str]:
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            if recursive:
+                candidates = [os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names]
+            else:
+                candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=recursive)
+        for path in sorted(candidates):
+            if os.path.isfile(path) and path.lower().endswith(SUPPORTED_EXTENSIONS) and path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def output_format(path: str, requested: Optional[str]) -> str:
+    if requested:
+        return requested
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_checkpoint(path: str, fmt: str) -> Set[str]:
+    # Every input already present in the output file counts as done
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                done.add(row['path'])
+        else:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    done.add(json.loads(line)['path'])
+                except (ValueError, KeyError):
+                    # A partially written last line from an interrupted run
+                    continue
+    return done
+
+
+class ResultWriter:
+    def __init__(self, path: str, fmt: str, append: bool):
+        self.fmt = fmt
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+        if fmt == 'jsonl' and exists:
+            self._terminate_partial_line(path)
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            if not exists:
+                self.writer.writeheader()
+
+    def _terminate_partial_line(self, path: str):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                self.file.write('\n')
+
+    def write(self, record: Dict):
+        if self.fmt == 'csv':
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def score_paths(paths: List[str], jd_text: str, workers: int, explain: bool, chunksize: int,
+                keep_profiles: bool = False) -> Iterator[Dict]:
+    if workers <= 1:
+        _init_worker(jd_text, explain, keep_profiles)
+        for path in paths:
+            yield _score(path)
+        return
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(jd_text, explain, keep_profiles)) as pool:
+        for record in pool.imap_unordered(_score, paths, chunksize):
+            yield record
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Score a directory of resumes against one job description')
+    parser.add_argument('inputs', nargs='+', help='Resume files, directories or glob patterns')
+    jd_group = parser.add_mutually_exclusive_group(required=True)
+    jd_group.add_argument('--jd', help='Job description file (pdf, docx or txt)')
+    jd_group.add_argument('--jd-text', help='Job description text')
+    parser.add_argument('-o', '--output', required=True, help='Output file (.csv or .jsonl)')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='Output format (default: from extension)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunksize', type=int, default=8)
+    parser.add_argument('-r', '--recursive', action='store_true', help='Descend into directories / ** globs')
+    parser.add_argument('--overwrite', action='store_true', help='Start over instead of resuming from the output file')
+    parser.add_argument('--explain', action='store_true', help='Include analysis_text (jsonl only)')
+    parser.add_argument('--flush-every', type=int, default=50, help='Checkpoint after this many results')
+    parser.add_argument('--store', help='Also append the resume profiles to this profile store directory')
+    args = parser.parse_args(argv)
+
+    fmt = output_format(args.output, args.format)
+    if args.jd:
+        extraction = DomainMatcher().extract(args.jd)
+        jd_text = extraction['text']
+        if not extraction['extractor']:
+            parser.error(f'JD file issue: {jd_text}')
+    else:
+        jd_text = args.jd_text
+    if len(jd_text.strip()) < 20:
+        parser.error('Job description text must be at least 20 characters')
+
+    paths = collect_inputs(args.inputs, args.recursive)
+    done = set() if args.overwrite else read_checkpoint(args.output, fmt)
+    pending = [path for path in paths if path not in done]
+    print(f"{len(paths)} resumes found, {len(paths) - len(pending)} already scored, "
+          f"{len(pending)} to go with {args.workers} workers", file=sys.stderr)
+
+    writer = ResultWriter(args.output, fmt, append=not args.overwrite)
+    store = ProfileStore(args.store, DomainMatcher()) if args.store else None
+    store_rows = []
+    start = time.perf_counter()
+    processed = 0
+    errors = 0
+    status_counts = {}
+    try:
+        for record in score_paths(pending, jd_text, args.workers, args.explain and fmt == 'jsonl', args.chunksize,
+                                  keep_profiles=store is not None):
+            profile = record.pop('_profile', None)
+            if profile is not None:
+                store_rows.append((os.path.abspath(record['path']), profile))
+            writer.write(record)
+            processed += 1
+            if 'error' in record:
+                errors += 1
+            else:
+                status_counts[record['status']] = status_counts.get(record['status'], 0) + 1
+            if processed % args.flush_every == 0:
+                # Profiles are appended before the checkpoint so a resumed
+                # run never skips a resume missing from the store
+                if store is not None:
+                    store.append(store_rows)
+                    store_rows = []
+                writer.flush()
+                elapsed = time.perf_counter() - start
+                print(f"  {processed}/{len(pending)} scored ({processed / elapsed:.1f}/s)", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("Interrupted, rerun the same command to resume", file=sys.stderr)
+    finally:
+        if store is not None:
+            store.append(store_rows)
+            store.close()
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'found': len(paths),
+        'skipped_from_checkpoint': len(paths) - len(pending),
+        'processed': processed,
+        'errors': errors,
+        'status_counts': status_counts,
+        'elapsed_seconds': round(elapsed, 2),
+        'resumes_per_second': round(processed / elapsed, 2) if elapsed > 0 else 0,
+        'workers': args.workers
+    }
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
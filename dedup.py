@@ -0,0 +1,111 @@
+import re
+import threading
+import zlib
+from typing import List, Optional, Tuple
+
+# One-permutation MinHash: every shingle is hashed once with crc32 and the
+# minimum is kept per bucket, so fingerprinting is a single pass over the
+# words instead of one hash per permutation. Buckets are grouped into LSH
+# bands; two documents become candidates when any band matches exactly.
+NUM_BUCKETS = 64
+BANDS = 16
+ROWS = NUM_BUCKETS // BANDS
+SHINGLE_SIZE = 4
+EMPTY = 0xFFFFFFFF
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def fingerprint(text: str) -> Tuple[int, ...]:
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        words = words + [''] * (SHINGLE_SIZE - len(words))
+    signature = [EMPTY] * NUM_BUCKETS
+    crc32 = zlib.crc32
+    for i in range(len(words) - SHINGLE_SIZE + 1):
+        value = crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode())
+        bucket = value % NUM_BUCKETS
+        value //= NUM_BUCKETS
+        if value < signature[bucket]:
+            signature[bucket] = value
+    return tuple(signature)
+
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    # Estimated Jaccard similarity, ignoring buckets empty in both
+    same = 0
+    used = 0
+    for x, y in zip(a, b):
+        if x == EMPTY and y == EMPTY:
+            continue
+        used += 1
+        if x == y:
+            same += 1
+    return same / used if used else 1.0
+
+
+def band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+# LSH index of fingerprints. Used per batch to group near-duplicates and
+# process-wide to flag resumes already seen in the stored corpus.
+class NearDuplicateIndex:
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._signatures = {}
+
+    def find(self, signature: Tuple[int, ...], exclude: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        best = None
+        with self._lock:
+            candidates = set()
+            for key in band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            for doc_id in candidates:
+                if doc_id == exclude:
+                    continue
+                score = similarity(signature, self._signatures[doc_id])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (doc_id, score)
+        return best
+
+    def add(self, doc_id: str, signature: Tuple[int, ...]):
+        with self._lock:
+            if doc_id in self._signatures:
+                return
+            self._signatures[doc_id] = signature
+            for key in band_keys(signature):
+                self._buckets.setdefault(key, []).append(doc_id)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            signature = self._signatures.pop(doc_id, None)
+            if signature is None:
+                return
+            for key in band_keys(signature):
+                members = self._buckets.get(key)
+                if members and doc_id in members:
+                    members.remove(doc_id)
+                    if not members:
+                        del self._buckets[key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._signatures)
+
+
+def group_duplicates(signatures: List[Tuple[int, ...]], threshold: float = 0.85) -> List[int]:
+    # Maps every position to the position of its group's representative (the
+    # first member seen), so each group only needs scoring once
+    index = NearDuplicateIndex(threshold)
+    representative = []
+    for position, signature in enumerate(signatures):
+        match = index.find(signature)
+        if match is None:
+            index.add(str(position), signature)
+            representative.append(position)
+        else:
+            representative.append(int(match[0]))
+    return representative
@@ -0,0 +1,86 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from metrics import metrics
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# In-memory store of extracted documents keyed by the SHA-256 of their raw
+# bytes. Entries expire ttl seconds after their last use; when full, the
+# least recently used entry is dropped.
+class DocumentStore:
+    def __init__(self, ttl: float = 3600, max_documents: int = 1000, on_remove: Optional[Callable] = None):
+        self.ttl = ttl
+        self.max_documents = max_documents
+        # Called with the handle of every expired, evicted or deleted entry
+        self.on_remove = on_remove
+        self._lock = threading.Lock()
+        self._documents = OrderedDict()
+
+    def _expire(self, now: float):
+        expired = [handle for handle, entry in self._documents.items() if entry['expires'] <= now]
+        for handle in expired:
+            del self._documents[handle]
+            self._removed(handle)
+        if expired:
+            metrics.incr('documents.expired', len(expired))
+
+    def _removed(self, handle: str):
+        if self.on_remove is not None:
+            self.on_remove(handle)
+
+    def get(self, handle: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._documents.get(handle)
+            if entry is None or entry['expires'] <= now:
+                if entry is not None:
+                    del self._documents[handle]
+                    self._removed(handle)
+                metrics.incr('documents.misses')
+                return None
+            entry['expires'] = now + self.ttl
+            self._documents.move_to_end(handle)
+            metrics.incr('documents.hits')
+            return entry
+
+    def put(self, handle: str, text: str, profile: Optional[Dict], filename: str = '', size: int = 0, **extra) -> Dict:
+        now = time.time()
+        entry = {
+            'handle': handle,
+            'filename': filename,
+            'size': size,
+            'text': text,
+            'profile': profile,
+            'created': now,
+            'expires': now + self.ttl
+        }
+        entry.update(extra)
+        with self._lock:
+            self._expire(now)
+            self._documents[handle] = entry
+            self._documents.move_to_end(handle)
+            while len(self._documents) > self.max_documents:
+                evicted, _ = self._documents.popitem(last=False)
+                self._removed(evicted)
+                metrics.incr('documents.evicted')
+            metrics.set_gauge('documents.stored', len(self._documents))
+        return entry
+
+    def delete(self, handle: str) -> bool:
+        with self._lock:
+            removed = self._documents.pop(handle, None) is not None
+            if removed:
+                self._removed(handle)
+            metrics.set_gauge('documents.stored', len(self._documents))
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return len(self._documents)
@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+
+import PyPDF2
+import docx2txt
+
+from metrics import metrics
+
+# Faster extractors are used when installed; PyPDF2 and docx2txt (both in
+# requirements.txt) and the stdlib DOCX reader are always available
+try:
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+try:
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+except ImportError:
+    pdfminer_extract_text = None
+
+try:
+    import docx
+except ImportError:
+    docx = None
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+# Every backend returns (text, page count); the page count is None for
+# formats without fixed pages
+
+def _pdf_pymupdf(path: str) -> Tuple[str, Optional[int]]:
+    with pymupdf.open(path) as document:
+        return '\n'.join(page.get_text() for page in document), document.page_count
+
+
+def _pages_text(reader) -> Tuple[str, Optional[int]]:
+    # Pages that fail to extract are skipped rather than failing the document
+    text = ''
+    for page in reader.pages:
+        try:
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + '\n'
+        except Exception:
+            continue
+    return text, len(reader.pages)
+
+
+def _pdf_pypdf(path: str) -> Tuple[str, Optional[int]]:
+    with open(path, 'rb') as file:
+        return _pages_text(pypdf.PdfReader(file))
+
+
+def _pdf_pypdf2(path: str) -> Tuple[str, Optional[int]]:
+    with open(path, 'rb') as file:
+        return _pages_text(PyPDF2.PdfReader(file))
+
+
+def _pdf_pdfminer(path: str) -> Tuple[str, Optional[int]]:
+    # pdfminer ends every page with a form feed
+    text = pdfminer_extract_text(path)
+    return text, text.count('\f')
+
+
+def _docx_docx2txt(path: str) -> Tuple[str, Optional[int]]:
+    return docx2txt.process(path) or '', None
+
+
+def _docx_python_docx(path: str) -> Tuple[str, Optional[int]]:
+    document = docx.Document(path)
+    lines = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            lines.append('\t'.join(cell.text for cell in row.cells))
+    return '\n'.join(lines), None
+
+
+def _docx_xml(path: str) -> Tuple[str, Optional[int]]:
+    # Reads word/document.xml directly: one line per paragraph
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read('word/document.xml'))
+    lines = []
+    for paragraph in root.iter(f'{WORD_NAMESPACE}p'):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f'{WORD_NAMESPACE}t' and node.text:
+                parts.append(node.text)
+            elif node.tag == f'{WORD_NAMESPACE}tab':
+                parts.append('\t')
+            elif node.tag in (f'{WORD_NAMESPACE}br', f'{WORD_NAMESPACE}cr'):
+                parts.append('\n')
+        lines.append(''.join(parts))
+    return '\n'.join(lines), None
+
+
+def _txt(path: str) -> Tuple[str, Optional[int]]:
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read(), None
+
+
+class ExtractionError(Exception):
+    def __init__(self, message: str, empty: bool, attempts: Optional[List[Dict]] = None):
+        super().__init__(message)
+        # True when at least one backend ran cleanly but found no text
+        self.empty = empty
+        self.attempts = attempts or []
+
+
+# Extractors per file extension, tried in order until one returns text. The
+# default order is fastest first (see `python extractors.py bench`); it can
+# be overridden per type with configure(), e.g. "pdf=pypdf2,pymupdf".
+class ExtractorRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._backends = {}
+        self._order = {}
+
+    def register(self, ext: str, name: str, function: Callable[[str], Tuple[str, Optional[int]]],
+                 available: bool = True):
+        with self._lock:
+            self._backends.setdefault(ext, {})
+            if available:
+                self._backends[ext][name] = function
+                self._order.setdefault(ext, []).append(name)
+
+    def configure(self, spec: str):
+        # Listed backends go first, in the given order; the others stay
+        # behind them as fallbacks. Unknown or unavailable names are ignored.
+        if not spec:
+            return
+        with self._lock:
+            for part in spec.split(';'):
+                ext, _, names = part.partition('=')
+                ext = '.' + ext.strip().lstrip('.').lower()
+                if ext not in self._order:
+                    continue
+                preferred = [name.strip() for name in names.split(',') if name.strip() in self._backends[ext]]
+                self._order[ext] = preferred + [name for name in self._order[ext] if name not in preferred]
+
+    def backends(self, ext: str) -> List[str]:
+        return list(self._order.get(ext, []))
+
+    def available(self) -> Dict[str, List[str]]:
+        return {ext: list(names) for ext, names in self._order.items()}
+
+    def supports(self, ext: str) -> bool:
+        return bool(self._order.get(ext))
+
+    def run(self, name: str, ext: str, path: str) -> Tuple[str, Optional[int]]:
+        return self._backends[ext][name](path)
+
+    def extract(self, path: str) -> Dict:
+        # Returns the text, the backend that produced it, the page count and
+        # every backend tried (see record_attempts). Raises ExtractionError
+        # when no backend produced any text.
+        _, ext = os.path.splitext(path.lower())
+        names = self.backends(ext)
+        if not names:
+            raise ExtractionError('Unsupported file format', empty=False)
+        errors = []
+        attempts = []
+        empty = False
+        for name in names:
+            start = time.perf_counter()
+            try:
+                text, pages = self.run(name, ext, path)
+            except Exception as e:
+                errors.append(f'{name}: {e}')
+                attempts.append({'backend': name, 'outcome': 'failed', 'seconds': time.perf_counter() - start})
+                continue
+            found = bool(text and text.strip())
+            attempts.append({'backend': name, 'outcome': 'ok' if found else 'empty',
+                             'seconds': time.perf_counter() - start})
+            if found:
+                return {'text': text, 'extractor': name, 'pages': pages, 'attempts': attempts}
+            empty = True
+        raise ExtractionError('; '.join(errors), empty=empty, attempts=attempts)
+
+
+def record_attempts(attempts: List[Dict]):
+    # Metrics for one extraction's backend attempts. Kept out of extract() so
+    # that attempts made in a sandbox worker are counted by the parent, whose
+    # metrics /metrics serves.
+    for attempt in attempts:
+        name = attempt['backend']
+        metrics.observe(f'extract.{name}.seconds', attempt['seconds'])
+        if attempt['outcome'] == 'failed':
+            metrics.incr(f'extract.{name}.failures')
+        elif attempt['outcome'] == 'empty':
+            metrics.incr(f'extract.{name}.empty')
+    if len(attempts) > 1 and attempts[-1]['outcome'] == 'ok':
+        metrics.incr('extract.fallbacks')
+
+
+registry = ExtractorRegistry()
+registry.register('.pdf', 'pymupdf', _pdf_pymupdf, pymupdf is not None)
+registry.register('.pdf', 'pypdf2', _pdf_pypdf2)
+registry.register('.pdf', 'pypdf', _pdf_pypdf, pypdf is not None)
+registry.register('.pdf', 'pdfminer', _pdf_pdfminer, pdfminer_extract_text is not None)
+registry.register('.docx', 'docx2txt', _docx_docx2txt)
+registry.register('.docx', 'docx_xml', _docx_xml)
+registry.register('.docx', 'python-docx', _docx_python_docx, docx is not None)
+registry.register('.txt', 'text', _txt)
+registry.configure(os.environ.get('EXTRACTION_BACKENDS', ''))
+
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def word_similarity(a: str, b: str) -> float:
+    words_a = set(_WORD.findall(a.lower()))
+    words_b = set(_WORD.findall(b.lower()))
+    if not words_a and not words_b:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def benchmark(paths: List[Tuple[str, Optional[str]]], repeat: int = 3) -> List[Dict]:
+    # Speed and quality of every available backend. Quality is the word-set
+    # similarity with a sidecar <file>.txt holding the true text, or with the
+    # source text for generated samples.
+    rows = {}
+    for path, truth in paths:
+        _, ext = os.path.splitext(path.lower())
+        for name in registry.backends(ext):
+            row = rows.setdefault((ext, name), {'type': ext.lstrip('.'), 'backend': name, 'documents': 0,
+                                                'failures': 0, 'seconds': 0.0, 'similarity': 0.0, 'chars': 0})
+            try:
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    text, _ = registry.run(name, ext, path)
+                elapsed = (time.perf_counter() - start) / repeat
+            except Exception:
+                row['failures'] += 1
+                continue
+            row['documents'] += 1
+            row['seconds'] += elapsed
+            row['chars'] += len(text)
+            if truth is not None:
+                row['similarity'] += word_similarity(text, truth)
+    report = []
+    for row in rows.values():
+        done = row['documents']
+        report.append({
+            'type': row['type'],
+            'backend': row['backend'],
+            'documents': done,
+            'failures': row['failures'],
+            'mean_ms': round(row['seconds'] / done * 1000, 3) if done else None,
+            'mean_chars': round(row['chars'] / done) if done else None,
+            'similarity': round(row['similarity'] / done, 3) if done else None
+        })
+    return sorted(report, key=lambda row: (row['type'], row['mean_ms'] is None, row['mean_ms'] or 0))
+
+
+def _sample_documents(directory: str) -> List[Tuple[str, str]]:
+    from loadtest import RESUME_TEXTS, make_docx, make_pdf, make_text
+
+    samples = []
+    for domain in RESUME_TEXTS:
+        for repeat in (0, 20):
+            text = make_text(domain, repeat)
+            for ext, data in (('.pdf', make_pdf(text)), ('.docx', make_docx(text))):
+                path = os.path.join(directory, f'{domain}-{repeat}{ext}')
+                with open(path, 'wb') as f:
+                    f.write(data)
+                samples.append((path, text))
+    return samples
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Text extraction backends')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='Show the available backends in the order they are tried')
+    bench = sub.add_parser('bench', help='Compare backend speed and quality')
+    bench.add_argument('files', nargs='*', help='Documents to extract (default: generated samples)')
+    bench.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        print(json.dumps(registry.available(), indent=2))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.files:
+            paths = []
+            for path in args.files:
+                truth = None
+                if os.path.exists(path + '.txt'):
+                    with open(path + '.txt', encoding='utf-8') as f:
+                        truth = f.read()
+                paths.append((path, truth))
+        else:
+            paths = _sample_documents(directory)
+        report = benchmark(paths, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,401 @@
+import argparse
+import io
+import json
+import math
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zipfile
+from typing import Dict, List, Optional, Tuple, Union
+
+# Synthetic documents for each domain. Sizes are padded out to realistic
+# resume lengths so extraction and matching do representative work.
+RESUME_TEXTS = {
+    'dv': """Senior Design Verification Engineer with 6 years of experience in functional verification.
+Built UVM testbench environments in SystemVerilog with constrained random stimulus, coverage analysis
+and assertion based checks. Owned verification plan, regression and debugging for AXI4 and PCIe IP.
+Tools: VCS, Verdi, Questasim, Python, Perl. Worked on 7nm SoC and FPGA prototypes.""",
+    'pd': """Physical Design Engineer with 5 years of experience in place and route and timing closure.
+Floorplan, placement, clock tree synthesis (CTS), routing, static timing analysis with PrimeTime,
+IR drop and signal integrity fixes, DRC and LVS cleanup with Calibre. Tools: Innovus, ICC2, Tempus,
+Voltus, TCL scripting. Delivered 5nm FinFET blocks for CPU and GPU subsystems.""",
+    'rtl': """RTL Design Engineer with 7 years of experience in digital design and microarchitecture.
+RTL coding in Verilog and SystemVerilog, synthesis with Design Compiler, lint and CDC checks,
+datapath design, control logic and state machine implementation for AMBA AHB/APB and DDR4 controllers.
+Tools: Spyglass, Genus, Conformal, Python. ASIC tapeouts at 16nm and 7nm.""",
+}
+
+JD_TEXT = """We are hiring a Design Verification Engineer with 5+ years of experience.
+Responsibilities: UVM testbench development, coverage closure, assertion based verification,
+constrained random simulation and regression debugging of AXI4 and PCIe subsystems.
+Required tools: VCS, Verdi, Python. Experience with SoC verification at 7nm is a plus."""
+
+FILLER = """Responsibilities included working with cross functional teams, writing documentation,
+reviewing specifications, mentoring junior engineers and presenting status to stakeholders.
+"""
+
+
+def make_text(domain: str, repeat: int) -> str:
+    return RESUME_TEXTS[domain] + "\n" + FILLER * repeat
+
+
+def make_pdf(text: str, per_page: int = 50, padding: int = 0) -> bytes:
+    # Minimal single-font PDF with one text line per input line. padding adds
+    # that many bytes of comments, for files sized like real ones.
+    lines = []
+    for line in text.splitlines():
+        escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+        lines.append(f"({escaped}) Tj T*")
+    pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+
+    objects = []
+    page_ids = []
+    font_id = 3
+    next_id = 4
+    page_objects = []
+    for page_lines in pages:
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td\n" + "\n".join(page_lines) + "\nET"
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        page_ids.append(page_id)
+        page_objects.append((content_id, f"<< /Length {len(stream.encode('latin-1', 'replace'))} >>\nstream\n{stream}\nendstream"))
+        page_objects.append((page_id, f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                                      f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"))
+
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append((1, "<< /Type /Catalog /Pages 2 0 R >>"))
+    objects.append((2, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"))
+    objects.append((font_id, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"))
+    objects.extend(page_objects)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    while padding > 0:
+        out.write(b"%" + b"0" * max(0, min(padding, 80) - 2) + b"\n")
+        padding -= 80
+    offsets = {}
+    for obj_id, body in objects:
+        offsets[obj_id] = out.tell()
+        out.write(f"{obj_id} 0 obj\n{body}\nendobj\n".encode('latin-1', 'replace'))
+    xref = out.tell()
+    out.write(f"xref\n0 {next_id}\n0000000000 65535 f \n".encode())
+    for obj_id in range(1, next_id):
+        out.write(f"{offsets[obj_id]:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {next_id} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def make_docx(text: str, padding: int = 0) -> bytes:
+    paragraphs = []
+    for line in text.splitlines():
+        escaped = line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        paragraphs.append(f'<w:p><w:r><w:t xml:space="preserve">{escaped}</w:t></w:r></w:p>')
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{"".join(paragraphs)}</w:body></w:document>')
+    content_types = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                     '<Default Extension="xml" ContentType="application/xml"/>'
+                     '<Override PartName="/word/document.xml" '
+                     'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+                     '</Types>')
+    rels = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/></Relationships>')
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', content_types)
+        archive.writestr('_rels/.rels', rels)
+        archive.writestr('word/document.xml', document)
+        if padding > 0:
+            # Stored uncompressed, like the images that make real documents large
+            archive.writestr('word/media/padding.bin', b'\0' * padding, compress_type=zipfile.ZIP_STORED)
+    return out.getvalue()
+
+
+def encode_multipart(fields: Dict[str, Union[str, List[str]]],
+                     files: Dict[str, Union[Tuple[str, bytes, str], List[Tuple[str, bytes, str]]]]) -> Tuple[bytes, str]:
+    # A list value sends the name once per item
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, values in fields.items():
+        for value in values if isinstance(values, list) else [values]:
+            body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode())
+            body.write(value.encode('utf-8'))
+            body.write(b'\r\n')
+    for name, uploads in files.items():
+        for filename, data, content_type in uploads if isinstance(uploads, list) else [uploads]:
+            body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                       f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n'.encode())
+            body.write(data)
+            body.write(b'\r\n')
+    body.write(f'--{boundary}--\r\n'.encode())
+    return body.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'txt': 'text/plain',
+}
+
+
+def build_corpus(repeat: int) -> Dict[str, List[Tuple[str, bytes]]]:
+    corpus = {'text': [], 'pdf': [], 'docx': []}
+    for domain in RESUME_TEXTS:
+        text = make_text(domain, repeat)
+        corpus['text'].append((f'{domain}.txt', text.encode('utf-8')))
+        corpus['pdf'].append((f'{domain}.pdf', make_pdf(text)))
+        corpus['docx'].append((f'{domain}.docx', make_docx(text)))
+    return corpus
+
+
+def post_analyze(base_url: str, kind: str, document: Tuple[str, bytes], client: str,
+                 timeout: float) -> Tuple[int, bool, float]:
+    filename, data = document
+    if kind == 'text':
+        body, content_type = encode_multipart({'resumeText': data.decode('utf-8'), 'jdText': JD_TEXT}, {})
+    else:
+        body, content_type = encode_multipart({'jdText': JD_TEXT}, {'resume': (filename, data, CONTENT_TYPES[kind])})
+    req = urllib.request.Request(base_url.rstrip('/') + '/analyze', data=body, method='POST',
+                                 headers={'Content-Type': content_type, 'X-Client-Id': client})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            payload = json.loads(response.read() or b'{}')
+            status = response.status
+            ok = 'error' not in payload
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, ok = e.code, False
+    except Exception:
+        status, ok = 0, False
+    return status, ok, time.perf_counter() - start
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    # Nearest rank: the smallest value with at least pct% of samples at or below it
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        # Kinds made of requests recorded on their own (a batch and its
+        # items); reported per type but left out of the overall figures
+        self.composite = set()
+
+    def add(self, kind: str, status: int, ok: bool, latency: float, composite: bool = False):
+        with self._lock:
+            self.samples.setdefault(kind, []).append((status, ok, latency))
+            if composite:
+                self.composite.add(kind)
+
+    def report(self, elapsed: float) -> Dict:
+        def summarize(samples):
+            latencies = [latency for _, _, latency in samples]
+            errors = sum(1 for _, ok, _ in samples if not ok)
+            return {
+                'requests': len(samples),
+                'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+                'error_rate': round(errors / len(samples), 4) if samples else 0,
+                'rejected_429': sum(1 for status, _, _ in samples if status == 429),
+                'latency_ms': {
+                    'p50': round(percentile(latencies, 50) * 1000, 1),
+                    'p95': round(percentile(latencies, 95) * 1000, 1),
+                    'p99': round(percentile(latencies, 99) * 1000, 1),
+                    'max': round(max(latencies) * 1000, 1) if latencies else 0,
+                }
+            }
+
+        with self._lock:
+            everything = [s for kind, samples in self.samples.items() if kind not in self.composite for s in samples]
+            return {
+                'elapsed_seconds': round(elapsed, 2),
+                'overall': summarize(everything),
+                'by_type': {kind: summarize(samples) for kind, samples in sorted(self.samples.items())}
+            }
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(','):
+        kind, _, weight = part.partition('=')
+        kind = kind.strip()
+        if kind not in ('text', 'pdf', 'docx', 'batch'):
+            raise ValueError(f'Unknown request type in mix: {kind}')
+        mix.append((kind, float(weight or 1)))
+    return mix
+
+
+def run_job(args, corpus, recorder: Recorder, rng: random.Random, mix: List[Tuple[str, float]], client: str):
+    kinds, weights = zip(*mix)
+    kind = rng.choices(kinds, weights)[0]
+    if kind != 'batch':
+        status, ok, latency = post_analyze(args.url, kind, rng.choice(corpus[kind]), client, args.timeout)
+        recorder.add(kind, status, ok, latency)
+        return
+
+    # A batch is one recruiter sending several resumes against the same JD,
+    # the way the embedded page does
+    start = time.perf_counter()
+    batch_ok, batch_status = True, 200
+    file_kinds = [k for k in ('pdf', 'docx', 'text') if k in corpus]
+    for _ in range(args.batch_size):
+        item_kind = rng.choice(file_kinds)
+        status, ok, latency = post_analyze(args.url, item_kind, rng.choice(corpus[item_kind]), client, args.timeout)
+        recorder.add(f'batch_item_{item_kind}', status, ok, latency)
+        if not ok:
+            batch_ok, batch_status = False, status
+    recorder.add('batch', batch_status, batch_ok, time.perf_counter() - start, composite=True)
+
+
+def run_closed_loop(args, corpus, recorder, mix):
+    deadline = time.monotonic() + args.duration
+    counter = {'remaining': args.requests}
+    lock = threading.Lock()
+
+    def user(index: int):
+        rng = random.Random(args.seed + index)
+        client = f'loadtest-{index % args.clients}'
+        while time.monotonic() < deadline:
+            if args.requests:
+                with lock:
+                    if counter['remaining'] <= 0:
+                        return
+                    counter['remaining'] -= 1
+            run_job(args, corpus, recorder, rng, mix, client)
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def run_open_loop(args, corpus, recorder, mix):
+    # Poisson arrivals at the requested rate, independent of response times
+    rng = random.Random(args.seed)
+    deadline = time.monotonic() + args.duration
+    threads = []
+    sent = 0
+    next_arrival = time.monotonic()
+    while time.monotonic() < deadline and (not args.requests or sent < args.requests):
+        delay = next_arrival - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        job_rng = random.Random(rng.random())
+        client = f'loadtest-{sent % args.clients}'
+        thread = threading.Thread(target=run_job, args=(args, corpus, recorder, job_rng, mix, client), daemon=True)
+        thread.start()
+        threads.append(thread)
+        sent += 1
+        next_arrival += rng.expovariate(args.rate)
+    for thread in threads:
+        thread.join()
+
+
+def wait_until_ready(url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url.rstrip('/') + '/', timeout=2):
+                return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server at {url} did not become ready within {timeout}s')
+
+
+# The tools name their clients with X-Client-Id, which the app only believes
+# from a trusted proxy; the started server trusts the loopback address
+LOOPBACK_PROXIES = '127.0.0.1/32,::1/128'
+
+
+def start_server(args) -> Optional[subprocess.Popen]:
+    if args.no_server:
+        return None
+    env = dict(os.environ, PORT=str(args.port))
+    env['TRUSTED_PROXIES'] = ','.join(value for value in (env.get('TRUSTED_PROXIES', ''), LOOPBACK_PROXIES) if value)
+    for assignment in args.env:
+        key, _, value = assignment.partition('=')
+        env[key] = value
+    if args.server_command:
+        command = shlex.split(args.server_command.format(port=args.port, python=sys.executable))
+    else:
+        command = [sys.executable, 'app.py']
+    process = subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Replay a mixed /analyze workload against a local instance')
+    parser.add_argument('--url', help='Target an already running server instead of starting one')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--command', dest='server_command',
+                        help='Serving command, e.g. "gunicorn -w 4 -b 127.0.0.1:{port} app:app"')
+    parser.add_argument('--env', action='append', default=[], help='KEY=VALUE passed to the started server')
+    parser.add_argument('--mix', default='text=4,pdf=3,docx=2,batch=1', help='Weighted request types')
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=8, help='Closed-loop virtual users')
+    parser.add_argument('--rate', type=float, help='Open-loop arrivals per second (overrides --concurrency)')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--requests', type=int, default=0, help='Stop after this many jobs (0 = duration only)')
+    parser.add_argument('--clients', type=int, default=4,
+                        help='Distinct X-Client-Id values to spread jobs over (a --url server must '
+                             'list 127.0.0.1 in TRUSTED_PROXIES)')
+    parser.add_argument('--doc-repeat', type=int, default=20, help='Filler paragraphs per synthetic document')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the JSON report here as well as stdout')
+    args = parser.parse_args(argv)
+
+    args.no_server = bool(args.url)
+    if not args.url:
+        args.url = f'http://127.0.0.1:{args.port}'
+
+    mix = parse_mix(args.mix)
+    corpus = build_corpus(args.doc_repeat)
+    server = start_server(args)
+    try:
+        wait_until_ready(args.url, 60)
+        recorder = Recorder()
+        start = time.perf_counter()
+        if args.rate:
+            run_open_loop(args, corpus, recorder, mix)
+        else:
+            run_closed_loop(args, corpus, recorder, mix)
+        report = recorder.report(time.perf_counter() - start)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+    report['config'] = {
+        'url': args.url, 'command': args.server_command, 'env': args.env, 'mix': args.mix,
+        'batch_size': args.batch_size, 'concurrency': None if args.rate else args.concurrency,
+        'rate': args.rate, 'duration': args.duration
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()
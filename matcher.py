@@ -0,0 +1,478 @@
+import os
+import re
+import time
+from collections.abc import Mapping
+from typing import Dict, Optional
+
+import extractors
+import snapshot
+import stages
+from sections import section_text, segment
+
+# Explicit "N years" statements
+DIRECT_EXPERIENCE_PATTERNS = [
+    r'(\d+)\+?\s*years?\s*(?:of\s*)?experience',
+    r'experience\s*(?:of\s*)?(\d+)\+?\s*years?',
+    r'(\d+)\+?\s*yrs?\s*(?:of\s*)?experience',
+    r'(\d+)\+?\s*years?\s*(?:of\s*)?(?:work\s*)?experience',
+    r'(\d+)\+?\s*years?\s*(?:in|working|as|with)',
+    r'working\s*(?:for\s*)?(\d+)\+?\s*years?',
+    r'(\d+)\+?\s*years?\s*working',
+    r'(\d+)\+?\s*years?\s*in\s+(?:the\s+)?(?:field|industry|domain)',
+    r'(\d+)\+?\s*years?\s*(?:of\s*)?(?:professional|career|industry)',
+    r'professional\s*(?:experience\s*(?:of\s*)?)?(\d+)\+?\s*years?',
+    r'career\s*(?:spanning\s*)?(\d+)\+?\s*years?',
+    r'total\s*(?:of\s*)?(\d+)\+?\s*years?',
+    r'over\s*(\d+)\+?\s*years?',
+    r'more\s*than\s*(\d+)\+?\s*years?',
+    r'above\s*(\d+)\+?\s*years?',
+    r'around\s*(\d+)\+?\s*years?',
+    r'approximately\s*(\d+)\+?\s*years?',
+    r'nearly\s*(\d+)\+?\s*years?',
+    r'having\s*(\d+)\+?\s*years?',
+    r'with\s*(\d+)\+?\s*years?\s*(?:of\s*)?(?:experience|expertise)',
+    r'possess\s*(\d+)\+?\s*years?',
+    r'bring\s*(\d+)\+?\s*years?',
+    r'(\d+)\+?\s*years?\s*(?:as\s*)?(?:a\s*)?(?:senior\s*)?(?:lead\s*)?(?:principal\s*)?(?:engineer|developer|designer|architect)'
+]
+
+# Degree or graduation years, counted back from CURRENT_YEAR
+GRADUATION_PATTERNS = [
+    r'(\d+)\+\s*years?\s*of',
+    r'graduated?\s*(?:in\s*)?(\d{4})',
+    r'(?:b\.?tech|be|bachelor|m\.?tech|me|master|mba).*?(?:in\s*)?(\d{4})',
+    r'(?:b\.?tech|be|bachelor|m\.?tech|me|master|mba).*?(\d{4})',
+    r'degree.*?(\d{4})',
+    r'university.*?(\d{4})',
+    r'college.*?(\d{4})'
+]
+
+# Employment date ranges
+EMPLOYMENT_DATE_PATTERNS = [
+    r'(\d{4})\s*-\s*(?:present|current|till\s*date|now)',
+    r'(\d{4})\s*to\s*(?:present|current|till\s*date|now)',
+    r'(?:since|from)\s*(\d{4})',
+    r'from\s*(\d{4})\s*to\s*(?:present|current|now)',
+    r'started\s*(?:in\s*)?(\d{4})',
+    r'joining\s*(?:in\s*)?(\d{4})',
+    r'employed\s*(?:since\s*)?(\d{4})'
+]
+
+CURRENT_YEAR = 2025
+
+# Sections each extractor reads (see sections.py). A scope only applies when
+# one of its required sections was found; otherwise the whole text is read.
+STATEMENT_SECTIONS = ('header', 'summary', 'experience', 'requirements')
+STATEMENT_REQUIRES = ('experience', 'requirements')
+GRADUATION_SECTIONS = ('education',)
+EMPLOYMENT_SECTIONS = ('experience',)
+# Skills ignore objectives and hobbies when the resume has real content sections
+SKILL_EXCLUDED_SECTIONS = ('summary', 'personal')
+SKILL_REQUIRES = ('skills', 'experience', 'projects')
+
+# Returned by extract_text when every backend ran but found no text
+EMPTY_TEXT_MESSAGES = {
+    '.pdf': "No text found in PDF",
+    '.docx': "No readable text found in DOCX file",
+    '.txt': ""
+}
+
+class DomainMatcher:
+    def __init__(self):
+        start = time.perf_counter()
+        # Define clear domain patterns
+        self.domains = {
+            'design_verification': {
+                'name': 'Design Verification (DV)',
+                'keywords': [
+                    'design verification', 'dv engineer', 'verification engineer', 'functional verification',
+                    'uvm', 'testbench', 'coverage', 'assertion', 'constrained random', 'verification methodology',
+                    'simulation', 'debugging', 'verification plan', 'test cases', 'coverage analysis',
+                    'formal verification', 'lint', 'cdc', 'equivalence checking', 'verification ip',
+                    'systemverilog', 'verilog', 'verification', 'rtl verification', 'block level verification',
+                    'chip level verification', 'regression', 'test harness'
+                ]
+            },
+            'physical_design': {
+                'name': 'Physical Design (PD)',
+                'keywords': [
+                    'physical design', 'pd engineer', 'backend engineer', 'place and route', 'pnr',
+                    'floorplan', 'floor planning', 'placement', 'routing', 'timing closure', 'sta',
+                    'static timing analysis', 'icc2', 'innovus', 'primetime', 'timing constraints',
+                    'power analysis', 'ir drop', 'signal integrity', 'cts', 'clock tree synthesis',
+                    'post layout', 'parasitic extraction', 'physical verification', 'drc', 'lvs',
+                    'antenna check', 'fill insertion', 'eco', 'metal layer', 'via optimization'
+                ]
+            },
+            'rtl_design': {
+                'name': 'RTL Design',
+                'keywords': [
+                    'rtl design', 'rtl engineer', 'design engineer', 'logic design', 'digital design',
+                    'verilog', 'systemverilog', 'hdl', 'synthesis', 'design compiler', 'rtl coding',
+                    'microarchitecture', 'architecture design', 'functional specification', 'design specification',
+                    'rtl implementation', 'ip design', 'module design', 'interface design',
+                    'protocol implementation', 'datapath design', 'control logic', 'state machine'
+                ]
+            }
+        }
+        
+        # Skills and tools detection
+        self.skill_categories = {
+            'tools': [
+                'synopsys', 'design compiler', 'dc', 'icc2', 'ic compiler', 'primetime', 'pt', 
+                'vcs', 'vcs mx', 'verdi', 'dve', 'spyglass', 'formality', 'star-rc', 'hspice',
+                'cadence', 'innovus', 'encounter', 'genus', 'conformal', 'incisive', 'xcelium',
+                'virtuoso', 'allegro', 'pegasus', 'voltus', 'tempus', 'quantus', 'palladium',
+                'mentor', 'calibre', 'modelsim', 'questasim', 'questa', 'tessent', 'catapult',
+                'xilinx', 'vivado', 'ise', 'vitis', 'quartus', 'altera', 'intel quartus',
+                'python', 'perl', 'tcl', 'matlab', 'git', 'eclipse'
+            ],
+            'protocols': [
+                'axi', 'axi4', 'axi-lite', 'ahb', 'apb', 'amba', 'wishbone',
+                'pcie', 'pci express', 'usb', 'usb2', 'usb3', 'ddr', 'ddr3', 'ddr4', 'ddr5',
+                'serdes', 'ethernet', 'uart', 'spi', 'i2c', 'mipi', 'can'
+            ],
+            'technologies': [
+                'asic', 'fpga', 'soc', 'ip', 'risc', 'arm', 'cpu', 'gpu', 'memory', 'cache', 'pipeline',
+                '7nm', '5nm', '10nm', '14nm', '16nm', '28nm', 'finfet', 'sram', 'dram'
+            ]
+        }
+        
+        # Keys cached profiles and results, so a taxonomy change invalidates them
+        self.version = snapshot.state_version(self.domains, self.skill_categories, DIRECT_EXPERIENCE_PATTERNS,
+                                              GRADUATION_PATTERNS, EMPLOYMENT_DATE_PATTERNS, CURRENT_YEAR).hex()
+        self._domain_keywords = [(key, tuple(info['keywords'])) for key, info in self.domains.items()]
+        self._skill_keywords = [(category, tuple(skills)) for category, skills in self.skill_categories.items()]
+        self._direct_patterns = [re.compile(pattern) for pattern in DIRECT_EXPERIENCE_PATTERNS]
+        self._graduation_patterns = [re.compile(pattern) for pattern in GRADUATION_PATTERNS]
+        self._date_patterns = [re.compile(pattern) for pattern in EMPLOYMENT_DATE_PATTERNS]
+        self.startup = {'version': self.version[:16], 'seconds': round(time.perf_counter() - start, 6)}
+    
+    def extract(self, file_path: str) -> Dict:
+        # Returns the text, the extractor that produced it and the page count.
+        # Failures keep the message strings callers already check for, with
+        # no extractor.
+        _, ext = os.path.splitext(file_path.lower())
+        if not extractors.registry.supports(ext):
+            return {'text': "Unsupported file format", 'extractor': '', 'pages': None, 'attempts': []}
+        try:
+            return extractors.registry.extract(file_path)
+        except extractors.ExtractionError as e:
+            if e.empty:
+                return {'text': EMPTY_TEXT_MESSAGES[ext], 'extractor': '', 'pages': None, 'attempts': e.attempts}
+            return {'text': f"Error reading {ext[1:].upper()}: {str(e)}", 'extractor': '', 'pages': None,
+                    'attempts': e.attempts}
+    
+    def extract_text(self, file_path: str) -> str:
+        return self.extract(file_path)['text']
+    
+    def extract_experience(self, text: str, sections: Optional[Dict] = None) -> int:
+        experience_years = []
+        if sections is None:
+            sections = segment(text)
+        statements = section_text(text, sections, STATEMENT_SECTIONS, requires=STATEMENT_REQUIRES).lower()
+        education = section_text(text, sections, GRADUATION_SECTIONS, requires=GRADUATION_SECTIONS).lower()
+        employment = section_text(text, sections, EMPLOYMENT_SECTIONS, requires=EMPLOYMENT_SECTIONS).lower()
+        stages.count('experience_scanned_bytes', len(statements) + len(education) + len(employment))
+        
+        # Extract from direct experience patterns
+        for pattern in self._direct_patterns:
+            matches = pattern.findall(statements)
+            if matches:
+                for match in matches:
+                    try:
+                        years = int(match)
+                        if 0 <= years <= 50:
+                            experience_years.append(years)
+                    except:
+                        continue
+        
+        # Calculate from graduation year
+        current_year = CURRENT_YEAR
+        for pattern in self._graduation_patterns:
+            matches = pattern.findall(education)
+            if matches:
+                for match in matches:
+                    try:
+                        grad_year = int(match)
+                        if 1990 <= grad_year <= current_year - 1:
+                            calculated_years = current_year - grad_year
+                            if calculated_years <= 35:
+                                experience_years.append(calculated_years)
+                    except:
+                        continue
+        
+        # Employment date ranges
+        for pattern in self._date_patterns:
+            matches = pattern.findall(employment)
+            if matches:
+                for match in matches:
+                    try:
+                        start_year = int(match)
+                        if 1990 <= start_year <= current_year:
+                            calculated_years = current_year - start_year
+                            if calculated_years <= 40:
+                                experience_years.append(calculated_years)
+                    except:
+                        continue
+        
+        stages.count('experience_matches', len(experience_years))
+        result = max(experience_years) if experience_years else 0
+        return result
+    
+    def extract_skills(self, text: str, sections: Optional[Dict] = None) -> Dict:
+        if sections is None:
+            sections = segment(text)
+        text_lower = section_text(text, sections, exclude=SKILL_EXCLUDED_SECTIONS, requires=SKILL_REQUIRES).lower()
+        stages.count('skill_scanned_bytes', len(text_lower))
+        found_skills = {
+            'tools': [],
+            'protocols': [],
+            'technologies': []
+        }
+        
+        for category, skills_list in self._skill_keywords:
+            for skill in skills_list:
+                if skill in text_lower:
+                    found_skills[category].append(skill)
+        
+        stages.count('skill_matches', sum(len(skills) for skills in found_skills.values()))
+        return found_skills
+    
+    def detect_domain(self, text: str) -> Dict:
+        text_lower = text.lower()
+        domain_scores = {}
+        matched_keywords = {}
+        
+        for domain_key, keywords in self._domain_keywords:
+            score = 0
+            matches = []
+            
+            for keyword in keywords:
+                if keyword in text_lower:
+                    score += 1
+                    matches.append(keyword)
+            
+            domain_scores[domain_key] = score
+            matched_keywords[domain_key] = matches
+        
+        stages.count('domain_keyword_matches', sum(domain_scores.values()))
+        
+        if not any(domain_scores.values()):
+            return {
+                'primary_domain': 'unknown',
+                'domain_name': 'Unknown/Other',
+                'confidence': 0,
+                'all_scores': domain_scores,
+                'matched_keywords': matched_keywords
+            }
+        
+        primary_domain = max(domain_scores, key=domain_scores.get)
+        max_score = domain_scores[primary_domain]
+        total_possible = len(self.domains[primary_domain]['keywords'])
+        confidence = (max_score / total_possible) * 100
+        
+        return {
+            'primary_domain': primary_domain,
+            'domain_name': self.domains[primary_domain]['name'],
+            'confidence': round(confidence, 1),
+            'score': max_score,
+            'total_keywords': total_possible,
+            'all_scores': domain_scores,
+            'matched_keywords': matched_keywords
+        }
+    
+    def profile_document(self, text: str) -> Dict:
+        # Everything compare_profiles needs from one document, so a document
+        # can be profiled once and compared against many others
+        with stages.stage('detect_domain'):
+            domain = self.detect_domain(text)
+        with stages.stage('segment'):
+            sections = segment(text)
+        with stages.stage('extract_experience'):
+            experience = self.extract_experience(text, sections)
+        with stages.stage('extract_skills'):
+            skills = self.extract_skills(text, sections)
+        return {'domain': domain, 'experience': experience, 'skills': skills, 'sections': sections}
+    
+    def lazy_profile(self, text: str, values: Optional[Dict] = None) -> 'LazyProfile':
+        return LazyProfile(self, text, values)
+    
+    def compare_domains(self, resume_text: str, jd_text: str, explain: bool = True) -> Dict:
+        return self.compare_profiles(self.lazy_profile(resume_text), self.lazy_profile(jd_text), explain)
+    
+    def compare_profiles(self, resume_profile: Dict, jd_profile: Dict, explain: bool = True) -> Dict:
+        # Domains are compared first. An unknown or mismatched domain fixes the
+        # outcome, so experience and skills are only evaluated (and, for lazy
+        # profiles, extracted) when they can change it or when an explanation
+        # was asked for.
+        resume_domain = resume_profile['domain']
+        jd_domain = jd_profile['domain']
+        domains_match = resume_domain['primary_domain'] == jd_domain['primary_domain']
+        
+        if resume_domain['primary_domain'] == 'unknown' or jd_domain['primary_domain'] == 'unknown':
+            recommendation = "MANUAL REVIEW"
+            status = "WARNING"
+            reason = "Unable to clearly identify domain from text"
+            final_score = 0
+        elif not domains_match:
+            recommendation = "DOMAIN MISMATCH - DO NOT SEND"
+            status = "REJECT"
+            reason = f"Resume is {resume_domain['domain_name']} but JD requires {jd_domain['domain_name']}"
+            final_score = 0
+        else:
+            recommendation = None
+        
+        if recommendation is not None and not explain:
+            stages.count('short_circuited')
+            return {
+                'recommendation': recommendation,
+                'status': status,
+                'reason': reason,
+                'final_score': final_score,
+                'domains_match': domains_match,
+                'resume_domain': resume_domain,
+                'jd_domain': jd_domain
+            }
+        
+        resume_exp = resume_profile['experience']
+        jd_exp = jd_profile['experience']
+        exp_match = resume_exp >= jd_exp if jd_exp > 0 else True
+        exp_score = min(resume_exp / jd_exp * 100, 100) if jd_exp > 0 else 100
+        
+        resume_skills = resume_profile['skills']
+        jd_skills = jd_profile['skills']
+        
+        skill_scores = {}
+        overall_skill_score = 0
+        total_categories = 0
+        
+        for category in ['tools', 'protocols', 'technologies']:
+            jd_category_skills = set(jd_skills[category])
+            resume_category_skills = set(resume_skills[category])
+            
+            if jd_category_skills:
+                matches = jd_category_skills.intersection(resume_category_skills)
+                score = (len(matches) / len(jd_category_skills)) * 100
+                skill_scores[category] = {
+                    'score': round(score, 1),
+                    'matched': list(matches),
+                    'missing': list(jd_category_skills - matches),
+                    'total_required': len(jd_category_skills)
+                }
+                overall_skill_score += score
+                total_categories += 1
+        
+        overall_skill_score = overall_skill_score / total_categories if total_categories > 0 else 0
+        
+        if recommendation is None:
+            final_score = (overall_skill_score * 0.7) + (exp_score * 0.3)
+            
+            if final_score >= 75 and exp_match:
+                recommendation = "STRONG MATCH - SEND"
+                status = "ACCEPT"
+                reason = f"Domain match with {final_score:.1f}% overall compatibility"
+            elif final_score >= 60 and exp_match:
+                recommendation = "GOOD MATCH - SEND"
+                status = "ACCEPT"
+                reason = f"Domain match with {final_score:.1f}% compatibility"
+            elif final_score >= 45:
+                recommendation = "PARTIAL MATCH - MAYBE SEND"
+                status = "WARNING"
+                reason = f"Domain match but some skill gaps ({final_score:.1f}% match)"
+            else:
+                recommendation = "WEAK MATCH - DO NOT SEND"
+                status = "REJECT"
+                reason = f"Domain match but significant skill/experience gaps ({final_score:.1f}% match)"
+        
+        result = {
+            'recommendation': recommendation,
+            'status': status,
+            'reason': reason,
+            'final_score': round(final_score, 1),
+            'domains_match': domains_match,
+            'resume_domain': resume_domain,
+            'jd_domain': jd_domain
+        }
+        
+        # The explanation text is the most expensive part of the payload, so
+        # batch callers can skip it
+        if explain:
+            with stages.stage('build_analysis'):
+                result['analysis_text'] = self.build_analysis_text(
+                    resume_exp, jd_exp, exp_match, exp_score, overall_skill_score, skill_scores)
+        
+        return result
+    
+    def build_analysis_text(self, resume_exp: int, jd_exp: int, exp_match: bool, exp_score: float,
+                            overall_skill_score: float, skill_scores: Dict) -> str:
+        analysis_text = f"""Experience Analysis:
+- Resume Experience: {resume_exp} years
+- Required Experience: {jd_exp} years  
+- Experience Match: {'Meets requirement' if exp_match else 'Below requirement'}
+- Experience Score: {round(exp_score, 1)}%
+
+Skills Analysis:
+- Overall Skills Score: {round(overall_skill_score, 1)}%
+"""
+        
+        if skill_scores:
+            analysis_text += "\nSkills Breakdown:\n"
+            for category, data in skill_scores.items():
+                analysis_text += f"- {category.title()}: {data['score']}% ({len(data['matched'])}/{data['total_required']})\n"
+                if data['matched']:
+                    analysis_text += f"  Matched: {', '.join(data['matched'][:5])}\n"
+                if data['missing']:
+                    analysis_text += f"  Missing: {', '.join(data['missing'][:5])}\n"
+        
+        return analysis_text
+
+
+PROFILE_KEYS = ('domain', 'experience', 'skills', 'sections')
+
+
+# Profile whose sections, experience and skills are extracted on first
+# access. Domain detection runs up front because every comparison starts
+# with it. Pickles (and converts with dict()) as a fully evaluated profile.
+# `values` seeds fields evaluated elsewhere (e.g. read from a shared cache).
+class LazyProfile(Mapping):
+    def __init__(self, matcher: DomainMatcher, text: str, values: Optional[Dict] = None):
+        self._matcher = matcher
+        self._text = text
+        self._values = dict(values or {})
+        if 'domain' not in self._values:
+            with stages.stage('detect_domain'):
+                self._values['domain'] = matcher.detect_domain(text)
+    
+    def __getitem__(self, key: str):
+        if key not in self._values:
+            if key == 'sections':
+                with stages.stage('segment'):
+                    self._values[key] = segment(self._text)
+            elif key == 'experience':
+                sections = self['sections']
+                with stages.stage('extract_experience'):
+                    self._values[key] = self._matcher.extract_experience(self._text, sections)
+            elif key == 'skills':
+                sections = self['sections']
+                with stages.stage('extract_skills'):
+                    self._values[key] = self._matcher.extract_skills(self._text, sections)
+            else:
+                raise KeyError(key)
+        return self._values[key]
+    
+    def __iter__(self):
+        return iter(PROFILE_KEYS)
+    
+    def __len__(self):
+        return len(PROFILE_KEYS)
+    
+    def evaluated(self, key: str) -> bool:
+        return key in self._values
+    
+    def evaluated_fields(self) -> Dict:
+        # Only what has been extracted so far, without forcing the rest
+        return dict(self._values)
+    
+    def __reduce__(self):
+        return dict, (dict(self),)
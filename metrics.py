@@ -0,0 +1,48 @@
+import threading
+from typing import Dict
+
+
+# Process-wide counters, gauges and summaries exposed through /metrics
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.summaries = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            summary = self.summaries.get(name)
+            if summary is None:
+                summary = {'count': 0, 'sum': 0.0, 'max': value}
+                self.summaries[name] = summary
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['max'] = max(summary['max'], value)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            summaries = {}
+            for name, summary in self.summaries.items():
+                summaries[name] = {
+                    'count': summary['count'],
+                    'sum': round(summary['sum'], 6),
+                    'avg': round(summary['sum'] / summary['count'], 6) if summary['count'] else 0,
+                    'max': round(summary['max'], 6)
+                }
+            return {
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'summaries': summaries
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,375 @@
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from filelock import file_lock
+from metrics import metrics
+
+# Segment layout (little endian):
+#   header   magic, version, document count, domain count, mask words, taxonomy hash
+#   columns  an (offset, length) pair per column, then the 8-byte aligned columns:
+#            experience     uint16[n]
+#            domain         uint8[n]        index into the domain order, 255 = unknown
+#            domain_scores  uint16[n * d]   keyword hits per domain
+#            skill_masks    uint64[n * w]   one bit per taxonomy skill
+#            id_offsets     uint32[n + 1]   into id_blob
+#            id_blob        utf-8 document ids
+MAGIC = b'JDPS'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIHH16s')
+COLUMNS = ('experience', 'domain', 'domain_scores', 'skill_masks', 'id_offsets', 'id_blob')
+COLUMN_TABLE = struct.Struct('<' + 'QQ' * len(COLUMNS))
+UNKNOWN_DOMAIN = 255
+SEGMENT_PATTERN = re.compile(r'^seg-(\d{6})\.prof$')
+
+
+class Taxonomy:
+    # Fixed ordering of domains and skills shared by writer and reader
+    def __init__(self, matcher):
+        self.domain_keys = list(matcher.domains.keys())
+        self.domain_index = {key: i for i, key in enumerate(self.domain_keys)}
+        self.skills = [(category, skill) for category, skills in matcher.skill_categories.items() for skill in skills]
+        self.skill_bits = {}
+        for bit, (category, skill) in enumerate(self.skills):
+            self.skill_bits.setdefault((category, skill), bit)
+        self.categories = list(matcher.skill_categories.keys())
+        self.mask_words = (len(self.skills) + 63) // 64
+        digest = hashlib.sha256(json.dumps([matcher.domains, matcher.skill_categories], sort_keys=True).encode())
+        self.hash = digest.digest()[:16]
+
+    def skill_mask(self, skills: Dict[str, List[str]]) -> int:
+        mask = 0
+        for category, found in skills.items():
+            for skill in found:
+                bit = self.skill_bits.get((category, skill))
+                if bit is not None:
+                    mask |= 1 << bit
+        return mask
+
+    def category_masks(self, skills: Dict[str, List[str]]) -> Dict[str, int]:
+        return {category: self.skill_mask({category: skills.get(category, [])}) for category in self.categories}
+
+    def skills_from_mask(self, mask: int) -> Dict[str, List[str]]:
+        found = {category: [] for category in self.categories}
+        for bit, (category, skill) in enumerate(self.skills):
+            if mask >> bit & 1:
+                found[category].append(skill)
+        return found
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_segment(path: str, taxonomy: Taxonomy, rows: List[Tuple[str, Dict]]):
+    n = len(rows)
+    d = len(taxonomy.domain_keys)
+    w = taxonomy.mask_words
+
+    experience = bytearray()
+    domains = bytearray()
+    domain_scores = bytearray()
+    masks = bytearray()
+    id_offsets = bytearray(struct.pack('<I', 0))
+    id_blob = bytearray()
+    for doc_id, profile in rows:
+        experience += struct.pack('<H', min(int(profile['experience']), 65535))
+        domains.append(taxonomy.domain_index.get(profile['domain']['primary_domain'], UNKNOWN_DOMAIN))
+        scores = profile['domain']['all_scores']
+        domain_scores += struct.pack(f'<{d}H', *(min(scores.get(key, 0), 65535) for key in taxonomy.domain_keys))
+        masks += taxonomy.skill_mask(profile['skills']).to_bytes(8 * w, 'little')
+        id_blob += doc_id.encode('utf-8')
+        id_offsets += struct.pack('<I', len(id_blob))
+
+    columns = [experience, domains, domain_scores, masks, id_offsets, id_blob]
+    offset = _align(HEADER.size + COLUMN_TABLE.size)
+    table = []
+    for column in columns:
+        table.extend((offset, len(column)))
+        offset = _align(offset + len(column))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, n, d, w, taxonomy.hash))
+            f.write(COLUMN_TABLE.pack(*table))
+            for (column_offset, _), column in zip(zip(table[::2], table[1::2]), columns):
+                f.write(b'\0' * (column_offset - f.tell()))
+                f.write(column)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class Segment:
+    def __init__(self, path: str, taxonomy: Taxonomy):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, count, domain_count, mask_words, taxonomy_hash = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a version {FORMAT_VERSION} profile segment')
+        if taxonomy_hash != taxonomy.hash:
+            raise ValueError(f'{path} was written with a different taxonomy, rebuild the store')
+        self.count = count
+        self.mask_bytes = mask_words * 8
+        table = COLUMN_TABLE.unpack_from(self.map, HEADER.size)
+        view = memoryview(self.map)
+        spans = {name: view[table[2 * i]:table[2 * i] + table[2 * i + 1]] for i, name in enumerate(COLUMNS)}
+        # Zero-copy typed views straight over the page cache
+        self.experience = spans['experience'].cast('H')
+        self.domain = spans['domain']
+        self.domain_scores = spans['domain_scores'].cast('H')
+        self.domain_count = domain_count
+        self.skill_masks = spans['skill_masks']
+        self.id_offsets = spans['id_offsets'].cast('I')
+        self.id_blob = spans['id_blob']
+        self._views = [self.experience, self.domain_scores, self.id_offsets] + list(spans.values()) + [view]
+
+    def doc_id(self, row: int) -> str:
+        return bytes(self.id_blob[self.id_offsets[row]:self.id_offsets[row + 1]]).decode('utf-8')
+
+    def mask(self, row: int) -> int:
+        return int.from_bytes(self.skill_masks[row * self.mask_bytes:(row + 1) * self.mask_bytes], 'little')
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self.map.close()
+        self.file.close()
+
+
+# Append-only directory of memory-mapped segments. Every worker that opens the
+# same directory shares the OS page cache, and opening costs only an mmap per
+# segment. When an id appears in several segments the newest one wins.
+# Appends and compactions hold a lock file in the directory, so writers in
+# different processes never pick the same segment number; readers hold it
+# shared while they map segments. self._lock is always taken first.
+class ProfileStore:
+    def __init__(self, directory: str, matcher):
+        self.directory = directory
+        self.matcher = matcher
+        self.taxonomy = Taxonomy(matcher)
+        self._lock = threading.RLock()
+        self._segments = {}
+        self._latest = None
+        self._stale = None
+        os.makedirs(directory, exist_ok=True)
+        self.refresh()
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f'seg-{number:06d}.prof')
+
+    def _lock_path(self) -> str:
+        return os.path.join(self.directory, '.lock')
+
+    def refresh(self):
+        # Pick up segments appended or compacted by other processes. The
+        # shared lock keeps a compaction from removing segments between the
+        # listing and their mmaps; once mapped they stay readable.
+        with self._lock, file_lock(self._lock_path(), shared=True):
+            self._refresh_locked()
+
+    def _refresh_locked(self):
+        numbers = self._segment_numbers()
+        changed = False
+        for number in list(self._segments):
+            if number not in numbers:
+                self._segments.pop(number).close()
+                changed = True
+        for number in numbers:
+            if number not in self._segments:
+                self._segments[number] = Segment(self._segment_path(number), self.taxonomy)
+                changed = True
+        if changed:
+            self._latest = None
+            self._stale = None
+        metrics.set_gauge('profile_store.segments', len(self._segments))
+
+    def _latest_rows(self) -> Dict[str, Tuple[int, int]]:
+        # id -> (segment number, row) of its newest version
+        if self._latest is None:
+            latest = {}
+            for number in sorted(self._segments):
+                segment = self._segments[number]
+                for row in range(segment.count):
+                    latest[segment.doc_id(row)] = (number, row)
+            self._latest = latest
+        return self._latest
+
+    def _stale_rows(self) -> Dict[int, set]:
+        # segment number -> rows superseded by a newer segment. A single
+        # segment (e.g. right after compaction) never has any, so the common
+        # case needs no id decoding at all.
+        if self._stale is None:
+            stale = {}
+            if len(self._segments) > 1:
+                latest = self._latest_rows()
+                for number, segment in self._segments.items():
+                    for row in range(segment.count):
+                        if latest[segment.doc_id(row)] != (number, row):
+                            stale.setdefault(number, set()).add(row)
+            self._stale = stale
+        return self._stale
+
+    def __len__(self):
+        with self._lock:
+            if len(self._segments) == 1:
+                return next(iter(self._segments.values())).count
+            return len(self._latest_rows())
+
+    def append(self, rows: Iterable[Tuple[str, Dict]]) -> int:
+        # Later rows for the same id replace earlier ones
+        rows = list(dict(rows).items())
+        if not rows:
+            return 0
+        with self._lock, file_lock(self._lock_path()):
+            numbers = self._segment_numbers()
+            number = (numbers[-1] + 1) if numbers else 1
+            write_segment(self._segment_path(number), self.taxonomy, rows)
+            self._refresh_locked()
+        metrics.incr('profile_store.appended', len(rows))
+        return len(rows)
+
+    def compact(self) -> int:
+        # Rewrite every live row into one segment and drop the old ones
+        with self._lock, file_lock(self._lock_path()):
+            self._refresh_locked()
+            old_numbers = sorted(self._segments)
+            if len(old_numbers) <= 1:
+                return len(old_numbers)
+            rows = [(doc_id, self.profile(number, row)) for doc_id, (number, row) in self._latest_rows().items()]
+            new_number = old_numbers[-1] + 1
+            write_segment(self._segment_path(new_number), self.taxonomy, rows)
+            for number in old_numbers:
+                self._segments.pop(number).close()
+                os.remove(self._segment_path(number))
+            self._refresh_locked()
+            metrics.incr('profile_store.compactions')
+            return len(old_numbers)
+
+    def profile(self, number: int, row: int) -> Dict:
+        # Rebuild the compare_profiles input for one stored row
+        segment = self._segments[number]
+        d = segment.domain_count
+        scores = {key: segment.domain_scores[row * d + i] for i, key in enumerate(self.taxonomy.domain_keys)}
+        domain_index = segment.domain[row]
+        if domain_index == UNKNOWN_DOMAIN:
+            domain = {'primary_domain': 'unknown', 'domain_name': 'Unknown/Other', 'confidence': 0,
+                      'all_scores': scores, 'matched_keywords': {}}
+        else:
+            key = self.taxonomy.domain_keys[domain_index]
+            total = len(self.matcher.domains[key]['keywords'])
+            domain = {'primary_domain': key, 'domain_name': self.matcher.domains[key]['name'],
+                      'confidence': round(scores[key] / total * 100, 1), 'score': scores[key],
+                      'total_keywords': total, 'all_scores': scores, 'matched_keywords': {}}
+        return {'domain': domain, 'experience': segment.experience[row],
+                'skills': self.taxonomy.skills_from_mask(segment.mask(row))}
+
+    def query(self, jd_profile: Dict, top_k: int = 20, domain_only: bool = True) -> Dict:
+        # Scores every stored profile against the JD straight off the mapped
+        # columns and returns the top_k, with full results rebuilt only for those
+        with self._lock:
+            self.refresh()
+            stale = self._stale_rows()
+            jd_domain = self.taxonomy.domain_index.get(jd_profile['domain']['primary_domain'], UNKNOWN_DOMAIN)
+            jd_exp = jd_profile['experience']
+            jd_masks = [mask for mask in self.taxonomy.category_masks(jd_profile['skills']).values() if mask]
+            jd_counts = [mask.bit_count() for mask in jd_masks]
+
+            heap = []
+            scanned = 0
+            for number, segment in self._segments.items():
+                experience = segment.experience
+                domains = segment.domain
+                stale_rows = stale.get(number)
+                for row in range(segment.count):
+                    if stale_rows and row in stale_rows:
+                        continue
+                    scanned += 1
+                    if domains[row] != jd_domain or jd_domain == UNKNOWN_DOMAIN:
+                        if domain_only:
+                            continue
+                        final_score = 0.0
+                    else:
+                        exp_score = min(experience[row] / jd_exp * 100, 100) if jd_exp > 0 else 100
+                        if jd_masks:
+                            mask = segment.mask(row)
+                            skill_score = sum((mask & jd_mask).bit_count() / count * 100
+                                              for jd_mask, count in zip(jd_masks, jd_counts)) / len(jd_masks)
+                        else:
+                            skill_score = 0
+                        final_score = round(skill_score * 0.7 + exp_score * 0.3, 1)
+                    item = (final_score, number, row)
+                    if len(heap) < top_k:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+
+            results = []
+            for final_score, number, row in sorted(heap, reverse=True):
+                doc_id = self._segments[number].doc_id(row)
+                result = self.matcher.compare_profiles(self.profile(number, row), jd_profile, explain=False)
+                result['id'] = doc_id
+                result['experience'] = self._segments[number].experience[row]
+                results.append(result)
+            metrics.incr('profile_store.queries')
+            metrics.observe('profile_store.rows_scanned', scanned)
+            return {'scanned': scanned, 'results': results}
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments = {}
+
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    from matcher import DomainMatcher
+
+    parser = argparse.ArgumentParser(description='Inspect, compact or query a resume profile store')
+    parser.add_argument('directory')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats')
+    sub.add_parser('compact')
+    query = sub.add_parser('query')
+    query.add_argument('--jd', required=True, help='Job description file')
+    query.add_argument('--top-k', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    matcher = DomainMatcher()
+    store = ProfileStore(args.directory, matcher)
+    if args.command == 'stats':
+        print(json.dumps({'documents': len(store), 'segments': len(store._segments)}))
+    elif args.command == 'compact':
+        merged = store.compact()
+        print(json.dumps({'merged_segments': merged, 'documents': len(store)}))
+    else:
+        jd_profile = matcher.profile_document(matcher.extract_text(args.jd))
+        found = store.query(jd_profile, args.top_k)
+        print(json.dumps({'scanned': found['scanned'], 'results': [
+            {'id': r['id'], 'final_score': r['final_score'], 'status': r['status']} for r in found['results']]}, indent=2))
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+# Names of the reports profile_call stores; nothing else in the directory is pruned
+_STORED = re.compile(r'^[0-9a-f]{12}\.(?:prof|txt)$')
+
+
+def _function_label(filename: str, lineno: int, name: str) -> str:
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+
+def _deterministic(fn: Callable, limit: int) -> Tuple[object, Dict, cProfile.Profile]:
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    result = profiler.runcall(fn)
+    elapsed = time.perf_counter() - start
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, lineno, name), (primitive_calls, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': _function_label(filename, lineno, name),
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'self_seconds': round(tottime, 6),
+            'cumulative_seconds': round(cumtime, 6)
+        })
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    return result, {'mode': 'deterministic', 'elapsed_seconds': round(elapsed, 6), 'top': rows[:limit]}, profiler
+
+
+def _sampling(fn: Callable, limit: int, interval: float) -> Tuple[object, Dict, None]:
+    # Samples the calling thread's stack from a helper thread. Overhead stays
+    # flat regardless of how many Python calls the request makes, at the cost
+    # of not knowing exact call counts.
+    target_id = threading.get_ident()
+    self_samples = {}
+    total_samples = {}
+    sample_count = [0]
+    done = threading.Event()
+
+    def sampler():
+        while not done.wait(interval):
+            frame = sys._current_frames().get(target_id)
+            if frame is None:
+                continue
+            sample_count[0] += 1
+            seen = set()
+            top = True
+            while frame is not None:
+                code = frame.f_code
+                label = _function_label(code.co_filename, code.co_firstlineno, code.co_name)
+                if top:
+                    self_samples[label] = self_samples.get(label, 0) + 1
+                    top = False
+                if label not in seen:
+                    total_samples[label] = total_samples.get(label, 0) + 1
+                    seen.add(label)
+                frame = frame.f_back
+
+    thread = threading.Thread(target=sampler, daemon=True)
+    start = time.perf_counter()
+    thread.start()
+    try:
+        result = fn()
+    finally:
+        done.set()
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = max(sample_count[0], 1)
+    rows = []
+    for label, count in total_samples.items():
+        rows.append({
+            'function': label,
+            'samples': count,
+            'self_seconds': round(self_samples.get(label, 0) / samples * elapsed, 6),
+            'cumulative_seconds': round(count / samples * elapsed, 6)
+        })
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    report = {'mode': 'sampling', 'elapsed_seconds': round(elapsed, 6), 'interval_seconds': interval,
+              'samples': sample_count[0], 'top': rows[:limit]}
+    return result, report, None
+
+
+def prune_reports(store_dir: str, keep: int):
+    # Removes all but the newest `keep` stored reports. Several workers may
+    # prune the same directory at once, so a file already gone is fine.
+    stored = []
+    for name in os.listdir(store_dir):
+        if _STORED.match(name):
+            path = os.path.join(store_dir, name)
+            try:
+                stored.append((os.stat(path).st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+    stored.sort(reverse=True)
+    for _, path in stored[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def profile_call(fn: Callable, mode: str = 'deterministic', limit: int = 25,
+                 interval: float = 0.001, store_dir: str = None, keep: int = 50) -> Tuple[object, Dict]:
+    if mode == 'sampling':
+        result, report, profiler = _sampling(fn, limit, interval)
+    else:
+        result, report, profiler = _deterministic(fn, limit)
+
+    report['profile_id'] = uuid.uuid4().hex[:12]
+    if store_dir:
+        os.makedirs(store_dir, exist_ok=True)
+        if profiler is not None:
+            path = os.path.join(store_dir, f"{report['profile_id']}.prof")
+            profiler.dump_stats(path)
+        else:
+            path = os.path.join(store_dir, f"{report['profile_id']}.txt")
+            with open(path, 'w') as f:
+                f.write(format_report(report['top']))
+        report['stored_at'] = path
+        prune_reports(store_dir, keep)
+    return result, report
+
+
+def format_report(rows: List[Dict]) -> str:
+    lines = [f"{'cumulative':>12} {'self':>10}  function"]
+    for row in rows:
+        lines.append(f"{row['cumulative_seconds']:>12.6f} {row['self_seconds']:>10.6f}  {row['function']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,153 @@
+import multiprocessing
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+from metrics import metrics
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _worker_main(target: Callable, conn, memory_limit_bytes: int, track_memory: bool):
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if resource is not None and memory_limit_bytes:
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+        except (ValueError, OSError):
+            pass
+
+    while True:
+        try:
+            args = conn.recv()
+        except (EOFError, OSError):
+            break
+        if track_memory:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+        try:
+            result = ['ok', target(*args), None]
+        except MemoryError:
+            result = ['memory', 'Memory limit exceeded', None]
+        except Exception as e:
+            result = ['error', str(e), None]
+        if track_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            result[2] = max(0, peak - baseline)
+        try:
+            conn.send(result)
+        except (BrokenPipeError, OSError):
+            break
+
+
+class _Worker:
+    def __init__(self, context, target: Callable, memory_limit_bytes: int, track_memory: bool):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(target, child_conn, memory_limit_bytes, track_memory),
+                                       daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+# Runs a callable in a pool of worker processes. A call that exceeds its
+# deadline or the memory cap kills its worker and a fresh one takes its place,
+# so one pathological document never pins a request thread.
+#
+# Workers come from a forkserver rather than forking this process: replacements
+# are started from request threads, and forking a threaded server can copy a
+# lock some other thread holds. The target must therefore be picklable and
+# importable without the app (e.g. a DomainMatcher method).
+class ExtractionSandbox:
+    def __init__(self, target: Callable, timeout: float = 20.0, memory_limit_mb: int = 512,
+                 workers: int = 2, max_tasks_per_worker: int = 200, track_memory: bool = False):
+        self.context = multiprocessing.get_context('forkserver')
+        # Keep the forkserver from re-running the server's __main__ module
+        self.context.set_forkserver_preload(['sandbox', 'matcher', 'extractors'])
+        self.target = target
+        self.timeout = timeout
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024 if memory_limit_mb else 0
+        self.workers = workers
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.track_memory = track_memory
+        self._lock = threading.Lock()
+        self._idle = []
+        self._started = False
+
+    def start(self):
+        # Fills the idle pool; run() does this on first use, so it happens in
+        # whichever process serves requests (e.g. each gunicorn worker)
+        with self._lock:
+            self._started = True
+            while len(self._idle) < self.workers:
+                self._idle.append(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        metrics.incr('sandbox.workers_started')
+        return _Worker(self.context, self.target, self.memory_limit_bytes, self.track_memory)
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    return worker
+                worker.kill()
+        return self._spawn()
+
+    def _checkin(self, worker: _Worker):
+        if worker.tasks >= self.max_tasks_per_worker:
+            worker.kill()
+            metrics.incr('sandbox.workers_recycled')
+            return
+        with self._lock:
+            if len(self._idle) < self.workers:
+                self._idle.append(worker)
+                return
+        worker.kill()
+
+    def run(self, *args) -> Dict:
+        if not self._started:
+            self.start()
+        worker = self._checkout()
+        start = time.monotonic()
+        worker.tasks += 1
+        peak_bytes = None
+        try:
+            worker.conn.send(args)
+            if worker.conn.poll(self.timeout):
+                status, value, peak_bytes = worker.conn.recv()
+            else:
+                status, value = 'timeout', f'Extraction timed out after {self.timeout:g}s'
+        except (EOFError, OSError):
+            # The worker died, most likely killed for exceeding its memory cap
+            status, value = 'crashed', 'Extraction worker crashed (memory limit or fatal parser error)'
+
+        elapsed = time.monotonic() - start
+        metrics.incr(f'sandbox.{status}')
+        metrics.observe('sandbox.seconds', elapsed)
+
+        if status in ('ok', 'error'):
+            self._checkin(worker)
+        else:
+            worker.kill()
+            metrics.incr('sandbox.workers_recycled')
+
+        return {'status': status, 'value': value, 'elapsed': round(elapsed, 3), 'peak_bytes': peak_bytes}
+
+    def shutdown(self):
+        with self._lock:
+            self._started = False
+            for worker in self._idle:
+                worker.kill()
+            self._idle = []
@@ -0,0 +1,464 @@
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import snapshot
+from filelock import file_lock
+from metrics import metrics
+
+UNKNOWN_DOMAIN = 255
+_TOKEN = re.compile(r'[a-z0-9][a-z0-9+#]*')
+_QUERY_TOKEN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+OPERATORS = ('and', 'or', 'not')
+
+
+class QueryError(ValueError):
+    pass
+
+
+# Inverted index from taxonomy terms (the skills and domain keywords a profile
+# matched) to resume ids, optionally with every word of the text as well.
+# Resumes get dense document numbers in insertion order, so every posting
+# list is a sorted array of uint32 that new resumes simply append to.
+# Re-adding an id supersedes its earlier document number.
+#
+# On disk an index is a snapshot plus a JSON-lines log of resumes added since
+# it was written. Writers append to the log under a file lock, so processes
+# sharing the files add to each other's work instead of overwriting it, and an
+# addition costs only its own documents; readers replay whatever the log has
+# gained. Once the log holds compact_after entries it is folded into a new
+# snapshot.
+class SearchIndex:
+    def __init__(self, matcher, tokens: bool = False, compact_after: int = 1000):
+        self.matcher = matcher
+        self.tokens = tokens
+        self.compact_after = compact_after
+        self.domain_keys = list(matcher.domains.keys())
+        self.version = snapshot.state_version('search-index', matcher.domains, matcher.skill_categories, tokens)
+        self._lock = threading.RLock()
+        self._clear()
+        self._path = None
+        self._loaded_mtime = None
+        self._log_offset = 0
+        self._logged = 0
+
+    def _clear(self):
+        self._ids = []
+        self._number_of = {}
+        self._deleted = set()
+        self._experience = array('H')
+        self._domain = array('B')
+        self._terms = {}
+        self._words = {}
+
+    def __len__(self):
+        return len(self._number_of)
+
+    def _record(self, doc_id: str, text: str, profile=None) -> Dict:
+        # profile defaults to a fresh profile of text; pass a cached one to
+        # skip re-extracting
+        if profile is None:
+            profile = self.matcher.lazy_profile(text)
+        domain = profile['domain']
+        terms = {skill for skills in profile['skills'].values() for skill in skills}
+        terms.update(keyword for keywords in domain['matched_keywords'].values() for keyword in keywords)
+        return {
+            'id': doc_id,
+            'experience': min(int(profile['experience']), 65535),
+            'domain': domain['primary_domain'],
+            'terms': sorted(terms),
+            'words': sorted(set(_TOKEN.findall(text.lower()))) if self.tokens else []
+        }
+
+    def _apply(self, record: Dict) -> int:
+        with self._lock:
+            doc_id = record['id']
+            previous = self._number_of.get(doc_id)
+            if previous is not None:
+                self._deleted.add(previous)
+            number = len(self._ids)
+            self._ids.append(doc_id)
+            self._number_of[doc_id] = number
+            self._experience.append(record['experience'])
+            primary = record['domain']
+            self._domain.append(self.domain_keys.index(primary) if primary in self.domain_keys else UNKNOWN_DOMAIN)
+            for term in record['terms']:
+                self._terms.setdefault(term, array('I')).append(number)
+            for word in record['words']:
+                self._words.setdefault(word, array('I')).append(number)
+            return number
+
+    def add(self, doc_id: str, text: str, profile=None) -> int:
+        # In memory only; append() also records the resume on disk
+        number = self._apply(self._record(doc_id, text, profile))
+        metrics.incr('search_index.added')
+        return number
+
+    def append(self, documents: Iterable[Tuple[str, str, Optional[Dict]]]) -> List[int]:
+        # Adds (id, text, profile) triples and logs them next to the snapshot.
+        # Profiles are extracted before the lock is taken.
+        records = [self._record(doc_id, text, profile) for doc_id, text, profile in documents]
+        if self._path is None:
+            numbers = [self._apply(record) for record in records]
+        else:
+            with file_lock(self._lock_path()), self._lock:
+                self._refresh_locked()
+                with open(self._log_path(), 'a', encoding='utf-8') as f:
+                    # Drop a partial line left by a writer that died mid-write
+                    if f.tell() != self._log_offset:
+                        f.truncate(self._log_offset)
+                    f.write(''.join(json.dumps(record) + '\n' for record in records))
+                    f.flush()
+                    self._log_offset = f.tell()
+                numbers = [self._apply(record) for record in records]
+                self._logged += len(records)
+                if self._logged >= self.compact_after:
+                    self._compact_locked()
+        metrics.incr('search_index.added', len(records))
+        metrics.set_gauge('search_index.documents', len(self._number_of))
+        return numbers
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            number = self._number_of.pop(doc_id, None)
+            if number is None:
+                return False
+            self._deleted.add(number)
+            return True
+
+    def resolve_domain(self, name: str) -> int:
+        # Accepts the key, the display name or its abbreviation ("pd")
+        name = name.strip().lower()
+        for index, key in enumerate(self.domain_keys):
+            display = self.matcher.domains[key]['name'].lower()
+            abbreviation = display[display.find('(') + 1:display.find(')')] if '(' in display else ''
+            if name in (key, display, abbreviation) or name == display.split(' (')[0]:
+                return index
+        if name in ('unknown', 'other'):
+            return UNKNOWN_DOMAIN
+        raise QueryError(f'Unknown domain: {name}')
+
+    def _postings(self, term: str) -> Iterable[int]:
+        # Taxonomy terms first; other words (and phrases outside the taxonomy,
+        # as an AND of their words) need the token index
+        term = ' '.join(term.lower().split())
+        if term in self._terms:
+            return self._terms[term]
+        if not self.tokens:
+            return ()
+        words = _TOKEN.findall(term)
+        if not words:
+            return ()
+        if len(words) == 1:
+            return self._words.get(words[0], ())
+        lists = sorted((self._words.get(word, ()) for word in words), key=len)
+        found = set(lists[0])
+        for postings in lists[1:]:
+            found.intersection_update(postings)
+        return found
+
+    def _parse(self, query: str):
+        # Boolean query: terms, "quoted phrases", AND / OR / NOT (any case)
+        # and parentheses; adjacent terms are ANDed. Returns a nested tuple.
+        tokens = []
+        position = 0
+        query = query.strip()
+        while position < len(query):
+            match = _QUERY_TOKEN.match(query, position)
+            if match is None:
+                raise QueryError(f'Cannot parse query near: {query[position:]}')
+            position = match.end()
+            if match.group(1):
+                tokens.append(('(', None))
+            elif match.group(2):
+                tokens.append((')', None))
+            elif match.group(3) is not None:
+                tokens.append(('term', match.group(3)))
+            elif match.group(4).lower() in OPERATORS:
+                tokens.append((match.group(4).lower(), None))
+            else:
+                tokens.append(('term', match.group(4)))
+        tokens.append(('end', None))
+        index = 0
+
+        def peek():
+            return tokens[index][0]
+
+        def take(kind):
+            nonlocal index
+            if tokens[index][0] != kind:
+                raise QueryError(f'Expected {kind} in query, found {tokens[index][0]}')
+            index += 1
+            return tokens[index - 1][1]
+
+        def expression():
+            node = conjunction()
+            while peek() == 'or':
+                take('or')
+                node = ('or', node, conjunction())
+            return node
+
+        def conjunction():
+            node = unary()
+            while peek() in ('and', 'not', 'term', '('):
+                if peek() == 'and':
+                    take('and')
+                node = ('and', node, unary())
+            return node
+
+        def unary():
+            if peek() == 'not':
+                take('not')
+                return ('not', unary())
+            if peek() == '(':
+                take('(')
+                node = expression()
+                take(')')
+                return node
+            return ('term', take('term'))
+
+        if peek() == 'end':
+            return None
+        node = expression()
+        take('end')
+        return node
+
+    def _live(self) -> Set[int]:
+        return set(range(len(self._ids))) - self._deleted
+
+    def _evaluate(self, node) -> Set[int]:
+        kind = node[0]
+        if kind == 'term':
+            return set(self._postings(node[1]))
+        if kind == 'not':
+            return self._live() - self._evaluate(node[1])
+        left = self._evaluate(node[1])
+        if kind == 'and':
+            # AND NOT is a difference, without building the complement
+            if node[2][0] == 'not':
+                return left - self._evaluate(node[2][1])
+            if not left:
+                return left
+            return left & self._evaluate(node[2])
+        return left | self._evaluate(node[2])
+
+    def search(self, query: str = '', min_experience: Optional[int] = None, max_experience: Optional[int] = None,
+               domain: Optional[str] = None, limit: int = 50) -> Dict:
+        # Matching ids, most experienced first
+        start = time.perf_counter()
+        self.refresh()
+        with self._lock:
+            tree = self._parse(query)
+            candidates = self._live() if tree is None else self._evaluate(tree) - self._deleted
+            domain_index = self.resolve_domain(domain) if domain else None
+            experience = self._experience
+            domains = self._domain
+            matched = [number for number in candidates
+                       if (domain_index is None or domains[number] == domain_index)
+                       and (min_experience is None or experience[number] >= min_experience)
+                       and (max_experience is None or experience[number] <= max_experience)]
+            matched.sort(key=lambda number: (-experience[number], number))
+            results = []
+            for number in matched[:limit]:
+                domain_key = self.domain_keys[domains[number]] if domains[number] != UNKNOWN_DOMAIN else 'unknown'
+                results.append({'id': self._ids[number], 'experience': experience[number], 'domain': domain_key})
+        elapsed = time.perf_counter() - start
+        metrics.incr('search_index.queries')
+        metrics.observe('search_index.query_seconds', elapsed)
+        return {'total': len(matched), 'results': results, 'query_ms': round(elapsed * 1000, 3)}
+
+    def terms(self) -> Dict[str, int]:
+        # Document frequency of every taxonomy term in the index
+        with self._lock:
+            return {term: len(postings) for term, postings in sorted(self._terms.items())}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            postings = sum(len(p) for p in self._terms.values()) + sum(len(p) for p in self._words.values())
+            return {
+                'documents': len(self._number_of),
+                'superseded': len(self._deleted),
+                'terms': len(self._terms),
+                'words': len(self._words),
+                'postings': postings,
+                'posting_bytes': postings * array('I').itemsize,
+                'tokens': self.tokens
+            }
+
+    def state(self) -> Dict:
+        # marshal-friendly: posting lists are stored as their raw bytes
+        with self._lock:
+            return {
+                'ids': list(self._ids),
+                'deleted': sorted(self._deleted),
+                'experience': self._experience.tobytes(),
+                'domain': self._domain.tobytes(),
+                'terms': {term: postings.tobytes() for term, postings in self._terms.items()},
+                'words': {word: postings.tobytes() for word, postings in self._words.items()}
+            }
+
+    def _apply_state(self, state: Dict):
+        def unpack(data, typecode):
+            values = array(typecode)
+            values.frombytes(data)
+            return values
+
+        self._ids = state['ids']
+        self._deleted = set(state['deleted'])
+        self._number_of = {doc_id: number for number, doc_id in enumerate(self._ids) if number not in self._deleted}
+        self._experience = unpack(state['experience'], 'H')
+        self._domain = unpack(state['domain'], 'B')
+        self._terms = {term: unpack(data, 'I') for term, data in state['terms'].items()}
+        self._words = {word: unpack(data, 'I') for word, data in state['words'].items()}
+
+    def _log_path(self) -> str:
+        # Tagged with the version, so a log is never replayed into an index
+        # built with another taxonomy or token setting
+        return f'{self._path}.{self.version.hex()[:16]}.log'
+
+    def _lock_path(self) -> str:
+        # Every path takes this file lock before self._lock, never the other
+        # way round, or a writer and a refreshing reader deadlock
+        return self._path + '.lock'
+
+    def load(self, path: str) -> bool:
+        # Attaches the index to path. False (and an empty index) when there is
+        # nothing there yet or it was built with another taxonomy or token
+        # setting.
+        with file_lock(path + '.lock', shared=True), self._lock:
+            self._path = path
+            self._load_locked()
+            return bool(self._ids)
+
+    def _load_locked(self):
+        self._clear()
+        self._loaded_mtime = _mtime(self._path)
+        state = snapshot.read_snapshot(self._path, self.version) if self._loaded_mtime is not None else None
+        if state is not None:
+            self._apply_state(state)
+        self._log_offset = 0
+        self._logged = 0
+        self._read_log()
+        metrics.set_gauge('search_index.documents', len(self._number_of))
+
+    def _read_log(self):
+        # Applies complete log lines written since the last read
+        try:
+            with open(self._log_path(), 'rb') as f:
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b'\n') + 1
+        for line in data[:end].splitlines():
+            if line:
+                self._apply(json.loads(line))
+                self._logged += 1
+        self._log_offset += end
+
+    def refresh(self):
+        # Pick up a snapshot or log entries written by another process; the
+        # common case is two stat calls
+        if self._path is None:
+            return
+        if _mtime(self._path) == self._loaded_mtime and _size(self._log_path()) == self._log_offset:
+            return
+        with file_lock(self._lock_path(), shared=True), self._lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self):
+        # Compaction replaces the snapshot and empties the log, which needs a
+        # full reload; otherwise only the log's new lines are read
+        if _mtime(self._path) != self._loaded_mtime or _size(self._log_path()) < self._log_offset:
+            self._load_locked()
+        else:
+            self._read_log()
+
+    def compact(self):
+        # Folds the log into a fresh snapshot
+        if self._path is None:
+            return
+        with file_lock(self._lock_path()), self._lock:
+            self._refresh_locked()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        snapshot.write_snapshot(self._path, self.version, self.state())
+        open(self._log_path(), 'w').close()
+        self._loaded_mtime = _mtime(self._path)
+        self._log_offset = 0
+        self._logged = 0
+        metrics.incr('search_index.compactions')
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def main(argv: Optional[List[str]] = None):
+    from matcher import DomainMatcher
+
+    parser = argparse.ArgumentParser(description='Build or query a resume search index')
+    parser.add_argument('index', help='Index file')
+    parser.add_argument('--tokens', action='store_true', help='Index every word, not just taxonomy terms')
+    sub = parser.add_subparsers(dest='command', required=True)
+    add = sub.add_parser('add', help='Add resumes (ids are the file paths)')
+    add.add_argument('inputs', nargs='+', help='Files or glob patterns')
+    sub.add_parser('stats')
+    query = sub.add_parser('query')
+    query.add_argument('query', nargs='?', default='', help='e.g. \'tempus AND voltus\'')
+    query.add_argument('--min-experience', type=int)
+    query.add_argument('--max-experience', type=int)
+    query.add_argument('--domain')
+    query.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    matcher = DomainMatcher()
+    index = SearchIndex(matcher, tokens=args.tokens)
+    index.load(args.index)
+    if args.command == 'add':
+        documents = []
+        failed = 0
+        for pattern in args.inputs:
+            for path in sorted(glob.glob(pattern)) or [pattern]:
+                try:
+                    extraction = matcher.extract(path)
+                except Exception as e:
+                    extraction = {'text': str(e), 'extractor': ''}
+                # Failed extractions come back as a message with no extractor
+                if not extraction['extractor']:
+                    print(f"{path}: {extraction['text']}")
+                    failed += 1
+                    continue
+                documents.append((path, extraction['text'], None))
+        index.append(documents)
+        index.compact()
+        print(json.dumps({'added': len(documents), 'failed': failed, **index.stats()}))
+    elif args.command == 'stats':
+        print(json.dumps(index.stats(), indent=2))
+    else:
+        try:
+            found = index.search(args.query, args.min_experience, args.max_experience, args.domain, args.limit)
+        except QueryError as e:
+            parser.error(str(e))
+        print(json.dumps(found, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Heading phrases per section. A heading is a line holding only the phrase
+# (optionally bulleted, optionally followed by ":" and inline content, as in
+# "Skills: Python, Perl"). Bare "qualifications" is how JDs head their
+# requirements; resumes write "educational/academic qualifications".
+SECTION_HEADINGS = {
+    'summary': [
+        'summary', 'professional summary', 'career summary', 'profile summary', 'profile', 'objective',
+        'career objective', 'professional objective', 'about me'
+    ],
+    'experience': [
+        'experience', 'work experience', 'professional experience', 'employment history', 'employment',
+        'work history', 'career history', 'relevant experience', 'industry experience'
+    ],
+    'skills': [
+        'skills', 'technical skills', 'key skills', 'core skills', 'skill set', 'skillset', 'core competencies',
+        'technical expertise', 'areas of expertise', 'tools', 'tools and technologies', 'eda tools',
+        'programming languages', 'languages'
+    ],
+    'education': [
+        'education', 'educational qualification', 'educational qualifications', 'academic qualification',
+        'academic qualifications', 'academics', 'academic background', 'education and training'
+    ],
+    'projects': [
+        'projects', 'key projects', 'academic projects', 'major projects', 'project experience',
+        'project details', 'projects undertaken'
+    ],
+    'certifications': [
+        'certifications', 'certification', 'certificates', 'courses', 'training', 'trainings'
+    ],
+    'achievements': [
+        'achievements', 'awards', 'honors', 'honours', 'publications', 'accomplishments'
+    ],
+    'personal': [
+        'hobbies', 'interests', 'hobbies and interests', 'personal details', 'personal information',
+        'personal profile', 'languages known', 'declaration', 'extracurricular activities',
+        'extra curricular activities', 'references'
+    ],
+    'requirements': [
+        'requirements', 'job requirements', 'qualifications', 'required qualifications',
+        'preferred qualifications', 'minimum qualifications', 'responsibilities', 'key responsibilities',
+        'job description', 'what you will do', 'must have', 'nice to have'
+    ]
+}
+
+# Text before the first heading (name, contact details, headline)
+HEADER = 'header'
+
+_SECTION_OF = {phrase: section for section, phrases in SECTION_HEADINGS.items() for phrase in phrases}
+_PHRASES = '|'.join(re.escape(phrase).replace(r'\ ', r'\s+')
+                    for phrase in sorted(_SECTION_OF, key=len, reverse=True))
+_HEADING = re.compile(
+    r'^[ \t]*(?:[#*>•▪●\-]+[ \t]*)?(' + _PHRASES + r')[ \t]*(?:([:–\-])|(?=\())?[ \t]*(.*)$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def segment(text: str) -> Dict[str, List[List[int]]]:
+    # One regex pass over the text. Returns [start, end) character spans per
+    # section; empty when no heading was found.
+    headings = []
+    for match in _HEADING.finditer(text):
+        separator, rest = match.group(2), match.group(3).strip()
+        if rest and not separator and not rest.startswith('('):
+            # "Experience in RTL design ..." is a sentence, not a heading
+            continue
+        section = _SECTION_OF[' '.join(match.group(1).lower().split())]
+        content_start = match.start(3) if separator else match.end()
+        headings.append((match.start(), content_start, section))
+
+    sections = {}
+    if not headings:
+        return sections
+    if text[:headings[0][0]].strip():
+        sections[HEADER] = [[0, headings[0][0]]]
+    for i, (_, content_start, section) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        if end > content_start:
+            sections.setdefault(section, []).append([content_start, end])
+    return sections
+
+
+def section_text(text: str, sections: Dict[str, List[List[int]]], include: Optional[Iterable[str]] = None,
+                 exclude: Iterable[str] = (), requires: Iterable[str] = ()) -> str:
+    # Text of the wanted sections. Falls back to the whole text when the
+    # document is unsegmented or none of the `requires` sections was found,
+    # so scoping only applies where there is evidence for it.
+    if not sections:
+        return text
+    requires = tuple(requires)
+    if requires and not any(name in sections for name in requires):
+        return text
+    exclude = set(exclude)
+    names = [name for name in sections if (include is None or name in include) and name not in exclude]
+    spans = sorted(span for name in names for span in sections[name])
+    return '\n'.join(text[start:end] for start, end in spans)
@@ -0,0 +1,361 @@
+import argparse
+import hashlib
+import heapq
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from multiprocessing.connection import Client, Listener
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from metrics import metrics
+from profile_store import ProfileStore
+
+
+
+def authkey_from_env() -> bytes:
+    # Shards accept profiles and queries from anyone holding the key, so there
+    # is deliberately no built-in default
+    authkey = os.environ.get('SHARD_AUTHKEY', '')
+    if not authkey:
+        raise RuntimeError('SHARD_AUTHKEY must be set to run or query shards')
+    return authkey.encode()
+
+
+def _require_authkey(authkey: Optional[bytes]) -> bytes:
+    if not authkey:
+        raise ValueError('A non-empty shard authkey is required')
+    return authkey
+
+
+# Messages are JSON rather than pickle, so a peer can only ever send data
+def _send(conn, message):
+    conn.send_bytes(json.dumps(message).encode('utf-8'))
+
+
+def _recv(conn):
+    return json.loads(conn.recv_bytes())
+
+
+def _wire_profile(profile) -> Dict:
+    # Only what scoring reads; lazy profiles are not JSON serializable
+    return {'domain': profile['domain'], 'experience': profile['experience'], 'skills': profile['skills']}
+
+
+def shard_for(doc_id: str, shard_count: int) -> int:
+    digest = hashlib.sha256(doc_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def shard_directory(base: str, shard: int) -> str:
+    return os.path.join(base, f'shard-{shard:03d}')
+
+
+def partition(rows: Iterable[Tuple[str, Dict]], shard_count: int) -> List[List[Tuple[str, Dict]]]:
+    parts = [[] for _ in range(shard_count)]
+    for doc_id, profile in rows:
+        parts[shard_for(doc_id, shard_count)].append((doc_id, profile))
+    return parts
+
+
+def append_sharded(base: str, shard_count: int, rows: Iterable[Tuple[str, Dict]], matcher) -> List[int]:
+    counts = []
+    for shard, part in enumerate(partition(rows, shard_count)):
+        store = ProfileStore(shard_directory(base, shard), matcher)
+        counts.append(store.append(part))
+        store.close()
+    return counts
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+# Serves one shard's profile store over a multiprocessing connection. Works
+# the same whether the coordinator is on this host or another one.
+def serve(directory: str, address: Tuple[str, int], authkey: bytes, ready=None):
+    from matcher import DomainMatcher
+
+    authkey = _require_authkey(authkey)
+    store = ProfileStore(directory, DomainMatcher())
+    listener = Listener(address, authkey=authkey)
+    if ready is not None:
+        ready.set()
+
+    def handle(conn):
+        with conn:
+            while True:
+                try:
+                    message = _recv(conn)
+                except (EOFError, OSError):
+                    return
+                except ValueError as e:
+                    _send(conn, ['error', f'Malformed message: {e}'])
+                    continue
+                try:
+                    if message[0] == 'query':
+                        _, jd_profile, top_k = message
+                        _send(conn, ['ok', store.query(jd_profile, int(top_k))])
+                    elif message[0] == 'append':
+                        _send(conn, ['ok', store.append((doc_id, profile) for doc_id, profile in message[1])])
+                    elif message[0] == 'ping':
+                        _send(conn, ['ok', len(store)])
+                    else:
+                        _send(conn, ['error', f'Unknown command {message[0]}'])
+                except Exception as e:
+                    _send(conn, ['error', str(e)])
+
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception:
+            continue
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+class _ShardClient:
+    # One persistent connection per shard, reopened after any failure
+    def __init__(self, address: Tuple[str, int], authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def call(self, message, timeout: float):
+        deadline = time.monotonic() + timeout
+        if not self._lock.acquire(timeout=timeout):
+            raise TimeoutError('shard busy')
+        try:
+            if self._conn is None:
+                self._conn = Client(self.address, authkey=self.authkey)
+            _send(self._conn, message)
+            # A reply arriving after the deadline would be read by the next
+            # query, so a timed out connection is dropped instead of reused
+            if not self._conn.poll(max(0.0, deadline - time.monotonic())):
+                raise TimeoutError(f'timed out after {timeout:g}s')
+            status, value = _recv(self._conn)
+        except Exception:
+            self.reset()
+            raise
+        finally:
+            self._lock.release()
+        if status != 'ok':
+            raise RuntimeError(value)
+        return value
+
+    def reset(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+
+# Fans a JD query out to every shard and merges their top-k lists. A shard
+# that errors or misses the deadline is reported and left out, so callers
+# get partial results instead of waiting on the slowest node.
+class ShardCoordinator:
+    def __init__(self, addresses: List[str], authkey: bytes, timeout: float = 2.0):
+        authkey = _require_authkey(authkey)
+        self.addresses = addresses
+        self.timeout = timeout
+        self.clients = [_ShardClient(parse_address(address), authkey) for address in addresses]
+        # Spare threads so a hung shard does not starve later queries
+        self._executor = ThreadPoolExecutor(max_workers=max(4, len(addresses) * 4))
+
+    def query(self, jd_profile: Dict, top_k: int = 20) -> Dict:
+        start = time.perf_counter()
+        message = ['query', _wire_profile(jd_profile), top_k]
+        futures = {self._executor.submit(client.call, message, self.timeout): index
+                   for index, client in enumerate(self.clients)}
+        # Connecting has no timeout of its own, so the wait is bounded too
+        done, not_done = wait(futures, timeout=self.timeout + 0.5)
+
+        merged = []
+        scanned = 0
+        failed = []
+        for future in done:
+            index = futures[future]
+            try:
+                found = future.result()
+            except Exception as e:
+                failed.append({'shard': self.addresses[index], 'error': str(e)})
+                continue
+            scanned += found['scanned']
+            merged.extend(found['results'])
+        for future in not_done:
+            index = futures[future]
+            failed.append({'shard': self.addresses[index], 'error': f'timed out after {self.timeout:g}s'})
+
+        metrics.incr('shards.queries')
+        metrics.incr('shards.failures', len(failed))
+        metrics.observe('shards.query_seconds', time.perf_counter() - start)
+        return {
+            'results': heapq.nlargest(top_k, merged, key=lambda result: result['final_score']),
+            'scanned': scanned,
+            'shards': len(self.clients),
+            'failed_shards': failed,
+            'partial': bool(failed)
+        }
+
+    def close(self):
+        for client in self.clients:
+            client.reset()
+        self._executor.shutdown(wait=False)
+
+
+def start_local_shards(base: str, shard_count: int, base_port: int, authkey: bytes,
+                       timeout: float = 30) -> Tuple[List[multiprocessing.Process], List[str]]:
+    authkey = _require_authkey(authkey)
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    addresses = []
+    for shard in range(shard_count):
+        ready = context.Event()
+        address = ('127.0.0.1', base_port + shard)
+        process = context.Process(target=serve, args=(shard_directory(base, shard), address, authkey, ready),
+                                  daemon=True)
+        process.start()
+        processes.append(process)
+        # Stop waiting early if the shard died (e.g. its port was taken)
+        deadline = time.monotonic() + timeout
+        while not ready.wait(0.1) and process.is_alive() and time.monotonic() < deadline:
+            pass
+        if not ready.is_set():
+            for started in processes:
+                started.terminate()
+                started.join()
+            raise RuntimeError(f'Shard {shard} did not start listening on port {base_port + shard} '
+                               f'within {timeout:g}s (exit code {process.exitcode})')
+        addresses.append(f'127.0.0.1:{base_port + shard}')
+    return processes, addresses
+
+
+def _bench(args):
+    import random
+    import secrets
+    import tempfile
+
+    from matcher import DomainMatcher
+
+    matcher = DomainMatcher()
+    rng = random.Random(1)
+    domains = list(matcher.domains.keys())
+    skills = [(category, skill) for category, values in matcher.skill_categories.items() for skill in values]
+
+    def synthetic_profile():
+        primary = rng.choice(domains)
+        chosen = rng.sample(skills, 12)
+        found = {category: [] for category in matcher.skill_categories}
+        for category, skill in chosen:
+            found[category].append(skill)
+        scores = {key: rng.randint(0, 5) for key in domains}
+        scores[primary] = rng.randint(6, 15)
+        return {'domain': {'primary_domain': primary, 'all_scores': scores}, 'experience': rng.randint(0, 20),
+                'skills': found}
+
+    rows = [(f'doc-{i}', synthetic_profile()) for i in range(args.documents)]
+    jd_profile = matcher.profile_document(args.jd_text)
+    report = []
+    for shard_count in args.shard_counts:
+        with tempfile.TemporaryDirectory() as base:
+            append_sharded(base, shard_count, rows, matcher)
+            # Throwaway key: these shards only ever talk to this process
+            authkey = secrets.token_bytes(16)
+            processes, addresses = start_local_shards(base, shard_count, args.base_port, authkey)
+            coordinator = ShardCoordinator(addresses, authkey, timeout=30)
+            try:
+                coordinator.query(jd_profile, 10)
+                lock = threading.Lock()
+                done = [0]
+                deadline = time.perf_counter() + args.duration
+
+                def client():
+                    while time.perf_counter() < deadline:
+                        coordinator.query(jd_profile, 10)
+                        with lock:
+                            done[0] += 1
+
+                threads = [threading.Thread(target=client) for _ in range(args.concurrency)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+                report.append({'shards': shard_count, 'queries': done[0],
+                               'queries_per_second': round(done[0] / elapsed, 2)})
+            finally:
+                coordinator.close()
+                for process in processes:
+                    process.terminate()
+                    process.join()
+    print(json.dumps({'documents': args.documents, 'concurrency': args.concurrency, 'runs': report}, indent=2))
+
+
+def main(argv: Optional[List[str]] = None):
+    from matcher import DomainMatcher
+
+    parser = argparse.ArgumentParser(description='Sharded profile store: split, serve, query and benchmark')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    split = sub.add_parser('split', help='Partition an existing profile store into shard directories')
+    split.add_argument('--source', required=True)
+    split.add_argument('--base', required=True)
+    split.add_argument('--shards', type=int, required=True)
+
+    serve_cmd = sub.add_parser('serve', help='Serve one shard directory')
+    serve_cmd.add_argument('--dir', required=True)
+    serve_cmd.add_argument('--address', default='127.0.0.1:6001', help='host:port to listen on')
+
+    query = sub.add_parser('query', help='Query running shards with a JD file')
+    query.add_argument('--shards', required=True, help='Comma separated host:port list')
+    query.add_argument('--jd', required=True)
+    query.add_argument('--top-k', type=int, default=20)
+    query.add_argument('--timeout', type=float, default=2.0)
+
+    bench = sub.add_parser('bench', help='Measure query throughput for several local shard counts')
+    bench.add_argument('--documents', type=int, default=200000)
+    bench.add_argument('--shard-counts', type=lambda value: [int(v) for v in value.split(',')], default=[1, 2, 4])
+    bench.add_argument('--concurrency', type=int, default=8)
+    bench.add_argument('--duration', type=float, default=10)
+    bench.add_argument('--base-port', type=int, default=6100)
+    bench.add_argument('--jd-text', default='Design verification engineer, 5 years experience with UVM, '
+                                           'SystemVerilog, VCS, Verdi, Python, AXI and PCIe on 7nm SoC')
+    args = parser.parse_args(argv)
+
+    if args.command == 'split':
+        matcher = DomainMatcher()
+        source = ProfileStore(args.source, matcher)
+        rows = []
+        for doc_id, (number, row) in source._latest_rows().items():
+            rows.append((doc_id, source.profile(number, row)))
+        counts = append_sharded(args.base, args.shards, rows, matcher)
+        source.close()
+        print(json.dumps({'shards': counts}))
+    elif args.command == 'serve':
+        print(f'Serving {args.dir} on {args.address}', file=sys.stderr)
+        serve(args.dir, parse_address(args.address), authkey_from_env())
+    elif args.command == 'query':
+        matcher = DomainMatcher()
+        jd_profile = matcher.profile_document(matcher.extract_text(args.jd))
+        coordinator = ShardCoordinator(args.shards.split(','), authkey_from_env(), timeout=args.timeout)
+        found = coordinator.query(jd_profile, args.top_k)
+        coordinator.close()
+        print(json.dumps({
+            'scanned': found['scanned'],
+            'failed_shards': found['failed_shards'],
+            'results': [{'id': r['id'], 'final_score': r['final_score'], 'status': r['status']}
+                        for r in found['results']]
+        }, indent=2))
+    else:
+        _bench(args)
+
+
+if __name__ == '__main__':
+    main()
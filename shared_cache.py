@@ -0,0 +1,156 @@
+import hashlib
+import importlib
+import marshal
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from metrics import metrics
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_used ON cache (used);
+'''
+
+
+def default_path() -> str:
+    # A directory only this user can enter, on tmpfs when there is one so the
+    # cache lives in shared memory: the per-user runtime directory, else one
+    # of our own under /dev/shm or the temp directory (already per user on
+    # Windows, which has no uids)
+    runtime = os.environ.get('XDG_RUNTIME_DIR', '')
+    if runtime and os.path.isdir(runtime):
+        directory = os.path.join(runtime, 'jd_matcher')
+    elif hasattr(os, 'getuid'):
+        base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        directory = os.path.join(base, f'jd_matcher-{os.getuid()}')
+    else:
+        directory = os.path.join(tempfile.gettempdir(), 'jd_matcher')
+    return os.path.join(directory, 'cache.sqlite')
+
+
+def private_directory(directory: str):
+    # Creates directory as 0700, or checks that an existing one is a real
+    # directory owned by us that nobody else can write to: cached values are
+    # unmarshalled, so no other user may be able to plant them. Windows has
+    # neither owners nor modes here and relies on the per-user temp directory.
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if not hasattr(os, 'getuid'):
+        return
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f'{directory} is not a directory owned by this user')
+    if info.st_mode & 0o022:
+        raise PermissionError(f'{directory} is writable by other users')
+
+
+def code_version(*module_names: str) -> str:
+    # Digest of the source of the modules that produce cached values, so
+    # results cached by an older deploy (tmpfs outlives restarts) are never read
+    digest = hashlib.sha256()
+    for name in module_names:
+        with open(importlib.import_module(name).__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+# Key-value cache shared by every worker process on the host: a SQLite
+# database in WAL mode, where readers never block each other or the writer.
+# Reads only write back their access time when it is older than
+# touch_interval, so hot keys stay cheap to read and eviction is LRU to
+# within that interval. Size is checked every evict_every writes per process
+# and trimmed to 90% of max_entries once over it, so it never exceeds
+# max_entries by more than evict_every per worker. Values are marshalled, so
+# they must be plain dicts, lists, strings and numbers, and the database must
+# sit in a directory only this user can write (private_directory).
+class SharedCache:
+    def __init__(self, path: str, max_entries: int = 20000, touch_interval: float = 60, evict_every: int = 100):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        private_directory(os.path.dirname(os.path.abspath(path)))
+        # SQLite gives the -wal and -shm files the database file's mode
+        os.close(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600))
+        os.chmod(path, 0o600)
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # A cache in memory gains nothing from fsync
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            connection = self._connection()
+            row = connection.execute('SELECT value, used FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                metrics.incr('shared_cache.misses')
+                return None
+            now = time.time()
+            if now - row[1] > self.touch_interval:
+                connection.execute('UPDATE cache SET used = ? WHERE key = ?', (now, key))
+            metrics.incr('shared_cache.hits')
+            return marshal.loads(row[0])
+        except (sqlite3.Error, ValueError, EOFError, TypeError):
+            # A cache failure is a miss, never a request failure
+            metrics.incr('shared_cache.errors')
+            return None
+
+    def put(self, key: str, value: Any):
+        try:
+            data = marshal.dumps(value)
+            connection = self._connection()
+            connection.execute('INSERT OR REPLACE INTO cache (key, value, used) VALUES (?, ?, ?)',
+                               (key, data, time.time()))
+            metrics.incr('shared_cache.writes')
+            with self._writes_lock:
+                self._writes += 1
+                evict = self._writes % self.evict_every == 0
+            if evict:
+                self.evict()
+        except (sqlite3.Error, ValueError):
+            metrics.incr('shared_cache.errors')
+
+    def evict(self) -> int:
+        # Drops the least recently used entries once above max_entries,
+        # leaving headroom so the next check is not immediately over again
+        connection = self._connection()
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self.max_entries:
+            return 0
+        excess = count - self.max_entries * 9 // 10
+        connection.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY used LIMIT ?)', (excess,))
+        metrics.incr('shared_cache.evicted', excess)
+        return excess
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def stats(self) -> Dict:
+        try:
+            count = self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        except sqlite3.Error:
+            count = None
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal', '-shm')
+                   if os.path.exists(self.path + suffix))
+        return {'path': self.path, 'entries': count, 'max_entries': self.max_entries, 'bytes': size}
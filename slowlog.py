@@ -0,0 +1,52 @@
+import json
+import logging
+import logging.handlers
+import os
+import time
+from typing import Dict
+
+from metrics import metrics
+from stages import StageRecorder
+
+
+def rotating_logger(path: str, max_bytes: int, backups: int) -> logging.Logger:
+    # A logger writing bare lines to a size-rotated file
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                   encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger = logging.getLogger(f'rotating.{path}')
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+# Size-rotated JSON-lines log of requests slower than threshold_ms. Each
+# record has the stage breakdown, counters and the shape of every input
+# document; documents are identified by their SHA-256 (the DocumentStore
+# handle), never by their text. "{pid}" in the path gives every worker
+# process its own file, since rotation is not safe across processes.
+class SlowRequestLog:
+    def __init__(self, path: str, threshold_ms: float = 2000, max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 5):
+        self.path = path.format(pid=os.getpid())
+        self.threshold = threshold_ms / 1000
+        self._logger = rotating_logger(self.path, max_bytes, backups)
+
+    def is_slow(self, seconds: float) -> bool:
+        return seconds >= self.threshold
+
+    def write(self, recorder: StageRecorder, seconds: float, **request_info) -> Dict:
+        record = {
+            'time': round(time.time(), 3),
+            'duration_ms': round(seconds * 1000, 2)
+        }
+        record.update(request_info)
+        record['stages'] = [{'name': entry['name'], 'ms': round(entry['seconds'] * 1000, 3)}
+                            for entry in recorder.stages]
+        record['counts'] = dict(recorder.counts)
+        record['documents'] = list(recorder.documents)
+        self._logger.info(json.dumps(record, separators=(',', ':'), default=str))
+        metrics.incr('slow_requests.logged')
+        return record
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import Dict, Optional
+
+# Snapshot file: a fixed header followed by a marshal payload. The version is
+# a digest of everything the state was built from, the file format and the
+# interpreter (marshal's format is only stable within one Python version), so
+# a snapshot is only ever read by a process that would have written the same.
+MAGIC = b'JDSN'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHH32sQ')
+
+
+def state_version(*sources) -> bytes:
+    encoded = json.dumps([FORMAT_VERSION, list(sys.version_info[:3]), marshal.version, sources],
+                         sort_keys=True).encode('utf-8')
+    return hashlib.sha256(encoded).digest()
+
+
+def write_snapshot(path: str, version: bytes, state: Dict):
+    payload = marshal.dumps(state)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, version, len(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def read_snapshot(path: str, version: bytes) -> Optional[Dict]:
+    # None when the file is missing, truncated, corrupt or for another version
+    try:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if len(mapped) < HEADER.size:
+                    return None
+                magic, fmt, _, stored_version, length = HEADER.unpack_from(mapped)
+                if magic != MAGIC or fmt != FORMAT_VERSION or stored_version != version:
+                    return None
+                if HEADER.size + length > len(mapped):
+                    return None
+                with memoryview(mapped) as view:
+                    with view[HEADER.size:HEADER.size + length] as payload:
+                        return marshal.loads(payload)
+    except (OSError, ValueError, EOFError, TypeError):
+        return None
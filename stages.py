@@ -0,0 +1,140 @@
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from metrics import metrics
+
+_local = threading.local()
+# tracemalloc's peak is process-wide and resetting it affects every thread, so
+# requests that track memory are measured one at a time (see begin)
+_memory_lock = threading.Lock()
+
+
+# Collects per-stage wall time (always) and peak traced memory (when
+# tracemalloc is running) for the request handled by the current thread.
+# Memory figures cover every allocation in the process during the stage;
+# they are exact for the request only because tracked requests never overlap
+# (background threads still count towards them).
+class StageRecorder:
+    def __init__(self, track_memory: bool = False):
+        self.track_memory = track_memory and tracemalloc.is_tracing()
+        self.stages = []
+        self.counts = {}
+        # Shape of each input document (type, size, pages, hash), no content
+        self.documents = []
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name: str):
+        # Yields the stage entry so callers can attach extra figures (e.g. bytes)
+        entry = {'name': name}
+        frame = {'peak': 0, 'start_bytes': 0}
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent['peak'] = max(parent['peak'], peak)
+            frame['start_bytes'] = current
+            tracemalloc.reset_peak()
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] = time.perf_counter() - start
+            self._stack.pop()
+            if self.track_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                absolute_peak = max(peak, frame['peak'])
+                if self._stack:
+                    parent = self._stack[-1]
+                    parent['peak'] = max(parent['peak'], absolute_peak)
+                entry['peak_bytes'] = max(0, absolute_peak - frame['start_bytes'])
+            self.stages.append(entry)
+
+    def add(self, name: str, seconds: float, peak_bytes: Optional[int] = None, **extra):
+        # Record a stage measured elsewhere (e.g. inside a sandbox worker)
+        entry = {'name': name, 'seconds': seconds}
+        if peak_bytes is not None:
+            entry['peak_bytes'] = peak_bytes
+        entry.update(extra)
+        self.stages.append(entry)
+
+    def count(self, name: str, value: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def document(self, **info):
+        self.documents.append(info)
+
+    def peak_bytes(self) -> int:
+        return max((entry.get('peak_bytes', 0) for entry in self.stages), default=0)
+
+    def summary(self) -> List[Dict]:
+        rows = []
+        for entry in self.stages:
+            row = dict(entry)
+            row['seconds'] = round(entry['seconds'], 6)
+            rows.append(row)
+        return rows
+
+    def server_timing(self) -> str:
+        parts = []
+        for entry in self.stages:
+            part = f"{entry['name']};dur={entry['seconds'] * 1000:.2f}"
+            extras = ' '.join(f'{key}={value}' for key, value in entry.items() if key not in ('name', 'seconds'))
+            if extras:
+                part += f';desc="{extras}"'
+            parts.append(part)
+        return ', '.join(parts)
+
+    def publish(self):
+        for entry in self.stages:
+            for key, value in entry.items():
+                if key != 'name' and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metrics.observe(f"stage.{entry['name']}.{key}", value)
+
+
+def begin(track_memory: bool = False) -> StageRecorder:
+    # With memory tracking on, requests are serialized until end(): a
+    # diagnostic mode that trades throughput for exact per-request figures
+    recorder = StageRecorder(track_memory)
+    if recorder.track_memory:
+        _memory_lock.acquire()
+    _local.recorder = recorder
+    return recorder
+
+
+def end() -> Optional[StageRecorder]:
+    recorder = getattr(_local, 'recorder', None)
+    _local.recorder = None
+    if recorder is not None and recorder.track_memory:
+        _memory_lock.release()
+    return recorder
+
+
+def current() -> Optional[StageRecorder]:
+    return getattr(_local, 'recorder', None)
+
+
+@contextmanager
+def stage(name: str):
+    recorder = current()
+    if recorder is None:
+        yield {'name': name}
+        return
+    with recorder.stage(name) as entry:
+        yield entry
+
+
+def count(name: str, value: int = 1):
+    recorder = current()
+    if recorder is not None:
+        recorder.count(name, value)
+
+
+def document(**info):
+    recorder = current()
+    if recorder is not None:
+        recorder.document(**info)
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PD_RESUME = ('Physical design engineer with 6 years of experience. Floorplan, placement, CTS and routing '
+             'with Innovus and ICC2, timing closure with PrimeTime STA, IR drop analysis with Voltus.')
+DV_RESUME = ('Design verification engineer with 4 years of experience in UVM and SystemVerilog testbenches, '
+             'coverage closure with VCS and Verdi, AXI and PCIe protocols.')
+PD_JD = ('Hiring a physical design engineer, 5 years experience required. Innovus, PrimeTime, STA, '
+         'floorplan, CTS, routing and Tempus signoff.')
+
+
+@pytest.fixture(scope='session')
+def matcher():
+    from matcher import DomainMatcher
+
+    return DomainMatcher()
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    # app.py configures itself from the environment at import and writes
+    # relative to the working directory, so both point at a scratch directory
+    root = tmp_path_factory.mktemp('app')
+    os.environ.update({
+        'EXTRACTION_SANDBOX': '0',
+        'SHARED_CACHE_PATH': 'off',
+        'SEARCH_INDEX_PATH': str(root / 'search.index'),
+        'SLOW_REQUEST_LOG': str(root / 'slow-{pid}.jsonl'),
+        'PROFILING_DIR': str(root / 'profiles'),
+    })
+    previous = os.getcwd()
+    os.chdir(root)
+    try:
+        import app
+        app.app.config['TESTING'] = True
+        yield app
+    finally:
+        os.chdir(previous)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
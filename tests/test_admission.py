@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def wait_for_queue(controller, depth):
+    deadline = time.monotonic() + 5
+    while controller.status()['queue_depth'] < depth and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_cost_estimate_scales_with_type_and_size_and_stays_admissible():
+    controller = AdmissionController(capacity=16, cheap_reserve=4)
+    assert controller.estimate_cost([], text_bytes=500) == 1
+    assert controller.estimate_cost([('resume.PDF', 250 * 1024)]) == 6
+    assert controller.estimate_cost([('resume.docx', 10)], text_bytes=10) == 3
+    assert controller.estimate_cost([('huge.pdf', 100 * 1024 * 1024)]) == 12
+
+
+def test_cheap_reserve_keeps_text_requests_flowing():
+    controller = AdmissionController(capacity=4, cheap_reserve=2, cheap_cost=1, queue_timeout=0.05)
+    heavy = controller.acquire('a', 2)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('a', 2)
+    assert rejected.value.reason == 'queue_timeout'
+    assert rejected.value.retry_after >= 1
+    cheap = [controller.acquire('b', 1), controller.acquire('c', 1)]
+    assert controller.status()['in_flight_cost'] == 4
+    for ticket in [heavy] + cheap:
+        controller.release(ticket)
+    assert controller.status()['in_flight_cost'] == 0
+
+
+def test_queue_bounds_reject_instead_of_waiting():
+    controller = AdmissionController(capacity=2, cheap_reserve=0, max_queue=2, max_queue_per_client=1,
+                                     queue_timeout=5)
+    held = controller.acquire('a', 2)
+    waiters = [threading.Thread(target=lambda c=c: controller.release(controller.acquire(c, 1)))
+               for c in ('a', 'b')]
+    for waiter in waiters:
+        waiter.start()
+    wait_for_queue(controller, 2)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('c', 1)
+    assert rejected.value.reason == 'queue_full'
+    controller.release(held)
+    for waiter in waiters:
+        waiter.join(5)
+    assert controller.status()['queue_depth'] == 0
+
+    held = controller.acquire('a', 2)
+    waiter = threading.Thread(target=lambda: controller.release(controller.acquire('a', 1)))
+    waiter.start()
+    wait_for_queue(controller, 1)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire('a', 1)
+    assert rejected.value.reason == 'client_queue_full'
+    controller.release(held)
+    waiter.join(5)
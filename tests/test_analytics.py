@@ -0,0 +1,67 @@
+import time
+
+from analytics import EXPERIENCE_LABELS, SCORE_LABELS, BatchAnalytics, BatchRegistry
+from conftest import DV_RESUME, PD_JD, PD_RESUME
+
+
+def result(score, status='MATCH', domain='Physical Design (PD)'):
+    return {'final_score': score, 'status': status, 'resume_domain': {'domain_name': domain}}
+
+
+def test_histograms_and_bands():
+    batch = BatchAnalytics()
+    for score in (0, 59.9, 60, 74.9, 75, 100):
+        batch.add(result(score))
+    batch.add(result(0, 'REJECT', 'Design Verification (DV)'))
+    batch.add_error()
+    snapshot = batch.snapshot()
+    assert snapshot['processed'] == 7
+    assert snapshot['errors'] == 1
+    assert snapshot['match_bands'] == {'strong': 2, 'good': 2, 'weak': 3}
+    assert snapshot['score'] == {'mean': round(369.8 / 7, 1), 'min': 0, 'max': 100}
+    counts = {row['range']: row['count'] for row in snapshot['score_histogram']}
+    assert len(counts) == len(SCORE_LABELS)
+    assert counts['0-9'] == 2 and counts['50-59'] == 1 and counts['90-100'] == 1
+    assert snapshot['rejections_by_domain'] == {'Design Verification (DV)': 1}
+
+
+def test_idempotency_keys_count_a_result_once():
+    batch = BatchAnalytics()
+    assert batch.add(result(80), key='resume.pdf:1:2')
+    assert not batch.add(result(80), key='resume.pdf:1:2')
+    assert batch.add_error(key='broken.pdf:1:2')
+    assert not batch.add_error(key='broken.pdf:1:2')
+    batch.add(result(50))
+    batch.add(result(50))
+    snapshot = batch.snapshot()
+    assert snapshot['processed'] == 3
+    assert snapshot['errors'] == 1
+    assert snapshot['duplicates'] == 2
+
+
+def test_only_evaluated_profile_fields_count(matcher):
+    jd = matcher.lazy_profile(PD_JD)
+    batch = BatchAnalytics()
+    matched = matcher.lazy_profile(PD_RESUME)
+    batch.add(matcher.compare_profiles(matched, jd, explain=False), matched, jd)
+    # A domain mismatch short-circuits before experience and skills
+    mismatched = matcher.lazy_profile(DV_RESUME)
+    batch.add(matcher.compare_profiles(mismatched, jd, explain=False), mismatched, jd)
+    snapshot = batch.snapshot()
+    assert snapshot['experience']['evaluated'] == 1
+    assert snapshot['skills']['evaluated'] == 1
+    assert sum(row['count'] for row in snapshot['experience_histogram']) == 1
+    assert len(snapshot['experience_histogram']) == len(EXPERIENCE_LABELS)
+
+
+def test_registry_keeps_the_jd_document_and_expires_batches():
+    registry = BatchRegistry(ttl=60, max_batches=2)
+    jd = {'handle': 'h', 'text': PD_JD}
+    first = registry.create(jd)
+    assert registry.get(first.batch_id).jd_document is jd
+    second = registry.create(jd)
+    registry.create(jd)
+    assert registry.get(first.batch_id) is None
+    second.updated = time.time() - 61
+    assert registry.get(second.batch_id) is None
+    assert not registry.delete(second.batch_id)
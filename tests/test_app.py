@@ -0,0 +1,153 @@
+from conftest import DV_RESUME, PD_JD, PD_RESUME
+
+
+def test_batch_keeps_its_jd_after_document_eviction(client, app_module):
+    created = client.post('/batches', data={'jdText': PD_JD}).get_json()
+    app_module.document_store.delete(created['jd_handle'])
+    found = client.post('/analyze', data={'resumeText': PD_RESUME, 'batchId': created['batch_id']}).get_json()
+    assert 'error' not in found
+    assert found['status'] != 'REJECT'
+    batch = client.get(f"/batches/{created['batch_id']}").get_json()
+    assert batch['processed'] == 1
+
+
+def test_indexed_resumes_are_searchable(client, app_module):
+    added = client.post('/search/resumes', data={'resumeTexts': [PD_RESUME]}).get_json()
+    handle = added['added'][0]['id']
+    found = client.get('/search', query_string={'q': 'innovus AND primetime'}).get_json()
+    assert handle in [result['id'] for result in found['results']]
+    assert client.get('/search', query_string={'q': '(innovus'}).status_code == 400
+
+
+def test_retried_batch_upload_is_answered_but_counted_once(client):
+    batch_id = client.post('/batches', data={'jdText': PD_JD}).get_json()['batch_id']
+    form = {'resumeText': PD_RESUME, 'batchId': batch_id, 'idempotencyKey': 'resume.pdf:100:1'}
+    first = client.post('/analyze', data=form).get_json()
+    retried = client.post('/analyze', data=form).get_json()
+    assert retried['final_score'] == first['final_score']
+    batch = client.get(f'/batches/{batch_id}').get_json()
+    assert batch['processed'] == 1
+    assert batch['duplicates'] == 1
+
+
+def test_batch_analytics_do_not_depend_on_the_shared_cache(client, app_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, 'shared_cache', app_module.SharedCache(str(tmp_path / 'cache.sqlite')))
+    snapshots = []
+    for _ in range(2):
+        batch_id = client.post('/batches', data={'jdText': PD_JD}).get_json()['batch_id']
+        client.post('/analyze', data={'resumeText': PD_RESUME, 'batchId': batch_id})
+        snapshots.append(client.get(f'/batches/{batch_id}').get_json())
+    assert app_module.metrics.snapshot()['counters']['shared_cache.hits'] >= 1
+    for snapshot in snapshots:
+        for key in ('batch_id', 'created', 'updated'):
+            snapshot.pop(key)
+    assert snapshots[0] == snapshots[1]
+    assert snapshots[0]['skills']['evaluated'] == 1
+
+
+def test_extractors_are_selectable(client):
+    found = client.post('/analyze', data={'resumeText': PD_RESUME, 'jdText': PD_JD,
+                                          'fields': 'final_score,extractors'}).get_json()
+    assert set(found) == {'final_score', 'extractors'}
+    assert found['extractors'] == {'resume': '', 'jd': ''}
+
+
+def test_sandboxed_extraction_metrics_reach_the_parent(app_module, tmp_path, monkeypatch):
+    from sandbox import ExtractionSandbox
+
+    sandbox = ExtractionSandbox(app_module.matcher.extract, workers=1)
+    monkeypatch.setattr(app_module, 'sandbox', sandbox)
+    path = tmp_path / 'resume.txt'
+    path.write_text(PD_RESUME)
+    before = app_module.metrics.snapshot()['summaries'].get('extract.text.seconds', {'count': 0})['count']
+    try:
+        extraction = app_module.extract_document(str(path))
+    finally:
+        sandbox.shutdown()
+    assert extraction['extractor'] == 'text'
+    assert app_module.metrics.snapshot()['summaries']['extract.text.seconds']['count'] == before + 1
+
+
+def test_document_upload_does_not_profile(client, app_module):
+    uploaded = client.post('/documents', data={'text': PD_RESUME + ' Uploaded only.'}).get_json()
+    assert 'skills' not in uploaded
+    assert app_module.document_store.get(uploaded['handle'])['profile'] is None
+    fetched = client.get(f"/documents/{uploaded['handle']}").get_json()
+    assert fetched['experience'] == 6
+
+
+def test_client_id_only_trusts_headers_from_proxies(app_module, monkeypatch):
+    import ipaddress
+
+    headers = {'X-Client-Id': 'spoofed', 'X-Forwarded-For': '198.51.100.7, 10.0.0.2'}
+
+    def identify(peer, **overrides):
+        with app_module.app.test_request_context('/', headers={**headers, **overrides},
+                                                 environ_base={'REMOTE_ADDR': peer}):
+            return app_module.client_id()
+
+    monkeypatch.setitem(app_module.app.config, 'TRUSTED_PROXIES', [])
+    assert identify('203.0.113.9') == '203.0.113.9'
+    monkeypatch.setitem(app_module.app.config, 'TRUSTED_PROXIES', [ipaddress.ip_network('10.0.0.0/8')])
+    assert identify('203.0.113.9') == '203.0.113.9'
+    assert identify('10.0.0.1') == 'spoofed'
+    assert identify('10.0.0.1', **{'X-Client-Id': ''}) == '198.51.100.7'
+
+
+def test_analysis_responses_are_compressed_above_the_threshold(client, app_module, monkeypatch):
+    import gzip
+    import json
+
+    form = {'resumeText': PD_RESUME, 'jdText': PD_JD}
+    monkeypatch.setitem(app_module.app.config, 'COMPRESSION_MIN_BYTES', 1 << 20)
+    small = client.post('/analyze', data=form, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    assert 'Accept-Encoding' in small.headers['Vary']
+
+    monkeypatch.setitem(app_module.app.config, 'COMPRESSION_MIN_BYTES', 1)
+    monkeypatch.setattr(app_module, 'brotli', None)
+    compressed = client.post('/analyze', data=form, headers={'Accept-Encoding': 'br, gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'compress' in compressed.headers['Server-Timing']
+    assert json.loads(gzip.decompress(compressed.get_data())) == json.loads(small.get_data())
+    assert 'Content-Encoding' not in client.post('/analyze', data=form).headers
+
+
+def test_select_fields_picks_keys_and_one_nested_level(app_module):
+    result = {'final_score': 80, 'status': 'MATCH', 'resume_domain': {'domain_name': 'PD', 'confidence': 90}}
+    assert app_module.select_fields(result, []) is result
+    assert app_module.select_fields(result, ['final_score', 'resume_domain.domain_name', 'missing', 'status.x']) == \
+        {'final_score': 80, 'resume_domain': {'domain_name': 'PD'}, 'status': 'MATCH'}
+
+
+def test_analyze_batch_pages_through_the_ranking(client):
+    texts = [DV_RESUME, PD_RESUME, 'Physical design intern with floorplan and placement coursework, '
+                                   'some exposure to Innovus during a university project.']
+    form = {'jdText': PD_JD, 'resumeTexts': texts}
+    full = client.post('/analyze-batch', data=form).get_json()
+    assert full['total'] == 3 and not full['has_more']
+    scores = [item['final_score'] for item in full['results']]
+    assert scores == sorted(scores, reverse=True)
+    assert [item['rank'] for item in full['results']] == [1, 2, 3]
+    assert set(full['results'][0]) == {'final_score', 'status', 'recommendation', 'reason', 'domains_match',
+                                       'resume_domain', 'filename', 'rank'}
+
+    page = client.post('/analyze-batch', data={**form, 'offset': 1, 'top_k': 1, 'fields': 'final_score'}).get_json()
+    assert page['has_more']
+    assert page['results'] == [{'final_score': scores[1], 'filename': full['results'][1]['filename'], 'rank': 2}]
+    assert page['analytics']['processed'] == 3
+
+
+def test_batches_are_charged_per_document(app_module):
+    import io
+
+    def cost(data):
+        with app_module.app.test_request_context('/analyze-batch', method='POST', data=data):
+            return app_module.request_cost()
+
+    cheap = app_module.admission.cheap_cost
+    assert cost({'resumeText': PD_RESUME, 'jdText': PD_JD}) <= cheap
+    assert cost({'jdText': PD_JD, 'resumeTexts': [PD_RESUME] * 300}) > cheap
+    assert cost({'jdText': PD_JD, 'resumeHandles': ['0' * 64] * 500}) > cheap
+    files = [(io.BytesIO(b'resume'), f'resume{i}.txt') for i in range(5)]
+    assert cost({'jdText': PD_JD, 'resumes': files}) > cheap
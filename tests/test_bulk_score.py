@@ -0,0 +1,55 @@
+import csv
+import json
+
+import pytest
+
+import bulk_score
+from conftest import DV_RESUME, PD_JD, PD_RESUME
+
+
+@pytest.fixture
+def resumes(tmp_path):
+    directory = tmp_path / 'resumes'
+    (directory / 'nested').mkdir(parents=True)
+    (directory / 'pd.txt').write_text(PD_RESUME)
+    (directory / 'nested' / 'dv.txt').write_text(DV_RESUME)
+    # Starts with "No", which is not an extraction error
+    (directory / 'nokia.txt').write_text('Nokia physical design engineer, 6 years of Innovus, STA and CTS.')
+    (directory / 'empty.txt').write_text('')
+    (directory / 'notes.md').write_text(PD_RESUME)
+    return directory
+
+
+def test_collect_inputs_filters_and_recurses(resumes):
+    flat = bulk_score.collect_inputs([str(resumes)], recursive=False)
+    assert [path.rsplit('/', 1)[1] for path in flat] == ['empty.txt', 'nokia.txt', 'pd.txt']
+    assert len(bulk_score.collect_inputs([str(resumes), str(resumes / '*.txt')], recursive=True)) == 4
+
+
+def test_scores_in_parallel_and_resumes_from_the_output(resumes, tmp_path, capsys):
+    output = tmp_path / 'scores.jsonl'
+    bulk_score.main([str(resumes), '-r', '--jd-text', PD_JD, '-o', str(output), '-w', '2'])
+    records = {json.loads(line)['path'].rsplit('/', 1)[1]: json.loads(line) for line in output.read_text().splitlines()}
+    assert set(records) == {'pd.txt', 'dv.txt', 'nokia.txt', 'empty.txt'}
+    assert records['pd.txt']['domains_match'] and records['pd.txt']['experience'] == 6
+    assert not records['dv.txt']['domains_match'] and 'experience' not in records['dv.txt']
+    assert 'error' not in records['nokia.txt']
+    assert 'error' in records['empty.txt']
+
+    # A torn last line is rescored, everything else is skipped
+    with open(output, 'a') as f:
+        f.write('{"path": "trunc')
+    (resumes / 'late.txt').write_text(PD_RESUME + ' Joined later.')
+    capsys.readouterr()
+    bulk_score.main([str(resumes), '-r', '--jd-text', PD_JD, '-o', str(output), '-w', '1'])
+    assert '4 already scored, 1 to go' in capsys.readouterr().err
+    assert len(bulk_score.read_checkpoint(str(output), 'jsonl')) == 5
+
+
+def test_csv_output_has_a_single_header(resumes, tmp_path):
+    output = tmp_path / 'scores.csv'
+    for _ in range(2):
+        bulk_score.main([str(resumes / 'pd.txt'), '--jd-text', PD_JD, '-o', str(output), '-w', '1'])
+    with open(output, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 1 and rows[0]['status']
@@ -0,0 +1,48 @@
+from conftest import DV_RESUME, PD_JD, PD_RESUME
+from dedup import NearDuplicateIndex, fingerprint, group_duplicates, similarity
+from documents import content_hash
+
+LONG_RESUME = ' '.join(f'{PD_RESUME} Project {i}: tapeout of block {i} at 7nm.' for i in range(20))
+
+
+def test_identical_and_lightly_edited_texts_are_similar():
+    assert similarity(fingerprint(LONG_RESUME), fingerprint(LONG_RESUME)) == 1.0
+    edited = LONG_RESUME.replace('Project 3:', 'Project three:')
+    assert similarity(fingerprint(LONG_RESUME), fingerprint(edited)) >= 0.85
+    assert similarity(fingerprint(PD_RESUME), fingerprint(DV_RESUME)) < 0.3
+
+
+def test_short_texts_still_fingerprint():
+    assert similarity(fingerprint('uvm'), fingerprint('uvm')) == 1.0
+
+
+def test_group_duplicates_points_at_first_member():
+    signatures = [fingerprint(text) for text in (LONG_RESUME, DV_RESUME, LONG_RESUME.upper(), PD_RESUME)]
+    assert group_duplicates(signatures) == [0, 1, 0, 3]
+
+
+def test_index_find_excludes_and_forgets():
+    index = NearDuplicateIndex()
+    index.add('a', fingerprint(LONG_RESUME))
+    assert index.find(fingerprint(LONG_RESUME))[0] == 'a'
+    assert index.find(fingerprint(LONG_RESUME), exclude='a') is None
+    index.remove('a')
+    assert index.find(fingerprint(LONG_RESUME)) is None
+    assert len(index) == 0
+
+
+def test_scored_results_flag_corpus_near_duplicates(client):
+    original = LONG_RESUME + ' Corpus dedup test.'
+    stored = client.post('/documents', data={'text': original}).get_json()
+    edited = original.replace('Project 3:', 'Project three:')
+
+    found = client.post('/analyze', data={'resumeText': edited, 'jdText': PD_JD, 'fields': 'final_score'}).get_json()
+    assert found['near_duplicate_of'] == stored['handle']
+    assert found['similarity'] >= 0.85
+
+    # Matches the original or the edit scored above, both now stored
+    resent = original.replace('Project 5:', 'Project five:')
+    batch = client.post('/analyze-batch', data={'jdText': PD_JD, 'resumeTexts': [resent, DV_RESUME]}).get_json()
+    flagged = {item['filename']: item.get('near_duplicate_of') for item in batch['results']}
+    assert flagged['text_1'] in (stored['handle'], content_hash(edited.encode('utf-8')))
+    assert flagged['text_2'] is None
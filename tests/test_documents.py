@@ -0,0 +1,87 @@
+import documents
+from conftest import PD_JD, PD_RESUME
+from documents import DocumentStore, content_hash
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_last_use(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(documents.time, 'time', clock)
+    removed = []
+    store = DocumentStore(ttl=10, on_remove=removed.append)
+    store.put('a', 'text a', None)
+    store.put('b', 'text b', None)
+    clock.now += 8
+    assert store.get('a')['text'] == 'text a'
+    clock.now += 8
+    # b was last used 16s ago, a only 8s ago
+    assert store.get('b') is None
+    assert store.get('a') is not None
+    assert removed == ['b']
+    clock.now += 11
+    store.put('c', 'text c', None)
+    assert len(store) == 1
+    assert removed == ['b', 'a']
+
+
+def test_least_recently_used_entry_is_evicted_when_full():
+    removed = []
+    store = DocumentStore(max_documents=2, on_remove=removed.append)
+    store.put('a', 'text a', None)
+    store.put('b', 'text b', None)
+    store.get('a')
+    store.put('c', 'text c', None)
+    assert removed == ['b']
+    assert store.get('b') is None
+    assert store.delete('a') and not store.delete('a')
+    assert removed == ['b', 'a']
+    assert len(store) == 1
+
+
+def test_same_upload_gets_the_same_handle(client):
+    data = {'text': PD_JD + ' Handle test.'}
+    first = client.post('/documents', data=data).get_json()
+    again = client.post('/documents', data=data).get_json()
+    assert first['handle'] == again['handle'] == content_hash((PD_JD + ' Handle test.').encode('utf-8'))
+
+    resume = client.post('/documents', data={'text': PD_RESUME + ' Handle test.'}).get_json()
+    found = client.post('/analyze', data={'resumeHandle': resume['handle'], 'jdHandle': first['handle']}).get_json()
+    assert found['status'] == client.post('/analyze', data={'resumeText': PD_RESUME + ' Handle test.',
+                                                            'jdText': PD_JD + ' Handle test.'}).get_json()['status']
+    assert client.delete(f"/documents/{resume['handle']}").status_code == 200
+    assert client.get(f"/documents/{resume['handle']}").status_code == 404
+    missing = client.post('/analyze', data={'resumeHandle': resume['handle'], 'jdHandle': first['handle']})
+    assert 'not found' in missing.get_json()['error']
+
+
+def test_uploads_fail_only_when_no_extractor_produced_text(client, monkeypatch):
+    import io
+
+    import stages
+
+    logged = []
+    monkeypatch.setattr(stages, 'document', lambda **info: logged.append(info))
+    nokia = 'Nokia Networks - physical design engineer, 6 years of Innovus, PrimeTime STA and CTS.'
+    found = client.post('/documents', data={'file': (io.BytesIO(nokia.encode('utf-8')), 'nokia.txt')}).get_json()
+    assert 'error' not in found and found['extractor'] == 'text'
+
+    image = b'\x89PNG\r\n\x1a\n' + b'Error: not a resume' * 10
+    rejected = client.post('/documents', data={'file': (io.BytesIO(image), 'resume.png')}).get_json()
+    assert rejected['extraction_status'] == 'unsupported'
+    assert logged[-1]['status'] == 'unsupported' and logged[-1]['extractor'] == ''
+    assert not any('Error' in str(value) for value in logged[-1].values())
+
+    batch = client.post('/analyze-batch', data={
+        'jdText': PD_JD,
+        'resumes': [(io.BytesIO(image), 'resume.png'), (io.BytesIO(nokia.encode('utf-8')), 'nokia.txt')]
+    }).get_json()
+    assert batch['total'] == 1 and batch['results'][0]['filename'] == 'nokia.txt'
+    assert batch['errors'][0]['filename'] == 'resume.png'
+    assert batch['errors'][0]['extraction_status'] == 'unsupported'
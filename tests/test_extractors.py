@@ -0,0 +1,56 @@
+import pytest
+
+from extractors import ExtractionError, ExtractorRegistry, record_attempts
+from metrics import metrics
+
+
+def failing(path):
+    raise ValueError('broken')
+
+
+def empty(path):
+    return '   ', 1
+
+
+def working(path):
+    return 'resume text', 2
+
+
+def counters():
+    return metrics.snapshot()['counters']
+
+
+def test_falls_back_in_order_and_reports_attempts():
+    registry = ExtractorRegistry()
+    registry.register('.pdf', 'failing', failing)
+    registry.register('.pdf', 'empty', empty)
+    registry.register('.pdf', 'working', working)
+    extraction = registry.extract('resume.pdf')
+    assert extraction['extractor'] == 'working'
+    assert extraction['pages'] == 2
+    assert [attempt['outcome'] for attempt in extraction['attempts']] == ['failed', 'empty', 'ok']
+
+    registry.configure('pdf=working,unknown')
+    assert registry.backends('.pdf') == ['working', 'failing', 'empty']
+
+
+def test_no_text_raises_with_attempts():
+    registry = ExtractorRegistry()
+    registry.register('.pdf', 'empty', empty)
+    registry.register('.pdf', 'unavailable', working, available=False)
+    with pytest.raises(ExtractionError) as raised:
+        registry.extract('resume.pdf')
+    assert raised.value.empty
+    assert [attempt['backend'] for attempt in raised.value.attempts] == ['empty']
+    with pytest.raises(ExtractionError):
+        registry.extract('resume.odt')
+
+
+def test_record_attempts_counts_failures_and_fallbacks():
+    before = counters()
+    record_attempts([{'backend': 'a', 'outcome': 'failed', 'seconds': 0.1},
+                     {'backend': 'b', 'outcome': 'ok', 'seconds': 0.2}])
+    after = counters()
+    assert after['extract.a.failures'] == before.get('extract.a.failures', 0) + 1
+    assert after['extract.fallbacks'] == before.get('extract.fallbacks', 0) + 1
+    assert metrics.snapshot()['summaries']['extract.b.seconds']['count'] >= 1
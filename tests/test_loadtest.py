@@ -0,0 +1,90 @@
+import pytest
+
+import loadtest
+
+
+def test_generated_documents_extract_to_their_text(matcher, tmp_path):
+    text = loadtest.make_text(next(iter(loadtest.RESUME_TEXTS)), 2)
+    first_line = text.splitlines()[0]
+    for name, data in (('resume.pdf', loadtest.make_pdf(text, per_page=5, padding=1000)),
+                       ('resume.docx', loadtest.make_docx(text, padding=1000))):
+        path = tmp_path / name
+        path.write_bytes(data)
+        extraction = matcher.extract(str(path))
+        assert extraction['extractor'], extraction['text']
+        assert first_line.split()[0] in extraction['text']
+
+
+def test_multipart_bodies_are_accepted_by_the_app(client):
+    body, content_type = loadtest.encode_multipart(
+        {'jdText': loadtest.JD_TEXT},
+        {'resume': ('resume.txt', loadtest.make_text('pd', 1).encode('utf-8'), 'text/plain')})
+    found = client.post('/analyze', data=body, content_type=content_type).get_json()
+    assert 'error' not in found
+    assert 'final_score' in found
+
+
+def test_mix_percentiles_and_report():
+    assert loadtest.parse_mix('text=3, pdf') == [('text', 3.0), ('pdf', 1.0)]
+    with pytest.raises(ValueError):
+        loadtest.parse_mix('text,xml=2')
+
+    assert loadtest.percentile([], 50) == 0.0
+    values = [i / 100 for i in range(1, 101)]
+    assert loadtest.percentile(values, 50) == 0.5
+    assert loadtest.percentile(values, 99) == 0.99
+
+    recorder = loadtest.Recorder()
+    recorder.add('text', 200, True, 0.1)
+    recorder.add('text', 429, False, 0.01)
+    recorder.add('pdf', 200, True, 0.3)
+    # A batch is reported on its own, its items already count towards the total
+    recorder.add('batch_item_pdf', 500, False, 0.2)
+    recorder.add('batch', 500, False, 0.2, composite=True)
+    report = recorder.report(2.0)
+    assert report['overall']['requests'] == 4
+    assert report['overall']['error_rate'] == 0.5
+    assert report['by_type']['batch']['requests'] == 1
+    assert report['overall']['throughput_rps'] == 2.0
+    assert report['by_type']['text']['error_rate'] == 0.5
+    assert report['by_type']['text']['rejected_429'] == 1
+    assert report['by_type']['pdf']['latency_ms']['max'] == 300.0
+
+
+def test_started_server_trusts_the_loopback_client_ids(tmp_path, monkeypatch):
+    import argparse
+
+    dump = tmp_path / 'env.txt'
+    monkeypatch.setenv('TRUSTED_PROXIES', '10.0.0.0/8')
+    command = f'{{python}} -c "import os; open({str(dump)!r}, \'w\').write(os.environ[\'TRUSTED_PROXIES\'])"'
+    args = argparse.Namespace(no_server=False, port=5999, env=[], server_command=command)
+    process = loadtest.start_server(args)
+    assert process.wait(30) == 0
+    assert dump.read_text() == '10.0.0.0/8,' + loadtest.LOOPBACK_PROXIES
+
+
+def test_load_test_clients_reach_the_admission_queue_separately(app_module, monkeypatch):
+    import ipaddress
+    import threading
+
+    from werkzeug.serving import make_server
+
+    networks = [ipaddress.ip_network(value) for value in loadtest.LOOPBACK_PROXIES.split(',')]
+    monkeypatch.setitem(app_module.app.config, 'TRUSTED_PROXIES', networks)
+    clients = set()
+    acquire = app_module.admission.acquire
+
+    def recording_acquire(client, cost):
+        clients.add(client)
+        return acquire(client, cost)
+
+    monkeypatch.setattr(app_module.admission, 'acquire', recording_acquire)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        loadtest.main(['--url', f'http://127.0.0.1:{server.server_port}', '--mix', 'text', '--requests', '8',
+                       '--concurrency', '4', '--clients', '3', '--duration', '30', '--doc-repeat', '1'])
+    finally:
+        server.shutdown()
+    assert clients == {'loadtest-0', 'loadtest-1', 'loadtest-2'}
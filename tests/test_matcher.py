@@ -0,0 +1,38 @@
+import pickle
+
+import stages
+from conftest import DV_RESUME, PD_JD, PD_RESUME
+
+
+def strip_explanation(result):
+    return {key: value for key, value in result.items() if key != 'analysis_text'}
+
+
+def test_mismatch_short_circuits_before_experience_and_skills(matcher):
+    resume, jd = matcher.lazy_profile(DV_RESUME), matcher.lazy_profile(PD_JD)
+    recorder = stages.begin()
+    try:
+        result = matcher.compare_profiles(resume, jd, explain=False)
+    finally:
+        stages.end()
+    assert result['status'] == 'REJECT' and result['final_score'] == 0
+    assert recorder.counts.get('short_circuited') == 1
+    assert not resume.evaluated('experience') and not resume.evaluated('skills')
+    assert not jd.evaluated('sections')
+
+
+def test_lazy_and_eager_profiles_score_the_same(matcher):
+    for resume_text in (PD_RESUME, DV_RESUME):
+        eager = matcher.compare_profiles(matcher.profile_document(resume_text), matcher.profile_document(PD_JD))
+        lazy = matcher.compare_domains(resume_text, PD_JD)
+        assert lazy == eager
+        quiet = matcher.compare_domains(resume_text, PD_JD, explain=False)
+        assert strip_explanation(quiet).items() <= strip_explanation(eager).items()
+
+
+def test_lazy_profile_pickles_as_a_full_profile(matcher):
+    profile = matcher.lazy_profile(PD_RESUME)
+    copied = pickle.loads(pickle.dumps(profile))
+    assert type(copied) is dict
+    assert copied == matcher.profile_document(PD_RESUME)
+    assert profile.evaluated('skills')
@@ -0,0 +1,75 @@
+import multiprocessing
+import threading
+
+from conftest import DV_RESUME, PD_JD, PD_RESUME
+from profile_store import ProfileStore
+
+
+def append_rows(directory, start):
+    from matcher import DomainMatcher
+
+    matcher = DomainMatcher()
+    profile = matcher.profile_document(PD_RESUME)
+    store = ProfileStore(directory, matcher)
+    for i in range(start, start + 10):
+        store.append([(f'doc-{i}', profile)])
+    store.close()
+
+
+def test_query_ranks_same_domain_and_newest_version_wins(tmp_path, matcher):
+    store = ProfileStore(str(tmp_path), matcher)
+    store.append([('pd', matcher.profile_document(PD_RESUME)), ('dv', matcher.profile_document(DV_RESUME))])
+    jd = matcher.profile_document(PD_JD)
+    found = store.query(jd, 5)
+    assert [result['id'] for result in found['results']] == ['pd']
+    assert found['scanned'] == 2
+
+    store.append([('pd', matcher.profile_document(DV_RESUME))])
+    assert len(store) == 2
+    assert store.query(jd, 5)['results'] == []
+    assert store.compact() == 2
+    assert len(store._segments) == 1
+    assert len(store) == 2
+    store.close()
+
+
+def test_refresh_is_not_raced_by_compaction(tmp_path, matcher):
+    reader = ProfileStore(str(tmp_path), matcher)
+    writer = ProfileStore(str(tmp_path), matcher)
+    writer.append([('pd', matcher.profile_document(PD_RESUME))])
+    writer.append([('dv', matcher.profile_document(DV_RESUME))])
+    compaction = threading.Thread(target=writer.compact)
+    list_segments = reader._segment_numbers
+
+    def list_then_compact():
+        # Compaction gets its chance between the reader's listing and its mmaps
+        numbers = list_segments()
+        if not compaction.is_alive() and compaction.ident is None:
+            compaction.start()
+            compaction.join(0.5)
+        return numbers
+
+    reader._segment_numbers = list_then_compact
+    reader.refresh()
+    assert len(reader) == 2
+    compaction.join(10)
+    assert not compaction.is_alive()
+    reader.refresh()
+    assert len(reader._segments) == 1 and len(reader) == 2
+    reader.close()
+    writer.close()
+
+
+def test_concurrent_appends_from_processes_keep_every_row(tmp_path, matcher):
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=append_rows, args=(str(tmp_path), start)) for start in (0, 100, 200)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    store = ProfileStore(str(tmp_path), matcher)
+    assert len(store) == 30
+    assert len(store._segments) == 30
+    assert not list(tmp_path.glob('*.tmp'))
+    store.close()
@@ -0,0 +1,56 @@
+import os
+import time
+
+from conftest import PD_JD, PD_RESUME
+from profiling import format_report, profile_call, prune_reports
+
+
+def busy():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        sum(range(100))
+    return 'done'
+
+
+def test_deterministic_profile_is_stored_as_pstats(tmp_path):
+    result, report = profile_call(busy, limit=5, store_dir=str(tmp_path))
+    assert result == 'done'
+    assert report['mode'] == 'deterministic'
+    assert 0 < len(report['top']) <= 5
+    assert any('busy' in row['function'] and row['calls'] == 1 for row in report['top'])
+    assert report['stored_at'].endswith('.prof') and os.path.exists(report['stored_at'])
+
+
+def test_sampling_profile_sees_the_calling_function(tmp_path):
+    result, report = profile_call(busy, mode='sampling', interval=0.001, store_dir=str(tmp_path))
+    assert result == 'done'
+    assert report['samples'] > 0
+    assert any('busy' in row['function'] for row in report['top'])
+    with open(report['stored_at']) as f:
+        assert f.read() == format_report(report['top'])
+
+
+def test_only_the_newest_reports_are_kept(tmp_path):
+    (tmp_path / 'notes.txt').write_text('not a report')
+    paths = []
+    for i in range(4):
+        _, report = profile_call(lambda: None, store_dir=str(tmp_path), keep=10)
+        os.utime(report['stored_at'], ns=(i * 10**9, i * 10**9))
+        paths.append(report['stored_at'])
+    prune_reports(str(tmp_path), 2)
+    assert sorted(os.listdir(tmp_path)) == sorted(['notes.txt'] + [os.path.basename(p) for p in paths[2:]])
+
+
+def test_app_only_profiles_when_enabled_and_authorized(client, app_module, monkeypatch, tmp_path):
+    form = {'resumeText': PD_RESUME, 'jdText': PD_JD}
+    headers = {'X-Profile': 'sampling', 'X-Profile-Token': 'secret'}
+    assert 'profile' not in client.post('/analyze', data=form, headers=headers).get_json()
+
+    monkeypatch.setitem(app_module.app.config, 'PROFILING_ENABLED', True)
+    monkeypatch.setitem(app_module.app.config, 'PROFILING_TOKEN', 'secret')
+    monkeypatch.setitem(app_module.app.config, 'PROFILING_DIR', str(tmp_path))
+    wrong = {**headers, 'X-Profile-Token': 'guess'}
+    assert 'profile' not in client.post('/analyze', data=form, headers=wrong).get_json()
+    found = client.post('/analyze', data=form, headers=headers).get_json()
+    assert found['profile']['mode'] == 'sampling'
+    assert 'final_score' in found
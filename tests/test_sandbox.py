@@ -0,0 +1,40 @@
+import threading
+import time
+
+from sandbox import ExtractionSandbox
+
+
+def test_pool_starts_on_first_use_and_replaces_timed_out_workers():
+    sandbox = ExtractionSandbox(time.sleep, timeout=0.5, workers=1)
+    try:
+        assert sandbox._idle == []
+        assert sandbox.run(0)['status'] == 'ok'
+        assert len(sandbox._idle) == 1
+        first = sandbox._idle[0].process.pid
+
+        assert sandbox.run(5)['status'] == 'timeout'
+        results = []
+        # Replacements are started from request threads
+        thread = threading.Thread(target=lambda: results.append(sandbox.run(0)))
+        thread.start()
+        thread.join(30)
+        assert results[0]['status'] == 'ok'
+        assert sandbox._idle[0].process.pid != first
+    finally:
+        sandbox.shutdown()
+
+
+def test_extractions_round_trip_through_the_worker(matcher, tmp_path):
+    sandbox = ExtractionSandbox(matcher.extract, workers=1)
+    path = tmp_path / 'resume.txt'
+    path.write_text('ASIC design verification engineer')
+    try:
+        result = sandbox.run(str(path))
+        assert result['status'] == 'ok'
+        assert result['value']['extractor'] == 'text'
+        missing = sandbox.run(str(tmp_path / 'missing.txt'))
+        assert missing['status'] == 'ok'
+        assert missing['value']['extractor'] == ''
+        assert missing['value']['attempts'][0]['outcome'] == 'failed'
+    finally:
+        sandbox.shutdown()
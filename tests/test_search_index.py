@@ -0,0 +1,128 @@
+import json
+import threading
+
+import pytest
+
+import search_index
+from conftest import DV_RESUME, PD_RESUME
+from search_index import QueryError, SearchIndex
+
+
+@pytest.fixture
+def index(matcher):
+    index = SearchIndex(matcher, tokens=True)
+    index.add('pd', PD_RESUME)
+    index.add('dv', DV_RESUME)
+    return index
+
+
+def ids(found):
+    return sorted(result['id'] for result in found['results'])
+
+
+def test_parse_precedence_and_implicit_and(index):
+    assert index._parse('a b OR c') == ('or', ('and', ('term', 'a'), ('term', 'b')), ('term', 'c'))
+    assert index._parse('a AND (b or NOT c)') == \
+        ('and', ('term', 'a'), ('or', ('term', 'b'), ('not', ('term', 'c'))))
+    assert index._parse('"place and route" x') == ('and', ('term', 'place and route'), ('term', 'x'))
+    assert index._parse('   ') is None
+
+
+@pytest.mark.parametrize('query', ['(innovus', 'innovus)', 'AND', 'innovus OR', 'NOT'])
+def test_malformed_queries_raise(index, query):
+    with pytest.raises(QueryError):
+        index.search(query)
+
+
+def test_boolean_search_and_filters(index):
+    assert ids(index.search('innovus')) == ['pd']
+    assert ids(index.search('innovus OR uvm')) == ['dv', 'pd']
+    assert ids(index.search('NOT innovus')) == ['dv']
+    assert ids(index.search('engineer AND NOT uvm')) == ['pd']
+    assert ids(index.search('"timing closure"')) == ['pd']
+    assert ids(index.search('', min_experience=5)) == ['pd']
+    assert ids(index.search('', domain='pd')) == ['pd']
+    with pytest.raises(QueryError):
+        index.search('', domain='nonsense')
+
+
+def test_re_adding_supersedes(index):
+    index.add('pd', DV_RESUME)
+    assert ids(index.search('innovus')) == []
+    assert len(index) == 2
+    assert index.stats()['superseded'] == 1
+
+
+def test_writers_sharing_a_path_keep_each_others_additions(matcher, tmp_path):
+    path = str(tmp_path / 'search.index')
+    first = SearchIndex(matcher)
+    second = SearchIndex(matcher)
+    first.load(path)
+    second.load(path)
+    first.append([('pd', PD_RESUME, None)])
+    second.append([('dv', DV_RESUME, None)])
+    assert ids(first.search('')) == ['dv', 'pd']
+    first.compact()
+    assert ids(second.search('')) == ['dv', 'pd']
+    reloaded = SearchIndex(matcher)
+    assert reloaded.load(path)
+    assert ids(reloaded.search('innovus')) == ['pd']
+
+
+def test_appends_and_refreshes_from_threads_do_not_deadlock(matcher, tmp_path):
+    path = str(tmp_path / 'search.index')
+    index = SearchIndex(matcher, compact_after=25)
+    other = SearchIndex(matcher)
+    index.load(path)
+    other.load(path)
+    done = threading.Event()
+
+    def write(target, prefix):
+        for i in range(60):
+            target.append([(f'{prefix}{i}', PD_RESUME, None)])
+
+    def read():
+        while not done.is_set():
+            index.search('innovus')
+
+    threads = [threading.Thread(target=write, args=(index, 'a'), daemon=True),
+               threading.Thread(target=write, args=(other, 'b'), daemon=True)]
+    reader = threading.Thread(target=read, daemon=True)
+    for thread in threads + [reader]:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+    done.set()
+    reader.join(30)
+    assert not any(thread.is_alive() for thread in threads + [reader]), 'index locks deadlocked'
+    index.refresh()
+    assert len(index) == 120
+
+
+def test_log_is_compacted_and_partial_lines_dropped(matcher, tmp_path):
+    path = str(tmp_path / 'search.index')
+    index = SearchIndex(matcher, compact_after=2)
+    index.load(path)
+    index.append([('pd', PD_RESUME, None)])
+    with open(index._log_path(), 'a') as f:
+        f.write('{"id": "half')
+    index.append([('dv', DV_RESUME, None)])
+    # The second append reached compact_after, so the log is empty again
+    with open(index._log_path()) as f:
+        assert f.read() == ''
+    reloaded = SearchIndex(matcher, compact_after=2)
+    reloaded.load(path)
+    assert ids(reloaded.search('')) == ['dv', 'pd']
+
+
+def test_cli_add_skips_failed_extractions(tmp_path, capsys):
+    resume = tmp_path / 'resume.txt'
+    resume.write_text(PD_RESUME)
+    unsupported = tmp_path / 'resume.xyz'
+    unsupported.write_text(PD_RESUME)
+    path = str(tmp_path / 'search.index')
+    search_index.main([path, 'add', str(resume), str(unsupported), str(tmp_path / 'missing.pdf')])
+    report = json.loads(capsys.readouterr().out.splitlines()[-1])
+    assert report['added'] == 1
+    assert report['failed'] == 2
+    assert report['documents'] == 1
@@ -0,0 +1,49 @@
+from matcher import CURRENT_YEAR
+from sections import HEADER, section_text, segment
+
+RESUME = """Jane Doe
+Physical Design Engineer
+
+Professional Summary
+Physical design engineer with 5 years of experience in block-level implementation.
+
+Experience in RTL handoff reviews is part of the job, not a heading.
+
+* Work Experience:
+Acme Silicon, 2019 - Present
+
+Technical Skills: Innovus, PrimeTime, Calibre
+
+Education
+B.Tech Electronics, 2018
+
+Hobbies
+Chess for 15 years of weekends.
+"""
+
+
+def spans(text, sections, name):
+    return [text[start:end].strip() for start, end in sections[name]]
+
+
+def test_headings_split_the_text_into_sections():
+    sections = segment(RESUME)
+    assert list(sections) == [HEADER, 'summary', 'experience', 'skills', 'education', 'personal']
+    assert spans(RESUME, sections, HEADER) == ['Jane Doe\nPhysical Design Engineer']
+    # A sentence starting with a heading word stays in the section before it
+    assert 'RTL handoff' in spans(RESUME, sections, 'summary')[0]
+    assert spans(RESUME, sections, 'experience') == ['Acme Silicon, 2019 - Present']
+    assert spans(RESUME, sections, 'skills') == ['Innovus, PrimeTime, Calibre']
+
+
+def test_section_text_falls_back_without_evidence():
+    sections = segment(RESUME)
+    assert section_text(RESUME, sections, ('education',)).strip() == 'B.Tech Electronics, 2018'
+    assert 'Chess' not in section_text(RESUME, sections, exclude=('personal',))
+    assert section_text(RESUME, sections, ('projects',), requires=('projects',)) == RESUME
+    assert section_text('no headings here', segment('no headings here'), ('skills',)) == 'no headings here'
+
+
+def test_experience_ignores_years_outside_its_sections(matcher):
+    # The graduation year gives the most; the 15 years of chess are not counted
+    assert matcher.extract_experience(RESUME) == CURRENT_YEAR - 2018
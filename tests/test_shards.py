@@ -0,0 +1,67 @@
+import socket
+import threading
+
+import pytest
+
+import shards
+from conftest import DV_RESUME, PD_JD, PD_RESUME
+from shards import ShardCoordinator, serve, start_local_shards
+
+AUTHKEY = b'test-shard-key'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def shard(tmp_path, matcher):
+    store = shards.ProfileStore(str(tmp_path), matcher)
+    store.append([('pd', matcher.profile_document(PD_RESUME)), ('dv', matcher.profile_document(DV_RESUME))])
+    store.close()
+    ready = threading.Event()
+    address = ('127.0.0.1', free_port())
+    threading.Thread(target=serve, args=(str(tmp_path), address, AUTHKEY, ready), daemon=True).start()
+    assert ready.wait(10)
+    return f'{address[0]}:{address[1]}'
+
+
+def test_authkey_is_required(monkeypatch):
+    monkeypatch.delenv('SHARD_AUTHKEY', raising=False)
+    with pytest.raises(RuntimeError):
+        shards.authkey_from_env()
+    with pytest.raises(ValueError):
+        ShardCoordinator(['127.0.0.1:1'], b'')
+    monkeypatch.setenv('SHARD_AUTHKEY', 'secret')
+    assert shards.authkey_from_env() == b'secret'
+
+
+def test_query_round_trips_as_json(shard, matcher):
+    coordinator = ShardCoordinator([shard], AUTHKEY, timeout=10)
+    try:
+        found = coordinator.query(matcher.lazy_profile(PD_JD), 5)
+    finally:
+        coordinator.close()
+    assert not found['partial']
+    assert [result['id'] for result in found['results']] == ['pd']
+
+
+def test_wrong_authkey_is_reported_as_failed_shard(shard, matcher):
+    coordinator = ShardCoordinator([shard], b'wrong-key', timeout=5)
+    try:
+        found = coordinator.query(matcher.profile_document(PD_JD), 5)
+    finally:
+        coordinator.close()
+    assert found['partial']
+    assert found['results'] == []
+
+
+def test_start_local_shards_raises_when_a_shard_never_listens(tmp_path):
+    with socket.socket() as taken:
+        taken.bind(('127.0.0.1', 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        with pytest.raises(RuntimeError, match='did not start'):
+            start_local_shards(str(tmp_path), 1, port, AUTHKEY, timeout=10)
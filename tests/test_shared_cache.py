@@ -0,0 +1,61 @@
+import os
+import stat
+
+import pytest
+
+import shared_cache
+from shared_cache import SharedCache, code_version, private_directory
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SharedCache(str(tmp_path / 'cache' / 'cache.sqlite'), max_entries=10, evict_every=5)
+
+
+def test_round_trip_and_miss(cache):
+    cache.put('a', {'skills': ['uvm'], 'experience': 4})
+    assert cache.get('a') == {'skills': ['uvm'], 'experience': 4}
+    assert cache.get('missing') is None
+
+
+def test_eviction_keeps_recently_used_entries(cache):
+    for i in range(10):
+        cache.put(f'key{i}', i)
+    cache.touch_interval = 0
+    assert cache.get('key0') == 0
+    for i in range(10, 15):
+        cache.put(f'key{i}', i)
+    assert cache.stats()['entries'] == 9
+    assert cache.get('key0') == 0
+    assert cache.get('key1') is None
+
+
+def test_database_and_directory_are_private(cache):
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(cache.path)).st_mode) == 0o700
+
+
+def test_shared_directories_are_refused(tmp_path):
+    shared = tmp_path / 'shared'
+    shared.mkdir()
+    shared.chmod(0o777)
+    with pytest.raises(PermissionError):
+        private_directory(str(shared))
+    with pytest.raises(PermissionError):
+        SharedCache(str(shared / 'cache.sqlite'))
+
+
+def test_default_path_is_per_user(monkeypatch, tmp_path):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert shared_cache.default_path() == str(tmp_path / 'jd_matcher' / 'cache.sqlite')
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    assert f'jd_matcher-{os.getuid()}' in shared_cache.default_path()
+    # Windows: no uid, and the temp directory is the user's own
+    monkeypatch.delattr(os, 'getuid')
+    monkeypatch.setattr(shared_cache.tempfile, 'gettempdir', lambda: str(tmp_path))
+    assert shared_cache.default_path() == str(tmp_path / 'jd_matcher' / 'cache.sqlite')
+
+
+def test_code_version_tracks_source():
+    assert code_version('matcher') == code_version('matcher')
+    assert code_version('matcher') != code_version('matcher', 'sections')
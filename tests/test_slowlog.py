@@ -0,0 +1,28 @@
+import json
+import os
+
+import stages
+from slowlog import SlowRequestLog
+
+
+def test_slow_requests_are_logged_per_process_without_content(tmp_path):
+    log = SlowRequestLog(str(tmp_path / 'slow-{pid}.jsonl'), threshold_ms=100)
+    assert log.path == str(tmp_path / f'slow-{os.getpid()}.jsonl')
+    assert not log.is_slow(0.05)
+    assert log.is_slow(0.1)
+
+    recorder = stages.begin()
+    try:
+        with stages.stage('extract'):
+            stages.document(role='resume', type='pdf', bytes=1234, sha256='ab' * 32)
+    finally:
+        stages.end()
+    log.write(recorder, 0.25, method='POST', endpoint='/analyze', status=200)
+    for handler in log._logger.handlers:
+        handler.flush()
+    with open(log.path) as f:
+        record = json.loads(f.readline())
+    assert record['duration_ms'] == 250
+    assert record['endpoint'] == '/analyze'
+    assert [stage['name'] for stage in record['stages']] == ['extract']
+    assert record['documents'] == [{'role': 'resume', 'type': 'pdf', 'bytes': 1234, 'sha256': 'ab' * 32}]
@@ -0,0 +1,29 @@
+import marshal
+import sys
+
+import snapshot
+
+
+def test_snapshot_round_trips_and_rejects_other_versions(tmp_path):
+    path = str(tmp_path / 'state.snapshot')
+    version = snapshot.state_version({'a': [1, 2]}, 'pattern')
+    state = {'postings': {'asic': [0, 3]}, 'names': ('a', 'b')}
+    snapshot.write_snapshot(path, version, state)
+
+    assert snapshot.read_snapshot(path, version) == state
+    assert snapshot.read_snapshot(path, snapshot.state_version({'a': [1, 3]}, 'pattern')) is None
+    assert snapshot.read_snapshot(str(tmp_path / 'missing'), version) is None
+
+    with open(path, 'r+b') as f:
+        f.truncate(snapshot.HEADER.size + 2)
+    assert snapshot.read_snapshot(path, version) is None
+
+
+def test_state_version_covers_the_interpreter_and_marshal_format(monkeypatch):
+    version = snapshot.state_version('taxonomy')
+    assert snapshot.state_version('taxonomy') == version
+    monkeypatch.setattr(marshal, 'version', marshal.version + 1)
+    assert snapshot.state_version('taxonomy') != version
+    monkeypatch.undo()
+    monkeypatch.setattr(sys, 'version_info', (3, 0, 0, 'final', 0))
+    assert snapshot.state_version('taxonomy') != version
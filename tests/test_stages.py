@@ -0,0 +1,63 @@
+import threading
+import tracemalloc
+
+import pytest
+
+import stages
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_stages_nest_and_count():
+    recorder = stages.begin()
+    try:
+        with stages.stage('outer'):
+            with stages.stage('inner') as entry:
+                entry['bytes'] = 3
+            stages.count('items', 2)
+    finally:
+        assert stages.end() is recorder
+    assert [entry['name'] for entry in recorder.stages] == ['inner', 'outer']
+    assert recorder.counts == {'items': 2}
+    assert 'inner;dur=' in recorder.server_timing()
+    assert 'desc="bytes=3"' in recorder.server_timing()
+    # Outside a request the helpers are no-ops
+    with stages.stage('ignored'):
+        stages.count('ignored')
+
+
+def test_peak_covers_nested_stages(tracing):
+    recorder = stages.begin(track_memory=True)
+    try:
+        with stages.stage('outer'):
+            with stages.stage('inner'):
+                block = bytearray(4 * 1024 * 1024)
+                del block
+    finally:
+        stages.end()
+    peaks = {entry['name']: entry['peak_bytes'] for entry in recorder.stages}
+    # Net of the baseline, so anything freed meanwhile (e.g. by the GC) counts against it
+    assert peaks['inner'] >= 4 * 1024 * 1024 - 64 * 1024
+    assert peaks['outer'] >= peaks['inner']
+
+
+def test_memory_tracked_requests_do_not_overlap(tracing):
+    stages.begin(track_memory=True)
+    entered = threading.Event()
+
+    def other_request():
+        stages.begin(track_memory=True)
+        entered.set()
+        stages.end()
+
+    thread = threading.Thread(target=other_request)
+    thread.start()
+    assert not entered.wait(0.2)
+    stages.end()
+    assert entered.wait(5)
+    thread.join()
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import stages
+import workload
+from workload import ShapeCorpus, WorkloadLog, anonymize, prepare, read_log, summarize
+
+
+def test_anonymize_is_keyed():
+    assert anonymize('10.0.0.1', b'one') == anonymize('10.0.0.1', b'one')
+    assert anonymize('10.0.0.1', b'one') != anonymize('10.0.0.1', b'two')
+    assert anonymize('', b'one') == ''
+
+
+def test_log_records_shapes_not_content(tmp_path):
+    with pytest.raises(ValueError):
+        WorkloadLog(str(tmp_path / 'w.jsonl'), b'')
+    log = WorkloadLog(str(tmp_path / 'w-{pid}.jsonl'), b'secret')
+    recorder = stages.begin()
+    stages.document(role='resume', type='text', bytes=40, sha256='ab' * 32, error='secret text')
+    stages.end()
+    log.write(recorder, 100.0, 0.5, '/analyze', 200, '10.0.0.1', batch='b1',
+              params={'fields': 'final_score', 'resumeText': 'secret text'})
+    for handler in log._logger.handlers:
+        handler.flush()
+    records = read_log([str(tmp_path / 'w-*.jsonl')])
+    assert len(records) == 1
+    assert 'secret text' not in json.dumps(records)
+    assert records[0]['client'] == anonymize('10.0.0.1', b'secret')
+    assert records[0]['params'] == {'fields': 'final_score'}
+    assert summarize(records)['documents']['resume/text']['count'] == 1
+
+
+def test_prepare_uploads_handles_and_starts_batches_once(monkeypatch):
+    calls = []
+
+    def fake_post(base_url, path, fields, files, **kwargs):
+        calls.append(path)
+        return 200, 0.0, {'batch_id': 'replayed'}
+
+    monkeypatch.setattr(workload, 'post', fake_post)
+    shape = {'role': 'resume', 'type': 'handle', 'bytes': 2000, 'sha256': 'cd' * 32}
+    records = [{'time': float(i), 'endpoint': '/analyze', 'params': {}, 'client': 'c', 'batch': 'b',
+                'documents': [shape]} for i in range(3)]
+    records.append({'time': 3.0, 'endpoint': '/unknown', 'params': {}, 'client': 'c', 'batch': '',
+                    'documents': []})
+    prepared = prepare(records, ShapeCorpus(), 'http://127.0.0.1:1')
+    assert len(prepared) == 3
+    assert calls == ['/documents', '/batches']
+    fields, files = prepared[0][1]
+    assert fields['batchId'] == ['replayed']
+    assert len(fields['resumeHandle']) == 1 and not files
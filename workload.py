@@ -0,0 +1,369 @@
+import argparse
+import glob
+import hashlib
+import hmac
+import json
+import math
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from metrics import metrics
+from slowlog import rotating_logger
+from stages import StageRecorder
+
+# Shape fields kept per document; everything else (error messages, names) is
+# dropped so the log never holds content
+DOCUMENT_FIELDS = ('role', 'type', 'bytes', 'pages', 'text_length', 'sha256', 'cached', 'extractor', 'status')
+# Request parameters that change how much work a request does
+RECORDED_PARAMS = ('fields', 'explain', 'top_k', 'limit', 'offset')
+
+
+def anonymize(value: str, secret: bytes) -> str:
+    # Keyed, so ids from a small space (client IPs) cannot be recovered by
+    # hashing every candidate without the deployment's secret
+    return hmac.new(secret, value.encode('utf-8'), hashlib.sha256).hexdigest()[:16] if value else ''
+
+
+# Opt-in JSON-lines log of the shape of every analysis request: arrival time,
+# endpoint, status, duration, a client id keyed-hashed with secret and the
+# type, size, page count and content hash of each input document. The text is
+# never recorded. Every worker of a deployment must share the secret, so the
+# same client hashes to the same id in all their logs.
+class WorkloadLog:
+    def __init__(self, path: str, secret: bytes, max_bytes: int = 50 * 1024 * 1024, backups: int = 5):
+        if not secret:
+            raise ValueError('Workload recording needs a secret to anonymize client ids (WORKLOAD_SECRET)')
+        self.path = path.format(pid=os.getpid())
+        self.secret = secret
+        self._logger = rotating_logger(self.path, max_bytes, backups)
+
+    def write(self, recorder: StageRecorder, arrival: float, seconds: float, endpoint: str, status: int,
+              client: str, batch: str = '', params: Optional[Dict] = None) -> Dict:
+        record = {
+            'time': round(arrival, 3),
+            'endpoint': endpoint,
+            'status': status,
+            'duration_ms': round(seconds * 1000, 2),
+            'client': anonymize(client, self.secret),
+            'batch': anonymize(batch, self.secret),
+            'params': {key: value for key, value in (params or {}).items() if key in RECORDED_PARAMS},
+            'documents': [{key: document[key] for key in DOCUMENT_FIELDS if key in document}
+                          for document in recorder.documents]
+        }
+        self._logger.info(json.dumps(record, separators=(',', ':'), default=str))
+        metrics.incr('workload.recorded')
+        return record
+
+
+def read_log(paths: List[str]) -> List[Dict]:
+    # Records from every file (rotated backups and per-process logs
+    # included), in arrival order
+    records = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        records.append(json.loads(line))
+    records.sort(key=lambda record: record['time'])
+    return records
+
+
+def summarize(records: List[Dict]) -> Dict:
+    from loadtest import percentile
+
+    if not records:
+        return {'requests': 0}
+    span = records[-1]['time'] - records[0]['time']
+    endpoints = {}
+    types = {}
+    batch_sizes = []
+    for record in records:
+        endpoints[record['endpoint']] = endpoints.get(record['endpoint'], 0) + 1
+        resumes = 0
+        for document in record['documents']:
+            sizes = types.setdefault(f"{document['role']}/{document['type']}", [])
+            sizes.append(document['bytes'])
+            resumes += document['role'] == 'resume'
+        if record['endpoint'] == '/analyze-batch':
+            batch_sizes.append(resumes)
+    hashes = [document['sha256'] for record in records for document in record['documents']]
+    return {
+        'requests': len(records),
+        'span_seconds': round(span, 1),
+        'mean_rate_rps': round(len(records) / span, 3) if span else None,
+        'endpoints': endpoints,
+        'clients': len({record['client'] for record in records}),
+        'documents': {kind: {'count': len(sizes), 'p50_bytes': percentile(sizes, 50),
+                             'p95_bytes': percentile(sizes, 95), 'max_bytes': max(sizes)}
+                      for kind, sizes in sorted(types.items())},
+        'repeated_documents': len(hashes) - len(set(hashes)),
+        'batch_sizes': {'p50': percentile(batch_sizes, 50), 'max': max(batch_sizes)} if batch_sizes else {}
+    }
+
+
+# Form fields per endpoint and document role: (file field, text field,
+# handle field). Roles are the ones app.py records.
+FORM_FIELDS = {
+    '/analyze': {'resume': ('resume', 'resumeText', 'resumeHandle'), 'jd': ('jd', 'jdText', 'jdHandle')},
+    '/analyze-batch': {'resume': ('resumes', 'resumeTexts', 'resumeHandles'), 'jd': ('jd', 'jdText', 'jdHandle')},
+    '/batches': {'jd': ('jd', 'jdText', 'jdHandle')},
+    '/corpus/match': {'jd': ('jd', 'jdText', 'jdHandle')},
+    '/documents': {'document': ('file', 'text', None)},
+    '/search/resumes': {'resume': ('resumes', 'resumeTexts', 'resumeHandles')},
+}
+FILE_TYPES = ('pdf', 'docx', 'txt')
+
+
+class ShapeCorpus:
+    # Stand-in documents for recorded shapes. A recorded content hash always
+    # maps to the same stand-in, so repeats (and cache hits) replay as
+    # repeats. Real documents from a corpus directory are picked by type and
+    # closest size; without one, synthetic documents are generated to size.
+    def __init__(self, directory: Optional[str] = None, seed: int = 1):
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._assigned = {}
+        self._used = set()
+        self.pool = {kind: [] for kind in FILE_TYPES + ('text',)}
+        if directory:
+            self._load(directory)
+
+    def _load(self, directory: str):
+        from extractors import registry
+
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                kind = os.path.splitext(name)[1].lower().lstrip('.')
+                if kind not in FILE_TYPES:
+                    continue
+                try:
+                    extraction = registry.extract(path)
+                except Exception:
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self.pool[kind].append({'name': name, 'data': data, 'pages': extraction['pages']})
+                self.pool['text'].append({'name': name, 'data': extraction['text'].encode('utf-8'), 'pages': None})
+
+    def document(self, shape: Dict) -> Tuple[str, bytes]:
+        key = shape.get('sha256') or f"{shape['type']}:{shape['bytes']}:{self.rng.random()}"
+        with self._lock:
+            if key not in self._assigned:
+                self._assigned[key] = self._choose(shape, key)
+            return self._assigned[key]
+
+    def _choose(self, shape: Dict, key: str) -> Tuple[str, bytes]:
+        kind = shape['type'] if shape['type'] in self.pool else 'text'
+        candidates = self.pool[kind]
+        if candidates:
+            size = max(1, shape['bytes'])
+
+            def distance(index):
+                candidate = candidates[index]
+                pages = abs((candidate['pages'] or 0) - (shape.get('pages') or 0))
+                return ((kind, index) in self._used, abs(math.log(max(1, len(candidate['data'])) / size)) + 0.1 * pages)
+
+            index = min(range(len(candidates)), key=distance)
+            self._used.add((kind, index))
+            return candidates[index]['name'], candidates[index]['data']
+        return self._synthetic(shape, kind, key)
+
+    def _synthetic(self, shape: Dict, kind: str, key: str) -> Tuple[str, bytes]:
+        from loadtest import FILLER, RESUME_TEXTS, make_docx, make_pdf
+
+        domain = sorted(RESUME_TEXTS)[int(hashlib.sha256(key.encode()).hexdigest(), 16) % len(RESUME_TEXTS)]
+        # A reference line keeps distinct recorded hashes distinct
+        base = f"{RESUME_TEXTS[domain]}\nReference {key[:16]}\n"
+        target = shape.get('text_length') or (shape['bytes'] if kind in ('text', 'txt') else 3000)
+        text = base + FILLER * max(0, round((target - len(base)) / len(FILLER)))
+        name = f'{domain}-{key[:8]}.{kind if kind != "text" else "txt"}'
+        if kind == 'pdf':
+            lines = len(text.splitlines())
+            per_page = max(1, math.ceil(lines / shape['pages'])) if shape.get('pages') else 50
+            data = make_pdf(text, per_page)
+            return name, make_pdf(text, per_page, max(0, shape['bytes'] - len(data)))
+        if kind == 'docx':
+            data = make_docx(text)
+            return name, make_docx(text, max(0, shape['bytes'] - len(data)))
+        return name, text.encode('utf-8')
+
+
+def build_request(record: Dict, corpus: ShapeCorpus, batches: Dict[str, str], base_url: str,
+                  uploaded: set) -> Optional[Tuple[Dict[str, List[str]], Dict[str, List[Tuple[str, bytes, str]]]]]:
+    # Form fields and files for one recorded request; None for endpoints the
+    # replay does not know
+    from documents import content_hash
+    from loadtest import CONTENT_TYPES, JD_TEXT
+
+    roles = FORM_FIELDS.get(record['endpoint'])
+    if roles is None:
+        return None
+    fields = {key: [str(value)] for key, value in record['params'].items()}
+    files = {}
+    for shape in record['documents']:
+        if shape['role'] not in roles:
+            continue
+        file_field, text_field, handle_field = roles[shape['role']]
+        name, data = corpus.document(shape)
+        if shape['type'] == 'handle' and handle_field:
+            # The server can only resolve handles of documents it has seen
+            handle = content_hash(data)
+            if handle not in uploaded:
+                upload_document(base_url, name, data)
+                uploaded.add(handle)
+            fields.setdefault(handle_field, []).append(handle)
+        elif shape['type'] == 'text':
+            fields.setdefault(text_field, []).append(data.decode('utf-8'))
+            uploaded.add(content_hash(data))
+        else:
+            kind = os.path.splitext(name)[1].lstrip('.')
+            files.setdefault(file_field, []).append((name, data, CONTENT_TYPES.get(kind, 'application/octet-stream')))
+            uploaded.add(content_hash(data))
+
+    if record['batch'] and record['endpoint'] in ('/analyze', '/analyze-batch'):
+        # Recorded batches become batches of the replay, started on first use
+        # (the recorded POST /batches cannot be tied to its batch id)
+        batch_id = batches.get(record['batch'])
+        if batch_id is None:
+            response = post(base_url, '/batches', {'jdText': [JD_TEXT]}, {})[2]
+            batch_id = batches[record['batch']] = response.get('batch_id', '')
+        fields['batchId'] = [batch_id]
+    elif 'jd' in roles and not any(roles['jd'][0] in files or key in fields for key in roles['jd'][1:]):
+        fields['jdText'] = [JD_TEXT]
+    return fields, files
+
+
+def post(base_url: str, path: str, fields: Dict[str, List[str]], files: Dict[str, List[Tuple[str, bytes, str]]],
+         client: str = 'replay', timeout: float = 120) -> Tuple[int, float, Dict]:
+    from loadtest import encode_multipart
+
+    body, content_type = encode_multipart(fields, files)
+    req = urllib.request.Request(base_url.rstrip('/') + path, data=body, method='POST',
+                                 headers={'Content-Type': content_type, 'X-Client-Id': client})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            payload = json.loads(response.read() or b'{}')
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, payload = e.code, {'error': e.reason}
+    except Exception as e:
+        status, payload = 0, {'error': str(e)}
+    return status, time.perf_counter() - start, payload
+
+
+def upload_document(base_url: str, name: str, data: bytes):
+    from loadtest import CONTENT_TYPES
+
+    kind = os.path.splitext(name)[1].lstrip('.')
+    post(base_url, '/documents', {}, {'file': [(name, data, CONTENT_TYPES.get(kind, 'application/octet-stream'))]})
+
+
+def prepare(records: List[Dict], corpus: ShapeCorpus, base_url: str) -> List[Tuple[Dict, Tuple]]:
+    # Builds every request up front, uploading the documents that recorded
+    # handles refer to and starting the replay's batches, so none of that
+    # blocking setup runs on the replay clock
+    batches = {}
+    uploaded = set()
+    prepared = []
+    for record in records:
+        built = build_request(record, corpus, batches, base_url, uploaded)
+        if built is not None:
+            prepared.append((record, built))
+    return prepared
+
+
+def replay(records: List[Dict], base_url: str, corpus: ShapeCorpus, speed: float = 1.0, timeout: float = 120):
+    # Sends every request at its recorded offset from the first arrival
+    # (divided by speed), each on its own thread, so slow responses do not
+    # delay later arrivals. Returns a loadtest.Recorder keyed by endpoint.
+    from loadtest import Recorder
+
+    recorder = Recorder()
+    threads = []
+
+    def send(record, built):
+        status, latency, payload = post(base_url, record['endpoint'], *built,
+                                        client=f"replay-{record['client']}", timeout=timeout)
+        recorder.add(record['endpoint'], status, status == 200 and 'error' not in payload, latency)
+
+    prepared = prepare(records, corpus, base_url)
+    start = time.monotonic()
+    first = prepared[0][0]['time'] if prepared else 0
+    for record, built in prepared:
+        delay = start + (record['time'] - first) / speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        thread = threading.Thread(target=send, args=(record, built), daemon=True)
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return recorder
+
+
+def main(argv: Optional[List[str]] = None):
+    from loadtest import start_server, wait_until_ready
+
+    parser = argparse.ArgumentParser(description='Summarize or replay a recorded workload (WORKLOAD_LOG)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    summary = sub.add_parser('summary', help='Shape of the recorded traffic')
+    summary.add_argument('logs', nargs='+', help='Workload log files or glob patterns')
+    run = sub.add_parser('replay', help='Replay the arrival pattern against a local instance')
+    run.add_argument('logs', nargs='+', help='Workload log files or glob patterns')
+    run.add_argument('--corpus', help='Directory of documents to stand in for recorded ones (default: synthetic)')
+    run.add_argument('--speed', type=float, default=1.0, help='Time compression, e.g. 10 replays an hour in 6 minutes')
+    run.add_argument('--limit', type=int, default=0, help='Replay only the first N requests')
+    run.add_argument('--url', help='Target an already running server instead of starting one')
+    run.add_argument('--port', type=int, default=5055)
+    run.add_argument('--command', dest='server_command',
+                     help='Serving command, e.g. "gunicorn -w 4 -b 127.0.0.1:{port} app:app"')
+    run.add_argument('--env', action='append', default=[], help='KEY=VALUE passed to the started server')
+    run.add_argument('--timeout', type=float, default=120)
+    run.add_argument('--seed', type=int, default=1)
+    run.add_argument('--output', help='Write the JSON report here as well as stdout')
+    args = parser.parse_args(argv)
+
+    records = read_log(args.logs)
+    if args.command == 'summary':
+        print(json.dumps(summarize(records), indent=2))
+        return
+
+    if args.limit:
+        records = records[:args.limit]
+    args.no_server = bool(args.url)
+    if not args.url:
+        args.url = f'http://127.0.0.1:{args.port}'
+    corpus = ShapeCorpus(args.corpus, args.seed)
+    server = start_server(args)
+    try:
+        wait_until_ready(args.url, 60)
+        start = time.perf_counter()
+        recorder = replay(records, args.url, corpus, args.speed, args.timeout)
+        report = recorder.report(time.perf_counter() - start)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+
+    report['recorded'] = summarize(records)
+    report['config'] = {'url': args.url, 'command': args.server_command, 'env': args.env, 'speed': args.speed,
+                        'corpus': args.corpus or 'synthetic'}
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+
+if __name__ == '__main__':
+    main()